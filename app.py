@@ -1,61 +1,50 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import calendar
+import threading
+import base64
+import time
 import random
-from github import Github
+from collections import namedtuple
+import os
+from github import Auth, Github, GithubException, InputGitTreeElement, RateLimitExceededException
 from io import StringIO
-from fpdf import FPDF
-import numpy as np
-
-# --- 1. KONFIGURACJA ZESPOŁU ---
-
-FIXED_DOCTORS = [
-    "Jakub Sz.", 
-    "Daniel"
-]
-
-ROTATION_DOCTORS = [
-    "Jędrzej", 
-    "Filip", 
-    "Ihab", 
-    "Kacper", 
-    "Jakub", 
-    "Tymoteusz"
-]
-
-NO_OPTOUT_DOCTORS = [
-    "Jędrzej", "Filip", "Ihab", "Jakub", "Tymoteusz"
-]
-
-SATURDAY_RULE_DOCTORS = ["Daniel", "Kacper"]
-
-ALL_DOCTORS = list(set(FIXED_DOCTORS + ROTATION_DOCTORS))
-
-STATUS_AVAILABLE = "Chcę dyżur (Dostępny)"
-STATUS_RELUCTANT = "Mogę (Niechętnie)"
-STATUS_UNAVAILABLE = "Niedostępny"
-STATUS_FIXED = "Sztywny Dyżur (Już ustalony)"
-
-REASONS = ["", "Urlop", "Kurs", "Inne"]
-DATA_FILE = "data.csv"
-DAY_GROUPS_LIST = ["Poniedziałki", "Wtorki/Środy", "Czwartki", "Piątki", "Soboty", "Niedziele"]
-
-# --- KOLORY (Dla spójności) ---
-DOCTOR_COLORS = {
-    "Jakub Sz.": (50, 120, 220),   "Daniel": (255, 140, 0),
-    "Jędrzej": (0, 180, 80),       "Filip": (220, 50, 50),
-    "Ihab": (160, 60, 200),        "Kacper": (255, 215, 0),
-    "Jakub": (0, 180, 200),        "Tymoteusz": (230, 0, 100)
-}
+from pdf_export import create_pdf_bytes, create_daily_pdf_bytes
+from scheduler_cache import ResultCache, fingerprint, generation_key, daily_work_key
+from scheduler_batch import make_scenarios, iter_scenarios
+from scheduler_jobs import JobRunner, JOB_DONE, JOB_FAILED
+from data_snapshot import SNAPSHOT_FILE, encode_snapshot, decode_snapshot, git_blob_sha
+from data_deltas import DELTA_DIR, COMPACT_THRESHOLD, COLUMNS, make_delta, parse_delta, apply_deltas, merge_rows
+from fairness import FAIRNESS_FILE, empty_store, parse_store, dump_store, period_key, accept_period, history_offsets
+from scheduler import (
+    FIXED_DOCTORS, ROTATION_DOCTORS, ALL_DOCTORS, NO_DAILY_WORK_DOCTORS,
+    STATUS_AVAILABLE, STATUS_RELUCTANT, STATUS_UNAVAILABLE, STATUS_FIXED,
+    REASONS, DATA_FILE, ENGINES, MODES, PERIOD_MONTHS,
+    PrefIndex, GenerationStats, get_settlement_period_info, get_period_dates, period_calendar,
+    validate_schedule_rules, generate_daily_work, schedule_tables,
+)
 
 # --- 2. INFRASTRUKTURA I DANE ---
 
+RATE_LIMIT_RESERVE = 100  # zapas zapytań API: poniżej odczyty idą z pamięci, zostaje na zapisy
+GEN_VIEWS_KEPT = 4  # wyniki generatora trzymane w st.session_state (różne okresy/ustawienia)
+JOBS_PARALLEL = 2  # zadania generowania liczone równocześnie (wątki JobRunner)
+JOB_POLL_S = 1.0  # odświeżanie postępu zadania w zakładce Grafik
+MONTH_NAMES = ["Styczeń", "Luty", "Marzec", "Kwiecień", "Maj", "Czerwiec", "Lipiec", "Sierpień", "Wrzesień", "Październik", "Listopad", "Grudzień"]
+
+@st.cache_resource
+def get_client():
+    # Jeden klient = jedna sesja HTTP z pulą połączeń (keep-alive) dla wszystkich sesji
+    token = st.secrets["github"]["token"]
+    return Github(auth=Auth.Token(token), per_page=100, pool_size=8, seconds_between_requests=None)
+
 @st.cache_resource
 def get_repo():
     try:
-        token = st.secrets["github"]["token"]
-        g = Github(token)
+        g = get_client()
+        # Bez przeszukiwania repozytoriów: github.repo = "właściciel/nazwa" (lazy = bez zapytania)
+        name = st.secrets["github"].get("repo")
+        if name: return g.get_repo(name, lazy=True)
         user = g.get_user()
         for repo in user.get_repos():
              if any(x in repo.name.lower() for x in ["grafik", "urologia", "dyzury"]): return repo
@@ -64,479 +53,230 @@ def get_repo():
         st.error(f"Błąd połączenia z GitHubem: {e}")
         return None
 
-@st.cache_data(ttl=60)
+def api_quota():
+    # (pozostałe zapytania, czas resetu) z nagłówków ostatniej odpowiedzi - bez dodatkowego
+    # zapytania; przed pierwszym zapytaniem (None, None)
+    try:
+        req = get_client().requester
+        remaining, limit = req.rate_limiting
+        return (remaining, req.rate_limiting_resettime) if limit >= 0 else (None, None)
+    except Exception:
+        return None, None
+
+def _quota_low():
+    remaining, reset = api_quota()
+    return remaining is not None and remaining < RATE_LIMIT_RESERVE and reset > time.time()
+
+@st.cache_resource
+def get_result_cache(): return ResultCache()
+
+@st.cache_resource
+def get_job_runner():
+    # Wspólna dla wszystkich sesji pula zadań generowania; wynik trafia też do pamięci podręcznej
+    cache = get_result_cache()
+    return JobRunner(max_jobs=JOBS_PARALLEL, on_done=lambda key, result, report: cache.put(key, (result, report)))
+
+@st.cache_resource(ttl=60)
+def load_prefs():
+    # PrefIndex bieżącej migawki: budowany raz i współdzielony (tylko do odczytu) przez zakładki,
+    # generator, audyt i plan pracy
+    return PrefIndex(load_data())
+
 def load_data():
     repo = get_repo()
     if not repo: return pd.DataFrame(columns=["Data", "Lekarz", "Status", "Przyczyna"])
-    try:
-        c = repo.get_contents(DATA_FILE)
-        df = pd.read_csv(StringIO(c.decoded_content.decode("utf-8"))).astype({'Data': str})
-        if 'Przyczyna' not in df.columns: df['Przyczyna'] = ""
-        return df.fillna("")
+    try: return apply_deltas(_fetch_data(repo), _fetch_deltas(repo)).copy()
     except: return pd.DataFrame(columns=["Data", "Lekarz", "Status", "Przyczyna"])
 
-def save_data(df):
-    repo = get_repo()
-    if not repo: return False
+def _parse_csv(f):
+    return _parse_csv_text(f.decoded_content.decode("utf-8"))
+
+def _parse_csv_text(text):
+    df = pd.read_csv(StringIO(text)).astype({'Data': str})
     if 'Przyczyna' not in df.columns: df['Przyczyna'] = ""
+    return df.fillna("")
+
+@st.cache_resource
+def _data_snapshot():
+    # Ref gałęzi (ETag), sha data.csv, sparsowana ramka i ostatnio widziana migawka - wspólne dla wszystkich sesji
+    return {'ref': None, 'sha': None, 'df': None, 'npz': (None, None), 'deltas': {}, 'lock': threading.Lock()}
+
+def _blob(repo, sha): return base64.b64decode(repo.get_git_blob(sha).content)
+
+def _fetch_data(repo):
+    # Zapytanie warunkowe o ref gałęzi (304 = bez nowych commitów, bez limitu API i pobierania).
+    # Po zmianie lista katalogu głównego (same metadane) mówi, czy zmienił się data.csv - także
+    # przy ręcznej edycji albo zapisie, po którym migawka nie powstała. Treść tylko dla nowego sha.
+    snap = _data_snapshot()
+    with snap['lock']:
+        ref = snap['ref']
+        if ref is not None and snap['df'] is not None:
+            if _quota_low(): return snap['df']
+            try:
+                if not ref.update(): return snap['df']
+            except GithubException:
+                ref = None
+        if ref is None: ref = repo.get_git_ref(f"heads/{repo.default_branch}")
+        listing = {c.path: c.sha for c in repo.get_contents("", ref=ref.object.sha)}
+        csv_sha = listing.get(DATA_FILE)
+        if csv_sha is None: snap['df'], snap['sha'] = pd.DataFrame(columns=COLUMNS), None
+        elif csv_sha != snap['sha'] or snap['df'] is None:
+            snap['df'], snap['sha'] = _load_base(repo, snap, csv_sha, listing.get(SNAPSHOT_FILE)), csv_sha
+        snap['ref'] = ref
+        return snap['df']
+
+def _load_base(repo, snap, csv_sha, npz_sha):
+    # Migawka data.npz zamiast CSV, gdy powstała z tej wersji data.csv (csv_sha w migawce).
+    # Migawka już widziana z innym csv_sha jest nieaktualna - bez ponownego pobierania.
+    seen_sha, seen_csv = snap['npz']
+    if npz_sha is not None and not (npz_sha == seen_sha and seen_csv != csv_sha):
+        try:
+            df, snap_csv = decode_snapshot(_blob(repo, npz_sha))
+            snap['npz'] = (npz_sha, snap_csv)
+            if snap_csv == csv_sha: return df
+        except Exception:
+            snap['npz'] = (npz_sha, None)  # uszkodzona migawka -> CSV
+    return _parse_csv_text(_blob(repo, csv_sha).decode("utf-8"))
+
+def _snapshot_enabled():
+    try: return bool(st.secrets["github"].get("snapshot", True))
+    except Exception: return True
+
+def _write_snapshot(repo, df, csv_text):
+    # Migawka po zapisie CSV (osobny commit); niepowodzenie = odczyt wraca do CSV
+    if not _snapshot_enabled(): return
+    data = encode_snapshot(df, git_blob_sha(csv_text.encode("utf-8")))
+    if data is None: return
     try:
-        c = repo.get_contents(DATA_FILE)
-        repo.update_file(c.path, "Aktualizacja grafiku", df.to_csv(index=False), c.sha)
-        st.cache_data.clear()
-        return True
-    except:
-        try: repo.create_file(DATA_FILE, "Inicjalizacja", df.to_csv(index=False)); st.cache_data.clear(); return True
-        except: return False
-
-# --- 3. KALENDARZ I ŚWIĘTA ---
-
-@st.cache_data(ttl=3600)
-def get_polish_holidays(year):
-    a = year % 19; b = year // 100; c = year % 100
-    d = b // 4; e = b % 4; f = (b + 8) // 25
-    g = (b - f + 1) // 3; h = (19 * a + b - d - g + 15) % 30
-    i = c // 4; k = c % 4; l = (32 + 2 * e + 2 * i - h - k) % 7
-    m = (a + 11 * h + 22 * l) // 451
-    month = (h + l - 7 * m + 114) // 31
-    day = ((h + l - 7 * m + 114) % 31) + 1
-    easter = datetime.date(year, month, day)
-    
-    holidays = {
-        datetime.date(year, 1, 1): "Nowy Rok",
-        datetime.date(year, 1, 6): "Trzech Króli",
-        easter: "Wielkanoc",
-        easter + datetime.timedelta(days=1): "Poniedziałek Wielkanocny",
-        datetime.date(year, 5, 1): "Święto Pracy",
-        datetime.date(year, 5, 3): "Święto Konstytucji 3 Maja",
-        easter + datetime.timedelta(days=49): "Zielone Świątki",
-        easter + datetime.timedelta(days=60): "Boże Ciało",
-        datetime.date(year, 8, 15): "Wniebowzięcie NMP",
-        datetime.date(year, 11, 1): "Wszystkich Świętych",
-        datetime.date(year, 11, 11): "Święto Niepodległości",
-        datetime.date(year, 12, 25): "Boże Narodzenie (1)",
-        datetime.date(year, 12, 26): "Boże Narodzenie (2)",
-    }
-    return holidays
-
-def is_red_day(date_obj):
-    if date_obj.weekday() >= 5: return True 
-    holidays = get_polish_holidays(date_obj.year)
-    return date_obj in holidays
-
-def get_day_description(date_obj):
-    days_pl = ["Pon", "Wt", "Śr", "Czw", "Pt", "Sob", "Niedz"]
-    day_name = days_pl[date_obj.weekday()]
-    holidays = get_polish_holidays(date_obj.year)
-    if date_obj in holidays: return f"🔴 {day_name} ({holidays[date_obj]})"
-    elif date_obj.weekday() >= 5: return f"🔴 {day_name}"
-    return day_name
-
-def get_settlement_period_info(year, month):
-    start_month = month if month % 2 != 0 else month - 1
-    start_date = datetime.date(year, start_month, 1)
-    day_names = ['Poniedziałek', 'Wtorek', 'Środa', 'Czwartek', 'Piątek', 'Sobota', 'Niedziela']
-    return start_date, day_names[start_date.weekday()]
-
-def get_period_dates(year, start_month):
-    dates = []
-    for i in range(2):
-        curr = start_month + i
-        if curr <= 12:
-            nd = calendar.monthrange(year, curr)[1]
-            dates.extend([datetime.date(year, curr, d) for d in range(1, nd + 1)])
-    return dates
-
-def get_week_key(date_obj):
-    p_start, _ = get_settlement_period_info(date_obj.year, date_obj.month)
-    days = (date_obj - p_start).days
-    week_index = days // 7
-    return f"{date_obj.year}_M{p_start.month}_W{week_index}"
-
-def get_day_group(date_obj):
-    wd = date_obj.weekday()
-    if wd == 0: return "Poniedziałki"
-    if wd in [1, 2]: return "Wtorki/Środy"
-    if wd == 3: return "Czwartki"
-    if wd == 4: return "Piątki"
-    if wd == 5: return "Soboty"
-    return "Niedziele"
-
-# --- PDF GENERATOR ---
-
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, 'Grafik Dyzurów - Urologia', 0, 1, 'C')
-        self.ln(5)
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Strona {self.page_no()}', 0, 0, 'C')
-
-def remove_pl_chars(text):
-    if not isinstance(text, str): return str(text)
-    replacements = {'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n', 'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z', 'Ą': 'A', 'Ć': 'C', 'Ę': 'E', 'Ł': 'L', 'Ń': 'N', 'Ó': 'O', 'Ś': 'S', 'Ź': 'Z', 'Ż': 'Z', '🔴': ' ', '⚠️': '!', '✅': 'OK'}
-    for k, v in replacements.items(): text = text.replace(k, v)
-    try: return text.encode('latin-1', 'replace').decode('latin-1')
-    except: return "?"
-
-def create_pdf_bytes(dataframe, stats_dataframe, title):
-    pdf = PDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=10)
-    
-    # Tytuł
-    safe_title = remove_pl_chars(title)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, safe_title, 0, 1, 'L')
-    pdf.ln(5)
-    
-    # Tabela Grafiku
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(35, 8, 'Data', 1)
-    pdf.cell(50, 8, 'Dzien', 1)
-    pdf.cell(80, 8, 'Lekarz', 1)
-    pdf.ln()
-    
-    pdf.set_font("Arial", size=10)
-    for _, row in dataframe.iterrows():
-        d_str = row['Data'].strftime('%Y-%m-%d')
-        day_str = remove_pl_chars(row['Info'])
-        doc_raw = str(row['Dyżurny'])
-        doc_str = remove_pl_chars(doc_raw)
-        
-        is_red = row['_is_red']
-        pdf.set_fill_color(255, 255, 255)
-        if is_red:
-            pdf.set_fill_color(220, 220, 220)
-        
-        pdf.cell(35, 8, d_str, 1, 0, 'L', True)
-        pdf.cell(50, 8, day_str, 1, 0, 'L', True)
-        
-        if doc_raw in DOCTOR_COLORS:
-            r, g, b = DOCTOR_COLORS[doc_raw]
-            pdf.set_fill_color(r, g, b)
-        else:
-             pdf.set_fill_color(255, 255, 255)
-             if doc_raw == "BRAK":
-                 pdf.set_fill_color(255, 150, 150)
-
-        pdf.cell(80, 8, doc_str, 1, 1, 'L', True)
-    
-    # Sekcja Statystyk
-    pdf.ln(10)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Statystyki Dyzurow (Rotacja)", 0, 1, 'L')
-    pdf.ln(2)
-    
-    pdf.set_font("Arial", 'B', 9)
-    cols = list(stats_dataframe.columns)
-    col_width = 180 / len(cols)
-    for col in cols:
-        pdf.cell(col_width, 8, remove_pl_chars(col), 1, 0, 'C')
-    pdf.ln()
-    
-    pdf.set_font("Arial", size=9)
-    pdf.set_fill_color(255, 255, 255)
-    for _, row in stats_dataframe.iterrows():
-        doc_name = str(row['Lekarz'])
-        if doc_name in DOCTOR_COLORS:
-            r, g, b = DOCTOR_COLORS[doc_name]
-            pdf.set_fill_color(r, g, b)
-        else:
-            pdf.set_fill_color(255, 255, 255)
-        pdf.cell(col_width, 8, remove_pl_chars(doc_name), 1, 0, 'C', True)
-        pdf.set_fill_color(255, 255, 255)
-        for col in cols[1:]:
-            pdf.cell(col_width, 8, str(row[col]), 1, 0, 'C', True)
-        pdf.ln()
-
-    return pdf.output(dest='S').encode('latin-1', 'replace')
-
-def create_daily_pdf_bytes(dataframe, title):
-    pdf = PDF(orientation='L')
-    pdf.add_page()
-    pdf.set_font("Arial", size=8)
-    safe_title = remove_pl_chars(title)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, safe_title, 0, 1, 'L')
-    pdf.ln(5)
-    cols = list(dataframe.columns)
-    if "_is_red" in cols: cols.remove("_is_red")
-    page_width = pdf.w - 20
-    date_w = 20; day_w = 25
-    doc_w = (page_width - date_w - day_w) / max(1, (len(cols) - 2))
-    pdf.set_font("Arial", 'B', 8)
-    for col in cols:
-        w = date_w if col == "Data" else (day_w if col == "Dzień" else doc_w)
-        pdf.cell(w, 8, remove_pl_chars(col), 1, 0, 'C')
-    pdf.ln()
-    pdf.set_font("Arial", size=7)
-    for _, row in dataframe.iterrows():
-        fill = row.get('_is_red', False)
-        if fill: pdf.set_fill_color(240, 240, 240)
-        for col in cols:
-            val = row[col]
-            txt = val.strftime('%Y-%m-%d') if col == "Data" else remove_pl_chars(str(val))
-            w = date_w if col == "Data" else (day_w if col == "Dzień" else doc_w)
-            
-            # Kolory w harmonogramie
-            if col in ["Data", "Dzień"]:
-                pdf.set_fill_color(220, 220, 220) if fill else pdf.set_fill_color(255, 255, 255)
-            else:
-                if txt == "ZEJSCIE": pdf.set_fill_color(180, 180, 180)
-                elif "DYZUR" in txt: pdf.set_fill_color(100, 180, 240)
-                elif "Wolne (48h)" in txt: pdf.set_fill_color(240, 100, 100)
-                elif txt in ["Wolne", "Urlop", "Kurs"]: pdf.set_fill_color(255, 215, 0)
-                else: pdf.set_fill_color(255, 255, 255)
-            
-            pdf.cell(w, 6, txt, 1, 0, 'C', True)
-        pdf.ln()
-    return pdf.output(dest='S').encode('latin-1', 'replace')
-
-# --- 5. ALGORYTM GRAFIKU (SILNIK) ---
-
-def _generate_single_schedule(dates, prefs_map, target_limits, last_duty_prev_period):
-    schedule = {} 
-    stats = {doc: {'Total': 0, "Poniedziałki": 0, "Wtorki/Środy": 0, "Czwartki": 0, "Piątki": 0, "Soboty": 0, "Niedziele": 0} for doc in ALL_DOCTORS}
-    weekly_counts = {}
-    debug_info = {}
-    denied_fixed_requests = []
-
-    # Faza 1: SZTYWNE DYŻURY
-    for d in dates:
-        d_str = d.strftime('%Y-%m-%d')
-        day_prefs = prefs_map.get(d_str, {})
-        assigned = None
-        
-        # Priorytet 1: Fixed Doctors
-        for doc in FIXED_DOCTORS:
-            if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED:
-                assigned = doc; break
-        
-        # Priorytet 2: Rotation Doctors (o ile Fixed nie zajął)
-        if not assigned:
-            candidates_fixed = [doc for doc in ROTATION_DOCTORS if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
-            if candidates_fixed:
-                assigned = random.choice(candidates_fixed)
-                for rejected in candidates_fixed:
-                    if rejected != assigned:
-                        denied_fixed_requests.append(f"{d_str}: {rejected} (konflikt z {assigned})")
-        else:
-            conflicting = [doc for doc in ROTATION_DOCTORS if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
-            for cr in conflicting:
-                denied_fixed_requests.append(f"{d_str}: {cr} (nadpisany przez {assigned})")
-
-        if assigned:
-            schedule[d_str] = assigned
-            stats[assigned]['Total'] += 1
-            stats[assigned][get_day_group(d)] += 1
-            wk = get_week_key(d)
-            if wk not in weekly_counts: weekly_counts[wk] = {}
-            weekly_counts[wk][assigned] = weekly_counts[wk].get(assigned, 0) + 1
-
-    # Faza 2: ROTACJA
-    days_to_fill = [d for d in dates if d.strftime('%Y-%m-%d') not in schedule]
-    def count_av(d_obj):
-        d_s = d_obj.strftime('%Y-%m-%d')
-        return sum(1 for doc in ROTATION_DOCTORS if prefs_map.get(d_s, {}).get(doc, {}).get('Status') != STATUS_UNAVAILABLE)
-    days_to_fill.sort(key=lambda x: (count_av(x), random.random()))
-    
-    for d in days_to_fill:
-        d_str = d.strftime('%Y-%m-%d')
-        wk = get_week_key(d)
-        group = get_day_group(d)
-        candidates = []
-        rej = {}
-        prev = (d - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-        next_d = (d + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-        prev_duty_doc = last_duty_prev_period if d == dates[0] else schedule.get(prev)
-        prev_sat = (d - datetime.timedelta(days=2)).strftime('%Y-%m-%d')
-        is_monday = d.weekday() == 0
-
-        for doc in ROTATION_DOCTORS:
-            if stats[doc]['Total'] >= target_limits.get(doc, 0): rej[doc] = "Limit"; continue
-            if prefs_map.get(d_str, {}).get(doc, {}).get('Status') == STATUS_UNAVAILABLE: rej[doc] = "ND"; continue
-            if prev_duty_doc == doc: rej[doc] = "Po"; continue
-            
-            # Blokada przed niedostępnością
-            next_day_status = prefs_map.get(next_d, {}).get(doc, {}).get('Status')
-            if next_day_status == STATUS_UNAVAILABLE:
-                reason = prefs_map.get(next_d, {}).get(doc, {}).get('Przyczyna', 'Wolne')
-                rej[doc] = f"Przed {reason}"
-                continue
-
-            if schedule.get(next_d) == doc: rej[doc] = "Przed"; continue
-            if weekly_counts.get(wk, {}).get(doc, 0) >= 2: rej[doc] = "Max2(48h)"; continue
-            
-            if is_monday and doc in SATURDAY_RULE_DOCTORS:
-                if schedule.get(prev_sat) == doc: rej[doc] = "Wolne(Sob)"; continue
-
-            w = 10 if prefs_map.get(d_str, {}).get(doc, {}).get('Status') == STATUS_AVAILABLE else (1 if prefs_map.get(d_str, {}).get(doc, {}).get('Status') == STATUS_RELUCTANT else 5)
-            candidates.append({'name': doc, 'w': w, 'gc': stats[doc][group], 'tc': stats[doc]['Total']})
-
-        if candidates:
-            candidates.sort(key=lambda x: (-x['w'], x['gc'], x['tc'], random.random()))
-            chosen = candidates[0]['name']
-            schedule[d_str] = chosen
-            stats[chosen]['Total'] += 1
-            stats[chosen][group] += 1
-            if wk not in weekly_counts: weekly_counts[wk] = {}
-            weekly_counts[wk][chosen] = weekly_counts[wk].get(chosen, 0) + 1
-        else:
-            schedule[d_str] = "BRAK"
-            debug_info[d_str] = rej
-
-    return schedule, stats, debug_info, denied_fixed_requests
-
-# --- WALIDACJA KOŃCOWA (AUDYT) ---
-def validate_schedule_rules(schedule, prefs_map, dates, last_duty_prev):
-    violations = []
-    
-    for i, d in enumerate(dates):
-        d_str = d.strftime('%Y-%m-%d')
-        doc = schedule.get(d_str)
-        
-        if not doc or doc == "BRAK": continue
-        
-        # 1. Odpoczynek po dyżurze (11h)
-        prev_d = d - datetime.timedelta(days=1)
-        prev_doc = last_duty_prev if i == 0 else schedule.get(prev_d.strftime('%Y-%m-%d'))
-        if prev_doc == doc:
-            violations.append(f"🔴 {d_str}: {doc} ma dyżur dzień po dniu!")
-            
-        # 2. Dyżur w dzień niedostępny
-        status = prefs_map.get(d_str, {}).get(doc, {}).get('Status')
-        if status == STATUS_UNAVAILABLE:
-            reason = prefs_map.get(d_str, {}).get(doc, {}).get('Przyczyna', '')
-            violations.append(f"🔴 {d_str}: {doc} ma dyżur, a zgłosił: Niedostępny ({reason})")
-            
-        # 3. Dyżur przed niedostępnością (brak zejścia)
-        next_d = d + datetime.timedelta(days=1)
-        next_s = prefs_map.get(next_d.strftime('%Y-%m-%d'), {}).get(doc, {}).get('Status')
-        if next_s == STATUS_UNAVAILABLE:
-             reason = prefs_map.get(next_d.strftime('%Y-%m-%d'), {}).get(doc, {}).get('Przyczyna', '')
-             violations.append(f"🔴 {d_str}: {doc} ma dyżur przed dniem niedostępnym ({reason})")
-             
-        # 4. Reguła sobotnia (tylko Daniel i Kacper)
-        if doc in SATURDAY_RULE_DOCTORS and d.weekday() == 0: # Poniedziałek
-             sat = d - datetime.timedelta(days=2)
-             if schedule.get(sat.strftime('%Y-%m-%d')) == doc:
-                 violations.append(f"🔴 {d_str}: {doc} ma dyżur w Poniedziałek po pracującej Sobocie!")
-
-    return violations
-
-def generate_optimized(dates, df, limits, last_duty_prev, attempts=5000):
-    random.seed(42)
-    best_res = None
-    best_score = -float('inf')
-    prefs_map = {}
-    if not df.empty:
-        for r in df.to_dict('records'):
-            if r['Data'] not in prefs_map: prefs_map[r['Data']] = {}
-            prefs_map[r['Data']][r['Lekarz']] = {'Status': r['Status'], 'Przyczyna': r.get('Przyczyna', '')}
-
-    for _ in range(attempts):
-        sch, sts, dbg, denied = _generate_single_schedule(dates, prefs_map, limits, last_duty_prev)
-        score = sum(1000000 for v in sch.values() if v != "BRAK")
-        for g in DAY_GROUPS_LIST:
-            cnts = [sts[d][g] for d in ROTATION_DOCTORS]
-            if cnts:
-                diff = max(cnts) - min(cnts)
-                score -= diff * 1000 
-        pref_score = 0
-        for d_str, doc in sch.items():
-            if doc in ROTATION_DOCTORS and doc != "BRAK":
-                s = prefs_map.get(d_str, {}).get(doc, {}).get('Status', STATUS_AVAILABLE)
-                if s == STATUS_AVAILABLE: pref_score += 50
-                elif s == STATUS_RELUCTANT: pref_score -= 50
-        score += pref_score
-        if score > best_score:
-            best_score = score
-            best_res = (sch, sts, dbg, denied)
-    return best_res
-
-# --- 6. HARMONOGRAM PRACY ---
-
-def generate_daily_work(dates, duty_schedule, preferences_df, last_duty_prev):
-    daily_doctors = [d for d in ALL_DOCTORS if d != "Jakub Sz."]
-    schedule_map = {d.strftime('%Y-%m-%d'): {doc: "" for doc in daily_doctors} for d in dates}
-    prefs_lookup = {}
-    if not preferences_df.empty:
-        for r in preferences_df.to_dict('records'):
-            d = r['Data']; doc = r['Lekarz']
-            if d not in prefs_lookup: prefs_lookup[d] = {}
-            prefs_lookup[d][doc] = {'Status': r['Status'], 'Przyczyna': r.get('Przyczyna', '')}
-
-    def set_status(date_obj, doc, status): schedule_map[date_obj.strftime('%Y-%m-%d')][doc] = status
-    def get_status(date_obj, doc): return schedule_map[date_obj.strftime('%Y-%m-%d')][doc]
-
-    weeks = {}
-    for d in dates:
-        wk = get_week_key(d)
-        if wk not in weeks: weeks[wk] = []
-        weeks[wk].append(d)
-
-    norma = 7 + (35/60)
-
-    for wk, week_dates in weeks.items():
-        daily_staff_count = {d.strftime('%Y-%m-%d'): 0 for d in week_dates}
-        doc_shift_hours = {doc: 0.0 for doc in daily_doctors}
-
-        for d in week_dates:
-            d_s = d.strftime('%Y-%m-%d')
-            prev_d_s = (d - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
-            is_red = is_red_day(d)
-            duty = duty_schedule.get(d_s)
-            duty_prev = last_duty_prev if d == dates[0] else duty_schedule.get(prev_d_s)
-
-            for doc in daily_doctors:
-                user_prefs = prefs_lookup.get(d_s, {}).get(doc, {})
-                status_pref = user_prefs.get('Status')
-                reason = user_prefs.get('Przyczyna')
-                
-                if status_pref == STATUS_UNAVAILABLE and reason in ["Urlop", "Kurs"]:
-                    set_status(d, doc, reason)
-                    doc_shift_hours[doc] += norma 
-                elif duty == doc:
-                    set_status(d, doc, "DYŻUR 24h")
-                    doc_shift_hours[doc] += 24.0
-                elif duty_prev == doc: set_status(d, doc, "ZEJŚCIE")
-                elif is_red: set_status(d, doc, "Wolne")
-                elif doc in SATURDAY_RULE_DOCTORS and d.weekday() == 0:
-                    last_sat = d - datetime.timedelta(days=2)
-                    if duty_schedule.get(last_sat.strftime('%Y-%m-%d')) == doc: set_status(d, doc, "Wolne (za sobotę)")
-                    else: set_status(d, doc, "TBD")
-                else: set_status(d, doc, "TBD")
-
-        for d in week_dates:
-            count = sum(1 for doc in daily_doctors if get_status(d, doc) == "TBD")
-            daily_staff_count[d.strftime('%Y-%m-%d')] = count
-
-        for doc in NO_OPTOUT_DOCTORS:
-            if doc not in daily_doctors: continue
-            remaining = 48.0 - doc_shift_hours[doc]
-            max_days = int(remaining // norma)
-            candidates = [d for d in week_dates if get_status(d, doc) == "TBD"]
-            if len(candidates) <= max_days:
-                for d in candidates: set_status(d, doc, "7:30 - 15:05")
-            else:
-                candidates.sort(key=lambda x: daily_staff_count[x.strftime('%Y-%m-%d')], reverse=True)
-                num_to_drop = len(candidates) - max_days
-                for d in candidates[:num_to_drop]:
-                    set_status(d, doc, "Wolne (48h)"); daily_staff_count[d.strftime('%Y-%m-%d')] -= 1
-                for d in candidates[num_to_drop:]: set_status(d, doc, "7:30 - 15:05")
-
-        for doc in daily_doctors:
-            for d in week_dates:
-                if get_status(d, doc) == "TBD": set_status(d, doc, "7:30 - 15:05")
-
-    final_data = []
-    for d in dates:
-        row = {"Data": d, "Dzień": get_day_description(d), "_is_red": is_red_day(d)}
-        for doc in daily_doctors: row[doc] = schedule_map[d.strftime('%Y-%m-%d')][doc]
-        final_data.append(row)
-    return pd.DataFrame(final_data)
+        try: old = repo.get_contents(SNAPSHOT_FILE)
+        except GithubException: old = None
+        if old: repo.update_file(SNAPSHOT_FILE, "Migawka danych", data, old.sha)
+        else: repo.create_file(SNAPSHOT_FILE, "Migawka danych", data)
+    except GithubException:
+        pass
+
+def _fetch_deltas(repo):
+    # Lista katalogu delt (1 zapytanie); treść pobierana tylko dla nowych plików
+    snap = _data_snapshot()
+    if snap['df'] is not None and _quota_low(): return [(path, d) for path, (_, d) in snap['deltas'].items()]
+    try: listing = repo.get_contents(DELTA_DIR)
+    except GithubException: listing = []
+    if not isinstance(listing, list): listing = [listing]
+    with snap['lock']:
+        cache, fresh = snap['deltas'], {}
+        for f in listing:
+            if not f.path.endswith(".json"): continue
+            hit = cache.get(f.path)
+            if hit is None or hit[0] != f.sha:
+                hit = (f.sha, parse_delta(repo.get_contents(f.path).decoded_content.decode("utf-8")))
+            fresh[f.path] = hit
+        snap['deltas'] = fresh
+    return [(path, d) for path, (_, d) in fresh.items()]
+
+def _storage_mode():
+    # "delta" (domyślnie): zapis tylko zmian lekarza; "csv": cały data.csv przy każdym zapisie
+    try: return st.secrets["github"].get("storage", "delta")
+    except Exception: return "delta"
+
+SaveResult = namedtuple("SaveResult", ["ok", "attempts", "conflicts", "error"])
+SAVE_RETRIES = 6
+SAVE_BACKOFF = (0.25, 4.0)  # pierwsze opóźnienie i górny limit [s], z losowym rozrzutem
+
+def _with_retry(write):
+    # Optymistyczna współbieżność: write() czyta najnowszy stan i zapisuje; konflikt SHA (409)
+    # lub istniejący plik (422) = ktoś zapisał w międzyczasie -> ponowienie z backoffem
+    delay, conflicts = SAVE_BACKOFF[0], 0
+    for attempt in range(1, SAVE_RETRIES + 1):
+        try:
+            write()
+            load_prefs.clear()
+            return SaveResult(True, attempt, conflicts, "")
+        except RateLimitExceededException:
+            _, reset = api_quota()
+            when = datetime.datetime.fromtimestamp(reset).strftime('%H:%M') if reset else "?"
+            return SaveResult(False, attempt, conflicts, f"Wyczerpany limit API GitHuba - zapis możliwy po {when}.")
+        except GithubException as e:
+            if e.status not in (409, 422): return SaveResult(False, attempt, conflicts, str(e))
+            conflicts += 1
+            if attempt == SAVE_RETRIES: break
+            time.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, SAVE_BACKOFF[1])
+    return SaveResult(False, SAVE_RETRIES, conflicts, "Zbyt wiele równoległych zapisów - spróbuj ponownie.")
+
+def save_rows(doc, p_strs, rows):
+    # Zapis wierszy lekarza dla okresu; zwraca SaveResult
+    repo = get_repo()
+    if not repo: return SaveResult(False, 0, 0, "Brak połączenia z repozytorium.")
+    if _storage_mode() == "csv":
+        def write():
+            # Świeży odczyt przy każdej próbie: cudze zmiany zostają, nadpisywany jest tylko wycinek (Lekarz, okres)
+            try: c = repo.get_contents(DATA_FILE)
+            except GithubException as e:
+                if e.status != 404: raise
+                c = None
+            base = _parse_csv(c) if c else pd.DataFrame(columns=COLUMNS)
+            merged = merge_rows(base, doc, p_strs, rows)
+            body = merged.to_csv(index=False)
+            if c: repo.update_file(c.path, "Aktualizacja grafiku", body, c.sha)
+            else: repo.create_file(DATA_FILE, "Inicjalizacja", body)
+            _write_snapshot(repo, merged, body)
+        return _with_retry(write)
+    def write():
+        path, body = make_delta(doc, p_strs, rows)
+        repo.create_file(path, f"Dostępność: {doc}", body)
+    res = _with_retry(write)
+    if res.ok and len(_data_snapshot()['deltas']) + 1 >= COMPACT_THRESHOLD and not _quota_low(): compact_data(repo)
+    return res
+
+def compact_data(repo):
+    # data.csv + delty -> nowy data.csv, delty usunięte; jeden commit przez API drzew git.
+    # Równoległy zapis przesuwa gałąź -> ref.edit odrzucony, delty zostają (nic nie ginie).
+    try:
+        ref = repo.get_git_ref(f"heads/{repo.default_branch}")
+        head = repo.get_git_commit(ref.object.sha)
+        deltas = _fetch_deltas(repo)
+        if not deltas: return True
+        # Baza świeżo z drzewa head (nie z pamięci podręcznej), żeby nie nadpisać nowszego data.csv
+        entry = next((e for e in repo.get_git_tree(head.tree.sha).tree if e.path == DATA_FILE), None)
+        base = _parse_csv_text(_blob(repo, entry.sha).decode("utf-8")) if entry else pd.DataFrame(columns=COLUMNS)
+        merged = apply_deltas(base, deltas)
+        body = merged.to_csv(index=False)
+        elems = [InputGitTreeElement(DATA_FILE, "100644", "blob", content=body)]
+        npz = encode_snapshot(merged, git_blob_sha(body.encode("utf-8"))) if _snapshot_enabled() else None
+        if npz is not None:
+            blob = repo.create_git_blob(base64.b64encode(npz).decode("ascii"), "base64")
+            elems.append(InputGitTreeElement(SNAPSHOT_FILE, "100644", "blob", sha=blob.sha))
+        elems += [InputGitTreeElement(path, "100644", "blob", sha=None) for path, _ in deltas]
+        tree = repo.create_git_tree(elems, head.tree)
+        commit = repo.create_git_commit(f"Kompakcja zmian ({len(deltas)})", tree, [head])
+        ref.edit(commit.sha)
+    except GithubException: return False
+    load_prefs.clear()
+    return True
+
+@st.cache_resource(ttl=60)
+def load_fairness():
+    # Liczniki grup dni z zaakceptowanych grafików (fairness.json); brak pliku = pusta historia
+    repo = get_repo()
+    if not repo: return empty_store()
+    try: return parse_store(repo.get_contents(FAIRNESS_FILE).decoded_content.decode("utf-8"))
+    except GithubException: return empty_store()
+
+def accept_schedule(key, stats):
+    # Dopisanie (lub wymiana) okresu key w fairness.json - tylko różnica liczników, bez przeliczania historii
+    repo = get_repo()
+    if not repo: return SaveResult(False, 0, 0, "Brak połączenia z repozytorium.")
+    def write():
+        try: c = repo.get_contents(FAIRNESS_FILE)
+        except GithubException as e:
+            if e.status != 404: raise
+            c = None
+        body = dump_store(accept_period(parse_store(c.decoded_content.decode("utf-8")) if c else empty_store(), key, stats))
+        if c: repo.update_file(c.path, f"Akceptacja grafiku {key}", body, c.sha)
+        else: repo.create_file(FAIRNESS_FILE, f"Akceptacja grafiku {key}", body)
+    res = _with_retry(write)
+    load_fairness.clear()
+    return res
 
 # --- UI ---
 st.set_page_config(page_title="Grafik Urologia", layout="wide", page_icon="🏥")
@@ -559,15 +299,31 @@ with st.expander("ℹ️ Instrukcja obsługi i zasady (Kliknij, aby zwinąć)",
 
 with st.sidebar:
     st.header("Ustawienia")
-    periods = ["Styczeń - Luty", "Marzec - Kwiecień", "Maj - Czerwiec", "Lipiec - Sierpień", "Wrzesień - Październik", "Listopad - Grudzień"]
+    # Okresy rozliczeniowe wg team.json (period_months): nazwa -> pierwszy miesiąc
+    periods = {(MONTH_NAMES[m - 1] if PERIOD_MONTHS == 1 else f"{MONTH_NAMES[m - 1]} - {MONTH_NAMES[m + PERIOD_MONTHS - 2]}"): m for m in range(1, 13, PERIOD_MONTHS)}
     today = datetime.date.today()
-    default_idx = (today.month - 1) // 2
-    sel_period_name = st.selectbox("Okres", periods, index=default_idx)
+    default_idx = (today.month - 1) // PERIOD_MONTHS
+    sel_period_name = st.selectbox("Okres", list(periods), index=default_idx)
     sel_year = st.number_input("Rok", 2025, 2030, today.year)
-    start_m = {"Styczeń - Luty": 1, "Marzec - Kwiecień": 3, "Maj - Czerwiec": 5, "Lipiec - Sierpień": 7, "Wrzesień - Październik": 9, "Listopad - Grudzień": 11}[sel_period_name]
+    start_m = periods[sel_period_name]
     p_start, p_day = get_settlement_period_info(sel_year, start_m)
     st.info(f"Start: {p_start} ({p_day}).")
-    attempts_count = 5000
+    if _quota_low():
+        q_left, q_reset = api_quota()
+        st.warning(f"Limit API GitHuba prawie wyczerpany ({q_left}) - dane z pamięci podręcznej do {datetime.datetime.fromtimestamp(q_reset).strftime('%H:%M')}.")
+    time_budget = st.number_input("Budżet czasu (s)", 1, 300, 10, help="Szukanie kończy się po tym czasie albo wcześniej, gdy wynik przestaje się poprawiać.")
+    patience = st.number_input("Stop po próbach bez poprawy", 0, 10000000, 20000, step=5000, help="0 = zawsze wykorzystaj cały budżet czasu.")
+    attempts_count = st.number_input("Maks. prób (0 = bez limitu)", 0, 10000000, 0, step=5000)
+    cpu_count = os.cpu_count() or 1
+    gen_mode = st.selectbox("Tryb", MODES, help="solver: dokładne przeszukiwanie - pełna obsada, jeśli istnieje, albo dowód, że jej nie ma (wtedy losowe próby).")
+    engine = st.selectbox("Silnik", ENGINES, index=ENGINES.index("numpy"), help="numpy: ten sam algorytm, próby liczone wektorowo (kilkanaście razy szybciej).")
+    improve_iters = st.number_input("Iteracje poprawy (wyżarzanie)", 0, 500000, 20000, step=5000, help="Zamiany/przesunięcia dni na najlepszym grafiku z zachowaniem wszystkich reguł. 0 = wyłączone.")
+    use_past = st.checkbox("Sprawiedliwość wielookresowa", value=True, help="Równomierność grup dni liczona łącznie z zaakceptowanymi grafikami poprzednich okresów.")
+    profiling = st.checkbox("Profilowanie generowania", value=False, help="Czasy faz, rozkład wyników i powody odrzuceń kandydatów (niewielki narzut).")
+    workers_count = st.number_input("Procesy (równoległe)", 1, cpu_count, min(8, cpu_count), help="Próby dzielone są między procesy. Wynik jest powtarzalny dla danej liczby procesów, gdy szukanie kończy limit prób albo brak poprawy; przy zatrzymaniu przez budżet czasu zależy od szybkości maszyny.")
+
+# Ustawienia optymalizacji wspólne dla pojedynczego grafiku i trybu wsadowego
+run_params = dict(attempts=attempts_count, seed=42, engine=engine, improve_iterations=improve_iters, mode=gen_mode, time_budget=time_budget, patience=patience)
 
 tab1, tab2 = st.tabs(["📝 Dostępność", "🧮 Grafik"])
 
@@ -575,48 +331,46 @@ with tab1:
     st.subheader(f"Dostępność: {sel_period_name} {sel_year}")
     current_user = st.selectbox("Lekarz:", ALL_DOCTORS, index=2)
     dates = get_period_dates(sel_year, start_m)
-    df_db = load_data()
+    cal = period_calendar(dates)
+    prefs_db = load_prefs()
     is_fixed_mode = current_user in FIXED_DOCTORS
     
     if is_fixed_mode:
         st.info("Tryb Fixed. Dodaj tylko dni dyżurowe.")
-        mask_user = (df_db['Lekarz'] == current_user)
         clean_data = []
-        if not df_db.empty:
-            for _, r in df_db[mask_user].iterrows():
+        if not prefs_db.empty:
+            for r in prefs_db.doctor_rows(current_user).to_dict('records'):
                 if r['Status'] == STATUS_FIXED:
                     try:
                         d = pd.to_datetime(r['Data']).date()
-                        if d in dates: clean_data.append({"Data": d, "Status": STATUS_FIXED})
+                        if d in cal.pos: clean_data.append({"Data": d, "Status": STATUS_FIXED})
                     except: pass
         editor = st.data_editor(pd.DataFrame(clean_data, columns=["Data", "Status"]), column_config={"Data": st.column_config.DateColumn(format="DD.MM.YYYY", required=True), "Status": st.column_config.SelectboxColumn(disabled=True, default=STATUS_FIXED, options=[STATUS_FIXED])}, num_rows="dynamic", use_container_width=True, hide_index=True)
         if st.button("Zapisz", type="primary"):
             with st.spinner("Zapis..."):
-                p_strs = [d.strftime('%Y-%m-%d') for d in dates]
+                p_strs = cal.d_strs
                 new_r = []
                 for _, r in editor.iterrows():
                     try:
                         dv = pd.to_datetime(r['Data']).strftime('%Y-%m-%d')
                         if dv in p_strs: new_r.append({"Data": dv, "Lekarz": current_user, "Status": STATUS_FIXED, "Przyczyna": ""})
                     except: continue
-                final = pd.DataFrame(new_r)
-                if not df_db.empty:
-                    df_cl = df_db[~((df_db['Lekarz'] == current_user) & (df_db['Data'].isin(p_strs)))]
-                    final = pd.concat([df_cl, final], ignore_index=True)
-                if save_data(final): st.success("OK!"); load_data.clear()
+                res = save_rows(current_user, p_strs, new_r)
+                if res.ok:
+                    st.success("OK!" if not res.conflicts else f"OK! (zapis równoległy innego lekarza - scalono, próba {res.attempts})")
+                    load_prefs.clear()
+                else: st.error(f"Nie zapisano: {res.error}")
     else:
         t_data = []
-        for d in dates:
-            d_s = d.strftime('%Y-%m-%d')
+        for d, d_s, info in zip(dates, cal.d_strs, cal.desc):
             s = STATUS_AVAILABLE; r_val = ""
-            if not df_db.empty:
-                e = df_db[(df_db['Lekarz'] == current_user) & (df_db['Data'] == d_s)]
-                if not e.empty: s = e.iloc[0]['Status']; r_val = e.iloc[0].get('Przyczyna', '')
-            t_data.append({"Data": d, "Info": get_day_description(d), "Status": s, "Przyczyna": r_val})
+            e = prefs_db.get(d_s, current_user)
+            if e: s = e['Status']; r_val = e['Przyczyna']
+            t_data.append({"Data": d, "Info": info, "Status": s, "Przyczyna": r_val})
         editor = st.data_editor(pd.DataFrame(t_data), column_config={"Data": st.column_config.DateColumn(disabled=True, format="DD.MM.YYYY"), "Info": st.column_config.TextColumn(disabled=True), "Status": st.column_config.SelectboxColumn(options=[STATUS_AVAILABLE, STATUS_RELUCTANT, STATUS_FIXED, STATUS_UNAVAILABLE], required=True), "Przyczyna": st.column_config.SelectboxColumn("Przyczyna (tylko dla 'Niedostępny')", options=REASONS)}, height=500, use_container_width=True, hide_index=True)
         if st.button("Zapisz", type="primary"):
             with st.spinner("Zapis..."):
-                p_strs = [d.strftime('%Y-%m-%d') for d in dates]
+                p_strs = cal.d_strs
                 new_r = []
                 for _, r in editor.iterrows():
                     try:
@@ -624,24 +378,25 @@ with tab1:
                         final_reason = r['Przyczyna'] if r['Status'] == STATUS_UNAVAILABLE else ""
                         new_r.append({"Data": dv, "Lekarz": current_user, "Status": r['Status'], "Przyczyna": final_reason})
                     except: continue
-                final = pd.DataFrame(new_r)
-                if not df_db.empty:
-                    df_cl = df_db[~((df_db['Lekarz'] == current_user) & (df_db['Data'].isin(p_strs)))]
-                    final = pd.concat([df_cl, final], ignore_index=True)
-                if save_data(final): st.success("OK!"); load_data.clear()
+                res = save_rows(current_user, p_strs, new_r)
+                if res.ok:
+                    st.success("OK!" if not res.conflicts else f"OK! (zapis równoległy innego lekarza - scalono, próba {res.attempts})")
+                    load_prefs.clear()
+                else: st.error(f"Nie zapisano: {res.error}")
 
 with tab2:
     st.header("Generator")
-    all_prefs = load_data()
+    all_prefs = load_prefs()
     dates_gen = get_period_dates(sel_year, start_m)
+    gen_period = period_key(dates_gen)
     prev_day_date = dates_gen[0] - datetime.timedelta(days=1)
     last_duty_prev = st.selectbox(f"Kto dyżurował {prev_day_date.strftime('%d.%m.%Y')}?", ["Nikt"] + ALL_DOCTORS, index=0)
     real_last_duty = None if last_duty_prev == "Nikt" else last_duty_prev
     
     fixed_counts = {doc: 0 for doc in ALL_DOCTORS}
     if not all_prefs.empty:
-        d_strs = [d.strftime('%Y-%m-%d') for d in dates_gen]
-        p_data = all_prefs[all_prefs['Data'].isin(d_strs)]
+        d_strs = period_calendar(dates_gen).d_strs
+        p_data = all_prefs.period_rows(d_strs)
         
         conflicts = []
         fixed_entries = p_data[p_data['Status'] == STATUS_FIXED]
@@ -662,7 +417,7 @@ with tab2:
     fixed_table_data = []
     for doc in FIXED_DOCTORS:
         fixed_table_data.append({"Lekarz": doc, "Liczba Dyżurów": fixed_counts[doc]})
-    ed_fixed = st.data_editor(pd.DataFrame(fixed_table_data), column_config={"Lekarz": st.column_config.TextColumn(disabled=True), "Liczba Dyżurów": st.column_config.NumberColumn(min_value=0, max_value=31, step=1)}, hide_index=True, use_container_width=True)
+    ed_fixed = st.data_editor(pd.DataFrame(fixed_table_data), column_config={"Lekarz": st.column_config.TextColumn(disabled=True), "Liczba Dyżurów": st.column_config.NumberColumn(min_value=0, max_value=total_days, step=1)}, hide_index=True, use_container_width=True)
     
     sum_fixed_table = ed_fixed["Liczba Dyżurów"].sum()
     sum_fixed_rotational = sum(fixed_counts[d] for d in ROTATION_DOCTORS)
@@ -681,7 +436,7 @@ with tab2:
     for i, doc in enumerate(ROTATION_DOCTORS):
         existing = fixed_counts[doc]
         lim_data.append({"Lekarz": doc, "Limit": base + existing})
-    ed_rot = st.data_editor(pd.DataFrame(lim_data), column_config={"Limit": st.column_config.NumberColumn(min_value=0, max_value=31, step=1)}, hide_index=True, use_container_width=True)
+    ed_rot = st.data_editor(pd.DataFrame(lim_data), column_config={"Limit": st.column_config.NumberColumn(min_value=0, max_value=total_days, step=1)}, hide_index=True, use_container_width=True)
     
     current_rot_sum = ed_rot["Limit"].sum()
     total_planned = current_rot_sum + sum_fixed_table
@@ -689,37 +444,115 @@ with tab2:
     if total_planned >= total_days:
         st.success("Bilans wystarczający.")
         if total_planned > total_days: st.info(f"Nadmiarowy limit ({total_planned} > {total_days}).")
+        limits = {}
+        for _, r in ed_rot.iterrows(): limits[r['Lekarz']] = r['Limit']
+        for _, r in ed_fixed.iterrows(): limits[r['Lekarz']] = r['Liczba Dyżurów']
+        past_counts = history_offsets(load_fairness(), gen_period) if use_past else None
+        gen_params = dict(run_params, workers=workers_count, past_counts=past_counts)
+        # Profil jest częścią raportu -> przebieg z profilowaniem ma własny klucz (wynik i zadanie)
+        gen_key = generation_key(dates_gen, all_prefs, limits, real_last_duty, profile=profiling, **gen_params)
+        gen_views = st.session_state.setdefault('gen_views', {})
+
+        runner = get_job_runner()
+
+        def store_view(result, gen_report, notes):
+            # Wszystko, co pokazuje zakładka, liczone raz - kolejne przebiegi skryptu (pobrania,
+            # akceptacja, zmiany widoku) rysują z st.session_state bez ponownej optymalizacji
+            sch, stats, dbg, denied = result
+            df_res, stats_df = schedule_tables(dates_gen, sch, stats, limits)
+            df_daily = get_result_cache().cached(daily_work_key(dates_gen, sch, all_prefs, real_last_duty), lambda: generate_daily_work(dates_gen, sch, all_prefs, real_last_duty))
+            view = {'period': gen_period, 'result': result, 'report': gen_report, 'notes': notes, 'past_counts': past_counts,
+                    'audit': validate_schedule_rules(sch, all_prefs.by_day, dates_gen, real_last_duty, limits),
+                    'df_res': df_res, 'stats_df': stats_df, 'df_daily': df_daily, 'pdf': None, 'pdf_daily': None, 'pdf_error': None}
+            try: view['pdf'] = create_pdf_bytes(df_res, stats_df, f"Grafik {sel_period_name}")
+            except: pass
+            try: view['pdf_daily'] = create_daily_pdf_bytes(df_daily.drop(columns=["_is_red"]), f"Harmonogram {sel_period_name}")
+            except Exception as e: view['pdf_error'] = str(e)
+            gen_views.pop(gen_key, None)
+            gen_views[gen_key] = view
+            while len(gen_views) > GEN_VIEWS_KEPT: gen_views.pop(next(iter(gen_views)))
+            if "BRAK" not in sch.values(): st.balloons()
+
         if st.button("🚀 GENERUJ GRAFIKI", type="primary"):
-            limits = {}
-            for _, r in ed_rot.iterrows(): limits[r['Lekarz']] = r['Limit']
-            for _, r in ed_fixed.iterrows(): limits[r['Lekarz']] = r['Liczba Dyżurów']
-            
-            with st.spinner(f"Optymalizacja (analiza {attempts_count} wariantów)..."):
-                sch, stats, dbg, denied = generate_optimized(dates_gen, all_prefs, limits, real_last_duty, attempts_count)
+            cached = get_result_cache().get(gen_key)
+            if cached:
+                store_view(cached[0], cached[1], ["Wynik z pamięci podręcznej (te same dane wejściowe i ustawienia)."])
+            else:
+                # Optymalizacja w tle: zakładkę można opuścić i wrócić (te same dane = to samo zadanie)
+                job = runner.submit(gen_key, dates_gen, all_prefs, limits, real_last_duty, report={'profile': GenerationStats()} if profiling else {}, **gen_params)
+                if job.requests > 1: st.caption("To samo generowanie (te same dane i ustawienia) już trwa - dołączono do zadania.")
+
+        job = runner.get(gen_key)
+        if gen_key not in gen_views and job is not None:
+            if job.status == JOB_DONE:
+                prog = job.progress
+                store_view(job.result, job.report, [f"Zakończono: {prog['stop']} ({prog['attempts']} prób, {prog['elapsed']:.1f} s)."] if prog['stop'] else [])
+            elif job.status == JOB_FAILED:
+                st.error(f"Generowanie nie powiodło się:\n\n{job.error}")
+            else:
+                @st.fragment(run_every=JOB_POLL_S)
+                def job_progress():
+                    # Odświeżany sam fragment; po zakończeniu zadania pełny przebieg rysuje wynik
+                    j = runner.get(gen_key)
+                    if j is None or j.done:
+                        st.rerun()
+                    prog = j.progress
+                    st.progress(prog['fraction'], text=f"{j.status.capitalize()} (procesy: {workers_count}) | próby: {prog['attempts']} | {prog['elapsed']:.1f} s")
+                    if prog['best_score'] is not None: st.metric("Najlepszy wynik", f"{prog['best_score']:,}".replace(",", " "))
+                    if len(prog['history']) > 1: st.line_chart(pd.DataFrame(prog['history'], columns=['Próby', 'Czas (s)', 'Wynik']).set_index('Próby')['Wynik'], height=160)
+                    st.caption("Generowanie trwa w tle - można zmienić zakładkę lub zamknąć stronę i wrócić później.")
+                job_progress()
+
+        view = gen_views.get(gen_key)
+        if view is None and any(v['period'] == gen_period for v in gen_views.values()):
+            st.info("Dane wejściowe lub ustawienia zmieniły się od ostatniego generowania - wygeneruj grafik ponownie.")
+        if view is not None:
+            sch, stats, dbg, denied = view['result']
+            gen_report, past_counts = view['report'], view['past_counts']
+            for note in view['notes']: st.caption(note)
+            solver_info = gen_report.get('solver')
+            if solver_info:
+                if solver_info['status'] == "OK": st.caption(f"Solver: pełna obsada ({solver_info['nodes']} węzłów przeszukiwania).")
+                elif solver_info['status'] == "LIMIT": st.warning("Solver: przekroczono limit przeszukiwania - użyto losowych prób.")
+                else: st.warning(f"Solver: pełna obsada NIE ISTNIEJE przy tych limitach i dostępności ({solver_info['nodes']} węzłów) - użyto losowych prób.")
+            if past_counts: st.caption("Rozrzut grup dni liczony z nadwyżkami z poprzednich okresów: " + "; ".join(f"{d}: " + ", ".join(f"{g} +{n}" for g, n in o.items()) for d, o in past_counts.items()))
+            prof = gen_report.get('profile')
+            if prof is not None:
+                with st.expander("⏱️ Profil generowania"):
+                    pc = st.columns(4)
+                    pc[0].metric("Próby/s", f"{prof.attempts_per_s:,.0f}".replace(",", " "))
+                    for col, (phase, t) in zip(pc[1:], prof.phase_time.items()): col.metric(phase, f"{t:.2f} s")
+                    if len(prof.phase_time) > 3: st.caption(", ".join(f"{k}: {v:.2f} s" for k, v in prof.phase_time.items()))
+                    summ = prof.score_summary()
+                    if summ:
+                        st.caption(f"Wyniki prób: min {summ['min']}, mediana {summ['p50']}, max {summ['max']}")
+                        st.bar_chart(pd.Series(prof.scores).sort_index().rename("Próby"), height=180)
+                    rej_df = prof.rejection_table()
+                    if not rej_df.empty:
+                        st.markdown("**Odrzucenia kandydatów** (lekarz × powód)")
+                        st.dataframe(rej_df.pivot_table(index='Lekarz', columns='Powód', values='Liczba', aggfunc='sum', fill_value=0), use_container_width=True)
+                        st.markdown("**Najczęstsze odrzucenia** (powód, lekarz, dzień)")
+                        st.dataframe(rej_df.head(50), hide_index=True, use_container_width=True)
                 
             # WALIDACJA KOŃCOWA
-            audit_errors = validate_schedule_rules(sch, all_prefs.set_index(['Data', 'Lekarz']).to_dict('index') if not all_prefs.empty else {}, dates_gen, real_last_duty)
+            audit_errors = view['audit']
             
             if audit_errors:
                 st.error("🚨 AUDYT WYKRYŁ BŁĘDY KRYTYCZNE (ZŁAMANE ZASADY):")
                 for err in audit_errors: st.write(err)
                 st.divider()
 
-            res, fails = [], []
-            for d in dates_gen:
-                d_s = d.strftime('%Y-%m-%d')
-                ass = sch.get(d_s, "BRAK")
-                res.append({"Data": d, "Info": get_day_description(d), "Dyżurny": ass, "_is_red": is_red_day(d)})
-                if ass == "BRAK":
+            fails = []
+            for d, d_s in zip(dates_gen, period_calendar(dates_gen).d_strs):
+                if sch.get(d_s, "BRAK") == "BRAK":
                     reason_str = ", ".join([f"**{k}**: {v}" for k,v in dbg[d_s].items()]) if d_s in dbg else "Brak chętnych"
                     fails.append(f"🔴 **{d.strftime('%d.%m')}:** {reason_str}")
 
-            df_res = pd.DataFrame(res)
+            df_res = view['df_res']
             if fails:
                 st.error("⚠️ UWAGA! Nie udało się obsadzić dni:")
                 for f in fails: st.write(f)
                 st.divider()
-            else: st.balloons()
             
             if denied:
                 st.warning("⚠️ Konflikty Fixed:")
@@ -731,25 +564,15 @@ with tab2:
 
             st.dataframe(df_res.style.apply(style_dyzur, axis=1).format({"Data": lambda t: t.strftime("%Y-%m-%d")}), use_container_width=True, height=500, column_config={"_is_red": None})
             
-            s_rows = []
-            for d in ROTATION_DOCTORS:
-                row = {"Lekarz": d, "Cel": limits.get(d,0), "Wynik": int(stats[d]['Total'])}
-                for k,v in stats[d].items(): 
-                    if k!='Total': row[k] = int(v)
-                s_rows.append(row)
-            stats_df = pd.DataFrame(s_rows).fillna("-")
-            
-            try:
-                pdf = create_pdf_bytes(df_res, stats_df, f"Grafik {sel_period_name}")
-                st.download_button("📥 PDF (Dyżury)", pdf, "grafik.pdf", "application/pdf")
-            except: pass
+            stats_df = view['stats_df']
+            if view['pdf'] is not None: st.download_button("📥 PDF (Dyżury)", view['pdf'], "grafik.pdf", "application/pdf")
 
             st.write("---")
             st.dataframe(stats_df, hide_index=True)
 
             st.markdown("---")
-            st.markdown(f"### 🏢 Tabela 2: Harmonogram Pracy (Bez {FIXED_DOCTORS[0]})")
-            df_daily = generate_daily_work(dates_gen, sch, all_prefs, real_last_duty)
+            st.markdown("### 🏢 Tabela 2: Harmonogram Pracy" + (f" (Bez {', '.join(NO_DAILY_WORK_DOCTORS)})" if NO_DAILY_WORK_DOCTORS else ""))
+            df_daily = view['df_daily']
             def style_daily(val):
                 if val == "ZEJŚCIE": return 'background-color: #e0e0e0; color: #555'
                 if "DYŻUR" in str(val): return 'background-color: #d1ecf1; color: #0c5460; font-weight: bold'
@@ -757,10 +580,56 @@ with tab2:
                 if val in ["Wolne", "Urlop", "Kurs"]: return 'color: #D81B60'
                 return ''
             st.dataframe(df_daily.style.applymap(style_daily).format({"Data": lambda t: t.strftime("%Y-%m-%d")}), use_container_width=True, height=600, column_config={"_is_red": None})
-            try:
-                pdf_daily = create_daily_pdf_bytes(df_daily.drop(columns=["_is_red"]), f"Harmonogram {sel_period_name}")
-                st.download_button("📥 PDF (Harmonogram)", pdf_daily, "harmonogram.pdf", "application/pdf")
-            except Exception as e: st.error(f"Błąd PDF: {e}")
+            if view['pdf_daily'] is not None: st.download_button("📥 PDF (Harmonogram)", view['pdf_daily'], "harmonogram.pdf", "application/pdf")
+            elif view['pdf_error']: st.error(f"Błąd PDF: {view['pdf_error']}")
+
+            accepted = load_fairness()['periods'].get(gen_period)
+            label = "✅ Akceptuj grafik (statystyki wielookresowe)" if accepted is None else "✅ Akceptuj grafik (zastąp zaakceptowany wcześniej)"
+            if st.button(label):
+                res = accept_schedule(gen_period, stats)
+                if res.ok: st.success(f"Zaakceptowano grafik {gen_period} - kolejne okresy uwzględnią jego liczniki.")
+                else: st.error(f"Nie zapisano: {res.error}")
     else:
         diff = total_days - total_planned
         st.warning(f"⚠️ Bilans się nie zgadza! Suma ({total_planned}) < Dni ({total_days}). Brakuje: {diff}. Dodaj je w tabeli Rotacyjnej.")
+
+    # --- TRYB WSADOWY: wiele okresów / wariantów limitów w jednym przebiegu ---
+    with st.expander("📦 Tryb wsadowy (porównanie scenariuszy)"):
+        st.caption("Scenariusz = okres × wariant limitów × dyżurny z dnia przed okresem. Limity: domyślne z tabel powyżej (pula rotacji po równo) zmienione o wartości wariantu. Ustawienia optymalizacji z panelu bocznego; scenariusze liczone równolegle (po jednym procesie).")
+        b_periods = st.multiselect("Okresy", list(periods), default=list(periods), key="batch_periods")
+        b_prev = st.multiselect("Dyżurny z dnia przed okresem", ["Nikt"] + ALL_DOCTORS, default=["Nikt"], key="batch_prev")
+        b_var = st.data_editor(pd.DataFrame([{"Wariant": "Domyślne", **{doc: 0 for doc in ROTATION_DOCTORS}}]), num_rows="dynamic", hide_index=True, use_container_width=True, key="batch_variants",
+                               column_config={doc: st.column_config.NumberColumn(step=1, help="Zmiana limitu względem domyślnego") for doc in ROTATION_DOCTORS})
+        variants = {}
+        for k, r in enumerate(b_var.to_dict('records')):
+            name = str(r['Wariant']) if pd.notna(r['Wariant']) and str(r['Wariant']).strip() else f"Wariant {k + 1}"
+            variants[name] = {doc: int(r[doc]) for doc in ROTATION_DOCTORS if pd.notna(r[doc]) and r[doc]}
+        past_fn = (lambda ds: history_offsets(load_fairness(), period_key(ds))) if use_past else None
+        scenarios = make_scenarios(sel_year, [periods[p] for p in b_periods], all_prefs, variants, [None if d == "Nikt" else d for d in b_prev], past_fn)
+        # Klucz zadania z kluczy generowania scenariuszy: te same dane = to samo zadanie i wynik w pamięci podręcznej
+        batch_key = fingerprint("batch", [generation_key(sc['dates'], all_prefs, sc['limits'], sc['last_duty_prev'], past_counts=sc['past_counts'], **run_params) for sc in scenarios])
+        runner = get_job_runner()
+        if st.button(f"📦 Uruchom scenariusze ({len(scenarios)})", disabled=not scenarios):
+            if get_result_cache().get(batch_key) is None:
+                runner.submit_iter(batch_key, lambda job: iter_scenarios(scenarios, all_prefs, workers_count, **run_params))
+
+        batch = get_result_cache().get(batch_key)
+        job = runner.get(batch_key)
+        if batch is not None:
+            table = batch[0][0]
+            st.dataframe(table.drop(columns=["Scenariusz"]), hide_index=True, use_container_width=True)
+            # Wynik zależy od liczby dni okresu -> najlepszy scenariusz wybierany osobno w każdym okresie
+            best = table.sort_values(["BRAK", "Wynik"], ascending=[True, False]).groupby("Okres", sort=False).head(1)
+            st.caption("Najlepszy w okresie: " + "; ".join(f"{b['Scenariusz']} (wynik {b['Wynik']}, BRAK {b['BRAK']}, rozrzut {b['Rozrzut Σ']})" for _, b in best.sort_index().iterrows()) + ".")
+            st.download_button("📥 Porównanie (CSV)", table.to_csv(index=False).encode('utf-8'), "scenariusze.csv", "text/csv")
+        elif job is not None and job.status == JOB_FAILED:
+            st.error(f"Tryb wsadowy nie powiódł się:\n\n{job.error}")
+        elif job is not None:
+            @st.fragment(run_every=JOB_POLL_S)
+            def batch_progress():
+                j = runner.get(batch_key)
+                if j is None or j.done:
+                    st.rerun()
+                prog = j.progress
+                st.progress(prog['fraction'], text=f"Scenariusze: {prog.get('done', 0)}/{prog.get('total', len(scenarios))} | {prog['elapsed']:.1f} s")
+            batch_progress()
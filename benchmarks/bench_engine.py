@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import scheduler
+import scheduler_numpy
+
+# Porównanie silnika słownikowego i NumPy na data.csv:
+#   python benchmarks/bench_engine.py --year 2026 --month 3 --attempts 5000
+
+def load_prefs(path):
+    return pd.read_csv(path).astype({'Data': str}).fillna("")
+
+def default_limits(dates, prefs):
+    d_strs = {d.strftime('%Y-%m-%d') for d in dates}
+    p = prefs[prefs['Data'].isin(d_strs) & (prefs['Status'] == scheduler.STATUS_FIXED)]
+    limits = {doc: int((p['Lekarz'] == doc).sum()) for doc in scheduler.FIXED_DOCTORS}
+    pool = max(0, len(dates) - sum(limits.values()))
+    per_doc = -(-pool // max(1, len(scheduler.ROTATION_DOCTORS)))
+    limits.update({doc: per_doc for doc in scheduler.ROTATION_DOCTORS})
+    return limits
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data.csv"))
+    ap.add_argument("--year", type=int, default=2026)
+    ap.add_argument("--month", type=int, default=3)
+    ap.add_argument("--attempts", type=int, default=5000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--verify", type=int, default=500, help="liczba prób porównywanych 1:1 z silnikiem słownikowym")
+    args = ap.parse_args()
+
+    prefs = load_prefs(args.data)
+    dates = scheduler.get_period_dates(args.year, args.month)
+    limits = default_limits(dates, prefs)
+    prefs_map = scheduler._build_prefs_map(prefs)
+
+    t0 = time.perf_counter()
+    problem = scheduler_numpy.EncodedProblem(dates, prefs_map, limits, None)
+    t_enc = time.perf_counter() - t0
+    print(f"Kodowanie okresu: {t_enc * 1000:.1f} ms, blok {problem.block} słów/próbę")
+
+    rates = {}
+    for engine in scheduler.ENGINES:
+        t0 = time.perf_counter()
+        res = scheduler.generate_optimized(dates, prefs, limits, None, args.attempts, seed=args.seed, engine=engine)
+        el = time.perf_counter() - t0
+        rates[engine] = args.attempts / el
+        score = scheduler._score_schedule(res[0], res[1], prefs_map)
+        print(f"{engine:>7}: {el:7.3f} s, {rates[engine]:10.0f} prób/s, wynik {score}")
+    print(f"Przyspieszenie: {rates['numpy'] / rates['python']:.1f}x")
+
+    # Zgodność: próba j silnika NumPy == silnik słownikowy na tym samym bloku strumienia
+    mismatches = 0
+    checked = 0
+    for start, words in scheduler_numpy.iter_batches(problem, args.verify, args.seed):
+        sched, _, _ = scheduler_numpy.run_batch(problem, words)
+        for j in range(len(sched)):
+            ref = scheduler_numpy.replay_attempt(problem, args.seed, start + j)
+            mismatches += ref[0] != problem.decode(sched[j])
+            checked += 1
+    print(f"Zgodność: {checked - mismatches}/{checked} prób identycznych")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
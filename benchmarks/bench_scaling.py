@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Skalowanie silnika z wielkością zespołu i długością okresu:
+#   python benchmarks/bench_scaling.py --sizes 6x2 15x2 30x2 30x6 60x6
+# Rozmiar = lekarze rotacyjni x miesiące okresu. Każdy rozmiar liczony w osobnym procesie
+# z syntetycznym zespołem (GRAFIK_TEAM_FILE), bo skład zespołu czytany jest przy imporcie.
+# Kolumna ns/(dzień*lekarz) stała przy rosnącym rozmiarze = koszt próby liniowy.
+
+def _team(rotation, months):
+    rot = [f"Lekarz {k + 1:02d}" for k in range(rotation)]
+    fixed = ["Fixed A", "Fixed B"]
+    return {"fixed": fixed, "rotation": rot, "no_optout": rot[:-1], "saturday_rule": [fixed[1], rot[0]],
+            "no_daily_work": fixed[:1], "period_months": months}
+
+def _per_attempt(fn, attempts):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) / attempts
+
+def child(args):
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import scheduler
+    import scheduler_audit
+    import scheduler_numpy
+    from synthetic import make_preferences, make_limits
+
+    dates = scheduler.get_period_dates(args.year, 1)
+    prefs = make_preferences(dates, None, args.unavailable, args.reluctant, 0.05, 2, args.seed)
+    limits = make_limits(dates, prefs, None)
+    index = scheduler.PrefIndex(prefs)
+    prefs_map = index.by_day
+    n, R = len(dates), len(scheduler.ROTATION_DOCTORS)
+    row = {'doctors': R, 'days': n}
+
+    t0 = time.perf_counter()
+    problem = scheduler_numpy.EncodedProblem(dates, prefs_map, limits, None)
+    row['encode_ms'] = (time.perf_counter() - t0) * 1000
+    py_n = max(1, args.attempts // 20)
+    row['python_us'] = _per_attempt(lambda: scheduler._run_attempts(dates, prefs_map, limits, None, py_n, args.seed), py_n) * 1e6
+    row['numpy_us'] = _per_attempt(lambda: scheduler_numpy.run_attempts(problem, args.attempts, args.seed), args.attempts) * 1e6
+    sch = scheduler._run_attempts(dates, prefs_map, limits, None, 1, args.seed)[1][0]
+    auditor = scheduler_audit.ScheduleAuditor(dates, prefs_map, None, limits)
+    row['audit_ms'] = _per_attempt(lambda: auditor.messages(sch), 1) * 1000
+    row['daily_ms'] = _per_attempt(lambda: scheduler.generate_daily_work(dates, sch, index, None), 1) * 1000
+    print(json.dumps(row))
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", nargs="+", default=["6x2", "15x2", "30x2", "30x6", "60x6"], help="lekarze x miesiące (miesiące: 1, 2, 3, 4, 6 lub 12)")
+    ap.add_argument("--year", type=int, default=2026)
+    ap.add_argument("--attempts", type=int, default=2000, help="próby silnika numpy (python: 1/20)")
+    ap.add_argument("--unavailable", type=float, default=0.15)
+    ap.add_argument("--reluctant", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child: return child(args)
+
+    print(f"{'rozmiar':>9}{'dni':>6}{'kod. ms':>9}{'python us':>11}{'ns/(d*l)':>10}{'numpy us':>10}{'ns/(d*l)':>10}{'audyt ms':>10}{'plan ms':>9}")
+    for size in args.sizes:
+        rotation, months = (int(v) for v in size.split("x"))
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as fh:
+            json.dump(_team(rotation, months), fh, ensure_ascii=False)
+        try:
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", "--year", str(args.year), "--attempts", str(args.attempts),
+                   "--unavailable", str(args.unavailable), "--reluctant", str(args.reluctant), "--seed", str(args.seed)]
+            out = subprocess.run(cmd, env={**os.environ, "GRAFIK_TEAM_FILE": fh.name}, capture_output=True, text=True, check=True).stdout
+        finally:
+            os.remove(fh.name)
+        r = json.loads(out.strip().splitlines()[-1])
+        cells = r['days'] * r['doctors']
+        print(f"{size:>9}{r['days']:6d}{r['encode_ms']:9.1f}{r['python_us']:11.0f}{r['python_us'] * 1000 / cells:10.1f}"
+              f"{r['numpy_us']:10.1f}{r['numpy_us'] * 1000 / cells:10.2f}{r['audit_ms']:10.2f}{r['daily_ms']:9.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import scheduler
+import scheduler_audit
+import scheduler_numpy
+from pdf_export import create_pdf_bytes, create_daily_pdf_bytes
+from synthetic import period, make_preferences, make_limits
+
+# Pomiary silnika bez Streamlit na syntetycznych preferencjach:
+#   python benchmarks/bench_suite.py --days 61 --unavailable 0.2 --conflicts 3
+#   python benchmarks/bench_suite.py --json nowy.json --compare stary.json
+# Dla każdej funkcji: czasy (p50/p90/p99), szczytowa pamięć (tracemalloc, osobny przebieg),
+# a dla generatorów także próby/s, liczba dni BRAK i wynik.
+
+def _peak_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def _measure(name, fn, repeat, attempts=None):
+    times, out = [], None
+    for k in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(k)
+        times.append(time.perf_counter() - t0)
+    ms = np.array(times) * 1000
+    row = {'name': name, 'p50_ms': float(np.percentile(ms, 50)), 'p90_ms': float(np.percentile(ms, 90)),
+           'p99_ms': float(np.percentile(ms, 99)), 'peak_kb': _peak_kb(lambda: fn(0))}
+    if attempts: row['attempts_s'] = attempts * repeat / sum(times)
+    return row, out
+
+def _quality(row, sch, sts, prefs_map):
+    row['brak'] = sum(1 for v in sch.values() if v == "BRAK")
+    row['score'] = scheduler._score_schedule(sch, sts, prefs_map)
+    return row
+
+def run(args):
+    dates = period(datetime.date.fromisoformat(args.start), args.days)
+    prefs = make_preferences(dates, args.rotation, args.unavailable, args.reluctant, args.fixed, args.conflicts, args.seed)
+    limits = make_limits(dates, prefs, args.rotation)
+    prefs_map = scheduler._build_prefs_map(prefs)
+    rows = []
+
+    row, _ = _measure("PeriodCalendar", lambda k: scheduler.PeriodCalendar(dates), args.repeat)
+    rows.append(row)
+    row, res = _measure("_generate_single_schedule", lambda k: scheduler._generate_single_schedule(
+        dates, prefs_map, limits, None, random.Random(args.seed + k)), args.repeat * 10, attempts=1)
+    rows.append(_quality(row, res[0], res[1], prefs_map))
+
+    best = None
+    for engine in args.engines:
+        for prune in ([False, True] if engine == "numpy" else [False]):
+            name = f"generate_optimized[{engine}{', prune' if prune else ''}]"
+            row, res = _measure(name, lambda k: scheduler.generate_optimized(
+                dates, prefs, limits, None, args.attempts, seed=args.seed + k, engine=engine, prune=prune), args.runs, attempts=args.attempts)
+            rows.append(_quality(row, res[0], res[1], prefs_map))
+            best = best or res
+    sch, sts = best[0], best[1]
+
+    row, _ = _measure("validate_schedule_rules", lambda k: scheduler.validate_schedule_rules(sch, prefs_map, dates, None, limits), args.repeat)
+    rows.append(row)
+    # Audyt paczki kandydatów z silnika numpy (koszt oceny w optymalizatorze)
+    problem = scheduler_numpy.EncodedProblem(dates, prefs_map, limits, None)
+    auditor = scheduler_audit.ScheduleAuditor(dates, prefs_map, None, limits)
+    X = scheduler_numpy.run_batch(problem, next(scheduler_numpy.iter_batches(problem, args.attempts, args.seed))[1])[0]
+    row, _ = _measure(f"ScheduleAuditor.count[{len(X)}]", lambda k: auditor.count(X), args.repeat, attempts=len(X))
+    rows.append(row)
+    row, df_daily = _measure("generate_daily_work", lambda k: scheduler.generate_daily_work(dates, sch, prefs, None), args.repeat)
+    rows.append(row)
+    df_res, stats_df = scheduler.schedule_tables(dates, sch, sts, limits)
+    row, _ = _measure("create_pdf_bytes", lambda k: create_pdf_bytes(df_res, stats_df, "Grafik"), args.repeat)
+    rows.append(row)
+    row, _ = _measure("create_daily_pdf_bytes", lambda k: create_daily_pdf_bytes(df_daily.drop(columns=["_is_red"]), "Harmonogram"), args.repeat)
+    rows.append(row)
+    return rows
+
+def _print(rows, baseline=None):
+    base = {r['name']: r for r in baseline or []}
+    print(f"{'funkcja':<40}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'pamięć KB':>11}{'próby/s':>11}{'BRAK':>6}{'wynik':>11}")
+    for r in rows:
+        line = f"{r['name']:<40}{r['p50_ms']:10.2f}{r['p90_ms']:10.2f}{r['p99_ms']:10.2f}{r['peak_kb']:11.0f}"
+        line += f"{r['attempts_s']:11.0f}" if 'attempts_s' in r else " " * 11
+        line += f"{r['brak']:6d}{r['score']:11d}" if 'score' in r else ""
+        old = base.get(r['name'])
+        if old: line += f"   p50 x{r['p50_ms'] / max(old['p50_ms'], 1e-9):.2f}" + (f", wynik {r['score'] - old['score']:+d}" if 'score' in r and 'score' in old else "")
+        print(line)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", default="2026-03-01")
+    ap.add_argument("--days", type=int, default=61)
+    ap.add_argument("--rotation", type=int, default=None, help=f"lekarze rotacyjni (1-{len(scheduler.ROTATION_DOCTORS)})")
+    ap.add_argument("--unavailable", type=float, default=0.15)
+    ap.add_argument("--reluctant", type=float, default=0.1)
+    ap.add_argument("--fixed", type=float, default=0.1)
+    ap.add_argument("--conflicts", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--attempts", type=int, default=2000)
+    ap.add_argument("--runs", type=int, default=3, help="powtórzenia generate_optimized (kolejne ziarna)")
+    ap.add_argument("--repeat", type=int, default=20, help="powtórzenia pozostałych funkcji")
+    ap.add_argument("--engines", nargs="+", default=scheduler.ENGINES, choices=scheduler.ENGINES)
+    ap.add_argument("--json", help="zapis wyników do pliku")
+    ap.add_argument("--compare", help="wyniki wcześniejszego przebiegu (--json) do porównania")
+    args = ap.parse_args()
+    if args.rotation is not None and not 1 <= args.rotation <= len(scheduler.ROTATION_DOCTORS):
+        ap.error(f"--rotation: 1-{len(scheduler.ROTATION_DOCTORS)} (skład zespołu z {scheduler.TEAM_FILE}, domyślnie team.json)")
+
+    rows = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh: baseline = json.load(fh)['results']
+    _print(rows, baseline)
+    if args.json:
+        with open(args.json, "w") as fh: json.dump({'params': vars(args), 'results': rows}, fh, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import datetime
+import os
+import random
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import scheduler
+from data_deltas import COLUMNS
+
+# Syntetyczne preferencje w formacie data.csv (Data, Lekarz, Status, Przyczyna).
+# rotation: ilu lekarzy rotacyjnych bierze udział (pierwsi z ROTATION_DOCTORS; pozostali
+# niedostępni przez cały okres), unavailable/reluctant: odsetek dni Niedostępny/Niechętnie,
+# fixed: odsetek dni z dyżurem lekarza Fixed, conflicts: liczba dni, w które dwóch
+# lekarzy rotacyjnych zgłasza sztywny dyżur (konflikt losowany w Fazie 1).
+
+def period(start, days):
+    return [start + datetime.timedelta(days=i) for i in range(days)]
+
+def make_preferences(dates, rotation=None, unavailable=0.15, reluctant=0.1, fixed=0.1, conflicts=0, seed=0):
+    rng = random.Random(seed)
+    active = scheduler.ROTATION_DOCTORS[:rotation] if rotation is not None else list(scheduler.ROTATION_DOCTORS)
+    rows = []
+    conflict_days = set(rng.sample(range(len(dates)), min(conflicts, len(dates)))) if len(active) > 1 else set()
+    for i, d in enumerate(dates):
+        d_str = d.strftime('%Y-%m-%d')
+        if scheduler.FIXED_DOCTORS and rng.random() < fixed:
+            rows.append((d_str, rng.choice(scheduler.FIXED_DOCTORS), scheduler.STATUS_FIXED, ""))
+        pair = rng.sample(active, 2) if i in conflict_days else []
+        for doc in scheduler.ROTATION_DOCTORS:
+            if doc in pair: rows.append((d_str, doc, scheduler.STATUS_FIXED, ""))
+            elif doc not in active: rows.append((d_str, doc, scheduler.STATUS_UNAVAILABLE, "Inne"))
+            else:
+                u = rng.random()
+                if u < unavailable: rows.append((d_str, doc, scheduler.STATUS_UNAVAILABLE, rng.choice(scheduler.REASONS[1:])))
+                elif u < unavailable + reluctant: rows.append((d_str, doc, scheduler.STATUS_RELUCTANT, ""))
+                else: rows.append((d_str, doc, scheduler.STATUS_AVAILABLE, ""))
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def make_limits(dates, prefs, rotation=None):
+    # Jak domyślne limity w zakładce Grafik: Fixed = liczba sztywnych dni, reszta po równo (w górę)
+    active = scheduler.ROTATION_DOCTORS[:rotation] if rotation is not None else list(scheduler.ROTATION_DOCTORS)
+    d_strs = {d.strftime('%Y-%m-%d') for d in dates}
+    p = prefs[prefs['Data'].isin(d_strs) & (prefs['Status'] == scheduler.STATUS_FIXED)]
+    limits = {doc: int((p['Lekarz'] == doc).sum()) for doc in scheduler.ALL_DOCTORS}
+    pool = max(0, len(dates) - sum(limits[doc] for doc in scheduler.FIXED_DOCTORS))
+    per_doc = -(-pool // max(1, len(active)))
+    limits.update({doc: max(limits[doc], per_doc) if doc in active else 0 for doc in scheduler.ROTATION_DOCTORS})
+    return limits
@@ -0,0 +1,113 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import scheduler
+import scheduler_audit
+import scheduler_numpy
+from scheduler import ALL_DOCTORS, ROTATION_DOCTORS, SATURDAY_RULE_DOCTORS, STATUS_UNAVAILABLE
+from synthetic import period, make_preferences
+
+# Zgodność ScheduleAuditor z pętlą validate_schedule_rules (wersja sprzed audytora):
+#   python benchmarks/verify_audit.py --cases 400
+# Losowe okresy, preferencje (także lekarz spoza zespołu) i grafiki z celowymi dyżurami dzień
+# po dniu; porównywane komunikaty i ich kolejność. Dalej count() na wierszach silnika NumPy
+# == len(messages()) po dekodowaniu, na końcu czasy.
+
+def reference_rules(schedule, prefs_map, dates, last_duty_prev):
+    violations = []
+
+    for i, d in enumerate(dates):
+        d_str = d.strftime('%Y-%m-%d')
+        doc = schedule.get(d_str)
+
+        if not doc or doc == "BRAK": continue
+
+        # 1. Odpoczynek po dyżurze (11h)
+        prev_d = d - datetime.timedelta(days=1)
+        prev_doc = last_duty_prev if i == 0 else schedule.get(prev_d.strftime('%Y-%m-%d'))
+        if prev_doc == doc:
+            violations.append(f"🔴 {d_str}: {doc} ma dyżur dzień po dniu!")
+
+        # 2. Dyżur w dzień niedostępny
+        status = prefs_map.get(d_str, {}).get(doc, {}).get('Status')
+        if status == STATUS_UNAVAILABLE:
+            reason = prefs_map.get(d_str, {}).get(doc, {}).get('Przyczyna', '')
+            violations.append(f"🔴 {d_str}: {doc} ma dyżur, a zgłosił: Niedostępny ({reason})")
+
+        # 3. Dyżur przed niedostępnością (brak zejścia)
+        next_d = d + datetime.timedelta(days=1)
+        next_s = prefs_map.get(next_d.strftime('%Y-%m-%d'), {}).get(doc, {}).get('Status')
+        if next_s == STATUS_UNAVAILABLE:
+            reason = prefs_map.get(next_d.strftime('%Y-%m-%d'), {}).get(doc, {}).get('Przyczyna', '')
+            violations.append(f"🔴 {d_str}: {doc} ma dyżur przed dniem niedostępnym ({reason})")
+
+        # 4. Reguła sobotnia
+        if doc in SATURDAY_RULE_DOCTORS and d.weekday() == 0:
+            sat = d - datetime.timedelta(days=2)
+            if schedule.get(sat.strftime('%Y-%m-%d')) == doc:
+                violations.append(f"🔴 {d_str}: {doc} ma dyżur w Poniedziałek po pracującej Sobocie!")
+
+    return violations
+
+def random_case(k):
+    rng = random.Random(k)
+    start = datetime.date(2025, rng.choice([1, 3, 5, 7, 9, 11]), 1) + datetime.timedelta(days=rng.choice([0, 0, 5]))
+    dates = period(start, rng.choice([1, 2, 7, 30, 61]))
+    prefs = make_preferences(dates + [dates[-1] + datetime.timedelta(days=1)], unavailable=rng.random() * 0.6, fixed=0.2, conflicts=2, seed=k)
+    if k % 3 == 0:
+        prefs = pd.concat([prefs, pd.DataFrame([{"Data": dates[0].strftime('%Y-%m-%d'), "Lekarz": "Obcy", "Status": STATUS_UNAVAILABLE, "Przyczyna": "Kurs"}])])
+    docs = ALL_DOCTORS + ["BRAK", None, "Obcy"]
+    sch = {d.strftime('%Y-%m-%d'): rng.choice(docs) for d in dates}
+    for d in dates:
+        if rng.random() < 0.2: sch[d.strftime('%Y-%m-%d')] = sch.get((d - datetime.timedelta(days=1)).strftime('%Y-%m-%d'))
+    return dates, {s: doc for s, doc in sch.items() if doc is not None}, scheduler._build_prefs_map(prefs), rng.choice(docs)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data.csv"))
+    ap.add_argument("--cases", type=int, default=400, help="losowe okresy i grafiki")
+    ap.add_argument("--year", type=int, default=2026)
+    ap.add_argument("--month", type=int, default=3)
+    ap.add_argument("--batch", type=int, default=4096, help="wiersze silnika NumPy dla count()")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    mismatches = []
+    for k in range(args.cases):
+        dates, sch, prefs_map, last = random_case(k)
+        if reference_rules(sch, prefs_map, dates, last) != scheduler.validate_schedule_rules(sch, prefs_map, dates, last): mismatches.append(k)
+    print(f"Losowe przypadki: {args.cases - len(mismatches)}/{args.cases} identycznych" + (f" (różne: {mismatches[:10]})" if mismatches else ""))
+
+    prefs_map = scheduler._build_prefs_map(pd.read_csv(args.data).astype({'Data': str}).fillna(""))
+    dates = scheduler.get_period_dates(args.year, args.month)
+    limits = {doc: 11 for doc in ROTATION_DOCTORS}
+    limits.update({doc: 8 for doc in ALL_DOCTORS if doc not in ROTATION_DOCTORS})
+    last = ROTATION_DOCTORS[0] if ROTATION_DOCTORS else None
+    problem = scheduler_numpy.EncodedProblem(dates, prefs_map, limits, last)
+    auditor = scheduler_audit.ScheduleAuditor(dates, prefs_map, last, limits)
+    rows = scheduler_numpy.run_batch(problem, next(scheduler_numpy.iter_batches(problem, args.batch, args.seed))[1])[0]
+    t0 = time.perf_counter()
+    counts = auditor.count(rows)
+    t_count = time.perf_counter() - t0
+    bad_counts = sum(len(auditor.messages(problem.decode(rows[j]))) != counts[j] for j in range(len(rows)))
+    print(f"count() vs messages(): {len(rows) - bad_counts}/{len(rows)} zgodnych, {t_count / len(rows) * 1e6:.1f} us/wiersz")
+
+    sch = problem.decode(rows[0])
+    for name, fn in (("pętla", lambda: reference_rules(sch, prefs_map, dates, last)),
+                     ("audytor", lambda: scheduler.validate_schedule_rules(sch, prefs_map, dates, last)),
+                     ("gotowy", lambda: auditor.messages(sch))):
+        t0 = time.perf_counter()
+        for _ in range(50): fn()
+        print(f"{name:>8}: {(time.perf_counter() - t0) / 50 * 1000:.2f} ms")
+    return 1 if mismatches or bad_counts else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import scheduler
+from scheduler import (
+    ALL_DOCTORS, NO_DAILY_WORK_DOCTORS, NO_OPTOUT_DOCTORS, SATURDAY_RULE_DOCTORS, STATUS_UNAVAILABLE,
+    get_week_key, is_red_day, get_day_description,
+)
+from synthetic import period, make_preferences
+
+# Zgodność macierzowego generate_daily_work z pętlą słownikową (wersja sprzed macierzy statusów):
+#   python benchmarks/verify_daily.py --cases 300
+# Losowe okresy (1-120 dni, także od środka miesiąca), preferencje i grafiki (z BRAK i dniami
+# bez dyżuru) + grafik z data.csv. Porównywane ramki, kolejność kolumn i typy; na końcu czasy.
+
+def reference_daily_work(dates, duty_schedule, preferences_df, last_duty_prev):
+    daily_doctors = [d for d in ALL_DOCTORS if d not in NO_DAILY_WORK_DOCTORS]
+    schedule_map = {d.strftime('%Y-%m-%d'): {doc: "" for doc in daily_doctors} for d in dates}
+    prefs_lookup = {}
+    if not preferences_df.empty:
+        for r in preferences_df.to_dict('records'):
+            d = r['Data']; doc = r['Lekarz']
+            if d not in prefs_lookup: prefs_lookup[d] = {}
+            prefs_lookup[d][doc] = {'Status': r['Status'], 'Przyczyna': r.get('Przyczyna', '')}
+
+    def set_status(date_obj, doc, status): schedule_map[date_obj.strftime('%Y-%m-%d')][doc] = status
+    def get_status(date_obj, doc): return schedule_map[date_obj.strftime('%Y-%m-%d')][doc]
+
+    weeks = {}
+    for d in dates:
+        wk = get_week_key(d)
+        if wk not in weeks: weeks[wk] = []
+        weeks[wk].append(d)
+
+    norma = 7 + (35/60)
+
+    for wk, week_dates in weeks.items():
+        daily_staff_count = {d.strftime('%Y-%m-%d'): 0 for d in week_dates}
+        doc_shift_hours = {doc: 0.0 for doc in daily_doctors}
+
+        for d in week_dates:
+            d_s = d.strftime('%Y-%m-%d')
+            prev_d_s = (d - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+            is_red = is_red_day(d)
+            duty = duty_schedule.get(d_s)
+            duty_prev = last_duty_prev if d == dates[0] else duty_schedule.get(prev_d_s)
+
+            for doc in daily_doctors:
+                user_prefs = prefs_lookup.get(d_s, {}).get(doc, {})
+                status_pref = user_prefs.get('Status')
+                reason = user_prefs.get('Przyczyna')
+
+                if status_pref == STATUS_UNAVAILABLE and reason in ["Urlop", "Kurs"]:
+                    set_status(d, doc, reason)
+                    doc_shift_hours[doc] += norma
+                elif duty == doc:
+                    set_status(d, doc, "DYŻUR 24h")
+                    doc_shift_hours[doc] += 24.0
+                elif duty_prev == doc: set_status(d, doc, "ZEJŚCIE")
+                elif is_red: set_status(d, doc, "Wolne")
+                elif doc in SATURDAY_RULE_DOCTORS and d.weekday() == 0:
+                    last_sat = d - datetime.timedelta(days=2)
+                    if duty_schedule.get(last_sat.strftime('%Y-%m-%d')) == doc: set_status(d, doc, "Wolne (za sobotę)")
+                    else: set_status(d, doc, "TBD")
+                else: set_status(d, doc, "TBD")
+
+        for d in week_dates:
+            count = sum(1 for doc in daily_doctors if get_status(d, doc) == "TBD")
+            daily_staff_count[d.strftime('%Y-%m-%d')] = count
+
+        for doc in NO_OPTOUT_DOCTORS:
+            if doc not in daily_doctors: continue
+            remaining = 48.0 - doc_shift_hours[doc]
+            max_days = int(remaining // norma)
+            candidates = [d for d in week_dates if get_status(d, doc) == "TBD"]
+            if len(candidates) <= max_days:
+                for d in candidates: set_status(d, doc, "7:30 - 15:05")
+            else:
+                candidates.sort(key=lambda x: daily_staff_count[x.strftime('%Y-%m-%d')], reverse=True)
+                num_to_drop = len(candidates) - max_days
+                for d in candidates[:num_to_drop]:
+                    set_status(d, doc, "Wolne (48h)"); daily_staff_count[d.strftime('%Y-%m-%d')] -= 1
+                for d in candidates[num_to_drop:]: set_status(d, doc, "7:30 - 15:05")
+
+        for doc in daily_doctors:
+            for d in week_dates:
+                if get_status(d, doc) == "TBD": set_status(d, doc, "7:30 - 15:05")
+
+    final_data = []
+    for d in dates:
+        row = {"Data": d, "Dzień": get_day_description(d), "_is_red": is_red_day(d)}
+        for doc in daily_doctors: row[doc] = schedule_map[d.strftime('%Y-%m-%d')][doc]
+        final_data.append(row)
+    return pd.DataFrame(final_data)
+
+def random_case(k):
+    rng = random.Random(k)
+    start = datetime.date(2025, rng.choice([1, 3, 5, 7, 9, 11]), 1) + datetime.timedelta(days=rng.choice([0, 0, 5]))
+    dates = period(start, rng.choice([1, 7, 30, 61, 120]))
+    prefs = make_preferences(dates + [dates[-1] + datetime.timedelta(days=1)], unavailable=rng.random() * 0.6, reluctant=0.1, fixed=0.2, conflicts=2, seed=k)
+    docs = ALL_DOCTORS + ["BRAK", None]
+    sch = {d.strftime('%Y-%m-%d'): rng.choice(docs) for d in dates}
+    return dates, {s: doc for s, doc in sch.items() if doc is not None}, prefs, rng.choice(docs)
+
+def same(a, b): return a.equals(b) and list(a.columns) == list(b.columns) and list(a.dtypes) == list(b.dtypes)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(os.path.dirname(__file__), "..", "data.csv"))
+    ap.add_argument("--cases", type=int, default=300, help="losowe okresy i grafiki")
+    ap.add_argument("--year", type=int, default=2026)
+    ap.add_argument("--month", type=int, default=3)
+    ap.add_argument("--attempts", type=int, default=500)
+    args = ap.parse_args()
+
+    mismatches = []
+    for k in range(args.cases):
+        dates, sch, prefs, last = random_case(k)
+        if not same(reference_daily_work(dates, sch, prefs, last), scheduler.generate_daily_work(dates, sch, prefs, last)): mismatches.append(k)
+    print(f"Losowe przypadki: {args.cases - len(mismatches)}/{args.cases} identycznych" + (f" (różne: {mismatches[:10]})" if mismatches else ""))
+
+    prefs = pd.read_csv(args.data).astype({'Data': str}).fillna("")
+    dates = scheduler.get_period_dates(args.year, args.month)
+    sch = scheduler.generate_optimized(dates, prefs, {d: 11 for d in ALL_DOCTORS}, None, args.attempts, engine="numpy")[0]
+    ok = same(reference_daily_work(dates, sch, prefs, None), scheduler.generate_daily_work(dates, sch, prefs, None))
+    print(f"data.csv {dates[0]} - {dates[-1]}: {'identyczne' if ok else 'RÓŻNE'}")
+
+    index = scheduler.PrefIndex(prefs)
+    for name, fn, p in (("pętla", reference_daily_work, prefs), ("macierz", scheduler.generate_daily_work, index)):
+        t0 = time.perf_counter()
+        for _ in range(10): fn(dates, sch, p, None)
+        print(f"{name:>8}: {(time.perf_counter() - t0) * 100:.1f} ms")
+    return 1 if mismatches or not ok else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Procesy puli nie wykonują modułu głównego rodzica:
+#   python benchmarks/verify_pool.py
+# Skrypt bez strażnika __main__ (jak app.py pod Streamlit: __main__.__file__ = skrypt) startuje
+# pulę generatora i trybu wsadowego z wątku (jak JobRunner) i dopisuje wiersz do pliku przy
+# każdym wykonaniu. Oczekiwany jeden wiersz i te same wyniki co przy jednym procesie.
+
+SCRIPT = """
+import sys, threading
+sys.path.insert(0, {root!r})
+with open({marker!r}, "a") as fh: fh.write("run\\n")
+import pandas as pd
+import scheduler, scheduler_batch
+prefs = pd.read_csv({data!r}).astype({{'Data': str}}).fillna("")
+dates = scheduler.get_period_dates(2026, 1)
+limits = {{doc: 11 for doc in scheduler.ALL_DOCTORS}}
+out = {{}}
+def run():
+    for w in (1, {workers}):
+        out[w] = scheduler.generate_optimized(dates, prefs, limits, None, 200, workers=w, seed=3)[0]
+    sc = scheduler_batch.make_scenarios(2026, [1, 1 + scheduler.PERIOD_MONTHS], scheduler.PrefIndex(prefs))
+    out['batch'] = [scheduler_batch.run_scenarios(sc, prefs, p, attempts=100, seed=1)[0].drop(columns=['Czas (s)']) for p in (1, {workers})]
+t = threading.Thread(target=run)
+t.start(); t.join()
+print(out[1] == out[{workers}], out['batch'][0].equals(out['batch'][1]), scheduler._pool_context().get_start_method())
+"""
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(ROOT, "data.csv"))
+    ap.add_argument("--workers", type=int, default=2)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        marker, script = os.path.join(tmp, "runs.txt"), os.path.join(tmp, "unguarded.py")
+        with open(script, "w", encoding="utf-8") as fh:
+            fh.write(SCRIPT.format(root=ROOT, marker=marker, data=os.path.abspath(args.data), workers=args.workers))
+        proc = subprocess.run([sys.executable, script], capture_output=True, text=True, timeout=600)
+        runs = open(marker).read().count("run") if os.path.exists(marker) else 0
+    same_gen, same_batch, method = (proc.stdout.split() + ["?"] * 3)[:3]
+    print(f"Start procesów: {method}, wykonania skryptu głównego: {runs} (oczekiwane 1)")
+    print(f"Wyniki 1 vs {args.workers} procesy: generator {same_gen}, tryb wsadowy {same_batch}")
+    if proc.returncode: print(proc.stderr[-2000:])
+    return 0 if proc.returncode == 0 and runs == 1 and same_gen == same_batch == "True" else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import argparse
+import json
+import sys
+
+import scheduler
+
+# Generowanie grafiku bez Streamlit (np. nocne przebiegi):
+#   python cli.py --prefs data.csv --limits limity.json --year 2026 --month 3 --out grafik.csv --pdf grafik.pdf
+# limity: JSON {"Lekarz": liczba} albo CSV z kolumnami Lekarz,Limit.
+# Kod wyjścia: 0; z --strict 1, gdy zostały dni BRAK albo audyt wykrył naruszenia.
+
+def load_limits(path):
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as fh: raw = json.load(fh)
+    else:
+        import pandas as pd
+        df = pd.read_csv(path)
+        raw = dict(zip(df['Lekarz'], df['Limit']))
+    return {str(doc): int(n) for doc, n in raw.items()}
+
+def load_preferences(path):
+    import pandas as pd
+    df = pd.read_csv(path).astype({'Data': str})
+    if 'Przyczyna' not in df.columns: df['Przyczyna'] = ""
+    return df.fillna("")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Grafik dyżurów - generator bez interfejsu")
+    ap.add_argument("--prefs", required=True, help="preferencje (format data.csv)")
+    ap.add_argument("--limits", required=True, help="limity dyżurów (JSON lub CSV)")
+    ap.add_argument("--year", type=int, required=True)
+    ap.add_argument("--month", type=int, required=True, help="dowolny miesiąc okresu rozliczeniowego")
+    ap.add_argument("--last-duty", default=None, help="dyżurny z dnia przed okresem")
+    ap.add_argument("--engine", default="numpy", choices=scheduler.ENGINES)
+    ap.add_argument("--mode", default="greedy", choices=scheduler.MODES)
+    ap.add_argument("--attempts", type=int, default=5000)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--improve", type=int, default=20000, help="iteracje wyżarzania (0 = wyłączone)")
+    ap.add_argument("--time-budget", type=float, default=None)
+    ap.add_argument("--patience", type=int, default=None)
+    ap.add_argument("--out", help="grafik CSV (Data, Dzień, Dyżurny)")
+    ap.add_argument("--pdf", help="grafik PDF")
+    ap.add_argument("--daily", help="harmonogram pracy CSV")
+    ap.add_argument("--daily-pdf", help="harmonogram pracy PDF")
+    ap.add_argument("--strict", action="store_true")
+    args = ap.parse_args(argv)
+
+    start, _ = scheduler.get_settlement_period_info(args.year, args.month)
+    dates = scheduler.get_period_dates(start.year, start.month)
+    prefs = scheduler.PrefIndex(load_preferences(args.prefs))
+    limits = load_limits(args.limits)
+    report = {}
+    sch, stats, dbg, denied = scheduler.generate_optimized(
+        dates, prefs, limits, args.last_duty, args.attempts, args.workers, args.seed, args.engine, args.improve,
+        report=report, mode=args.mode, time_budget=args.time_budget, patience=args.patience)
+
+    score = scheduler._score_schedule(sch, stats, prefs.by_day)
+    brak = [d for d, doc in sorted(sch.items()) if doc == "BRAK"]
+    audit = scheduler.validate_schedule_rules(sch, prefs.by_day, dates, args.last_duty, limits)
+    print(f"Okres {dates[0]} - {dates[-1]}: wynik {score}, prób {report.get('attempts', 0)}, {report.get('elapsed', 0):.1f} s")
+    for d in brak: print(f"BRAK {d}: " + ", ".join(f"{k}: {v}" for k, v in dbg.get(d, {}).items()))
+    for line in denied: print(f"Konflikt Fixed: {line}")
+    for line in audit: print(f"Audyt: {line}")
+
+    df_res, stats_df = scheduler.schedule_tables(dates, sch, stats, limits)
+    title = f"Grafik {dates[0].strftime('%m.%Y')} - {dates[-1].strftime('%m.%Y')}"
+    if args.out:
+        df_res.drop(columns=["_is_red"]).rename(columns={"Info": "Dzień"}).to_csv(args.out, index=False)
+    if args.pdf or args.daily or args.daily_pdf:
+        df_daily = scheduler.generate_daily_work(dates, sch, prefs, args.last_duty)
+        if args.daily: df_daily.drop(columns=["_is_red"]).to_csv(args.daily, index=False)
+    if args.pdf or args.daily_pdf:
+        from pdf_export import create_pdf_bytes, create_daily_pdf_bytes
+        if args.pdf:
+            with open(args.pdf, "wb") as fh: fh.write(create_pdf_bytes(df_res, stats_df, title))
+        if args.daily_pdf:
+            with open(args.daily_pdf, "wb") as fh: fh.write(create_daily_pdf_bytes(df_daily.drop(columns=["_is_red"]), title.replace("Grafik", "Harmonogram")))
+    return 1 if args.strict and (brak or audit) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
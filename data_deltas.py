@@ -0,0 +1,39 @@
+import datetime
+import json
+import re
+import unicodedata
+import pandas as pd
+
+# --- DZIENNIK ZMIAN (delty do data.csv) ---
+#
+# Każdy zapis lekarza = jeden plik deltas/<czas UTC>-<lekarz>.json:
+#   {"Lekarz": ..., "Daty": [dni okresu], "Wiersze": [{Data, Lekarz, Status, Przyczyna}, ...]}
+# Stan = data.csv + delty w kolejności nazw (czasu): dla każdej delty usuwane są wiersze
+# lekarza z "Daty", potem dopisywane "Wiersze" - dokładnie to, co robił pełny zapis.
+# Kompakcja wpisuje wynik do data.csv i usuwa delty jednym commitem.
+
+DELTA_DIR = "deltas"
+COMPACT_THRESHOLD = 40
+COLUMNS = ["Data", "Lekarz", "Status", "Przyczyna"]
+
+def make_delta(doc, p_strs, rows, now=None):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", unicodedata.normalize('NFKD', doc).encode('ascii', 'ignore').decode()).strip("_") or "lekarz"
+    path = f"{DELTA_DIR}/{now.strftime('%Y%m%dT%H%M%S%f')}-{slug}.json"
+    delta = {"Lekarz": doc, "Daty": sorted(p_strs), "Wiersze": [{c: str(r.get(c, "")) for c in COLUMNS} for r in rows]}
+    return path, json.dumps(delta, ensure_ascii=False)
+
+def parse_delta(text):
+    return json.loads(text)
+
+def merge_rows(df, doc, p_strs, rows):
+    # Wiersze lekarza z dni p_strs zastąpione przez rows; reszta bez zmian
+    keep = ~((df['Lekarz'] == doc) & (df['Data'].isin(p_strs)))
+    return pd.concat([df[keep], pd.DataFrame(list(rows), columns=COLUMNS)], ignore_index=True).fillna("")
+
+def apply_deltas(base, deltas):
+    # deltas: lista (ścieżka, delta); kolejność stosowania = kolejność ścieżek
+    df = base
+    for _, d in sorted(deltas, key=lambda x: x[0]):
+        df = merge_rows(df, d['Lekarz'], d['Daty'], d['Wiersze'])
+    return df
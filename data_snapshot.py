@@ -0,0 +1,45 @@
+import hashlib
+import io
+import numpy as np
+import pandas as pd
+from data_deltas import COLUMNS
+
+# --- MIGAWKA BINARNA data.npz ---
+#
+# Ta sama tabela co data.csv w postaci kodów: Data = int32 (dni od 1970-01-01),
+# Lekarz/Status/Przyczyna = int16 + słownik wartości. csv_sha = sha bloba data.csv, z którego
+# migawka powstała - przy odczycie migawka jest używana tylko, gdy zgadza się z bieżącym CSV.
+# Dekodowanie zwraca zwykłe kolumny tekstowe (wspólne obiekty str na wartość), więc reszta
+# kodu nie odróżnia migawki od CSV.
+
+SNAPSHOT_FILE = "data.npz"
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+def git_blob_sha(data):
+    # sha nadawane przez git/GitHub treści pliku (pozwala powiązać migawkę z CSV przed zapisem)
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def encode_snapshot(df, csv_sha):
+    # None, gdy tabela nie pasuje do formatu (inne kolumny, niepoprawne daty)
+    if sorted(df.columns) != sorted(COLUMNS): return None
+    days = pd.to_datetime(df['Data'], format='%Y-%m-%d', errors='coerce')
+    if days.isna().any(): return None
+    arrays = {'csv_sha': np.array(csv_sha), 'Data': (days.values.astype('datetime64[D]') - _EPOCH).astype(np.int32)}
+    for col in COLUMNS[1:]:
+        codes, cats = pd.factorize(df[col].astype(str))
+        arrays[col] = codes.astype(np.int16)
+        arrays[f"{col}_cats"] = np.array(cats, dtype=str)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+def decode_snapshot(data):
+    # Zwraca (df, csv_sha)
+    with np.load(io.BytesIO(data), allow_pickle=False) as z:
+        uniq, inv = np.unique(z['Data'], return_inverse=True)
+        day_strs = np.array([str(d) for d in (uniq + _EPOCH)], dtype=object)
+        cols = {'Data': day_strs[inv]}
+        for col in COLUMNS[1:]:
+            cats = np.array([str(c) for c in z[f"{col}_cats"]], dtype=object)
+            cols[col] = cats[z[col]] if len(cats) else np.array([], dtype=object)
+        return pd.DataFrame(cols, columns=COLUMNS), str(z['csv_sha'])
@@ -0,0 +1,51 @@
+import json
+from scheduler import ROTATION_DOCTORS, DAY_GROUPS_LIST
+
+# --- SPRAWIEDLIWOŚĆ WIELOOKRESOWA (zagregowane liczniki) ---
+#
+# fairness.json: {"groups": [...], "periods": {"RRRR-MM": {lekarz: [liczby wg groups]}},
+#                 "totals": {lekarz: [...]}}
+# Akceptacja grafiku okresu zmienia "totals" o różnicę względem poprzednio zaakceptowanej
+# wersji tego okresu - bez przeliczania historii. Generator dostaje przesunięcia
+# (totals bez bieżącego okresu, minus minimum grupy): odczyt O(1) na (lekarz, grupa).
+
+FAIRNESS_FILE = "fairness.json"
+
+def empty_store():
+    return {"groups": list(DAY_GROUPS_LIST), "periods": {}, "totals": {}}
+
+def parse_store(text):
+    store = json.loads(text) if text else empty_store()
+    if store.get("groups") != DAY_GROUPS_LIST: raise ValueError("Niezgodne grupy dni w " + FAIRNESS_FILE)
+    return store
+
+def dump_store(store):
+    return json.dumps(store, ensure_ascii=False, sort_keys=True, indent=1)
+
+def period_key(dates):
+    return dates[0].strftime('%Y-%m')
+
+def _add(totals, counts, sign):
+    for doc, vec in counts.items():
+        cur = totals.setdefault(doc, [0] * len(DAY_GROUPS_LIST))
+        totals[doc] = [a + sign * b for a, b in zip(cur, vec)]
+
+def accept_period(store, key, stats):
+    # stats jak z generatora: {lekarz: {'Total': n, grupa: n}}; zwraca nowy magazyn
+    counts = {doc: [int(s.get(g, 0)) for g in DAY_GROUPS_LIST] for doc, s in stats.items()}
+    new = {"groups": list(DAY_GROUPS_LIST), "periods": dict(store["periods"]), "totals": dict(store["totals"])}
+    _add(new["totals"], store["periods"].get(key, {}), -1)
+    _add(new["totals"], counts, 1)
+    new["periods"][key] = counts
+    return new
+
+def history_offsets(store, key=None):
+    # {lekarz rotacyjny: {grupa: n}} - nadwyżka lekarza w grupie względem najmniej obciążonego,
+    # z pominięciem okresu key (ponowne generowanie zaakceptowanego okresu). None = brak historii.
+    totals, own = store["totals"], store["periods"].get(key, {})
+    zero = [0] * len(DAY_GROUPS_LIST)
+    cum = {doc: [a - b for a, b in zip(totals.get(doc, zero), own.get(doc, zero))] for doc in ROTATION_DOCTORS}
+    if not cum: return None
+    low = [min(col) for col in zip(*cum.values())]
+    offs = {doc: {g: v - m for g, v, m in zip(DAY_GROUPS_LIST, vec, low) if v - m} for doc, vec in cum.items()}
+    return {doc: o for doc, o in offs.items() if o} or None
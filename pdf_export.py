@@ -0,0 +1,135 @@
+from fpdf import FPDF
+from scheduler import DOCTOR_COLORS
+
+# --- PDF GENERATOR ---
+
+class PDF(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 14)
+        self.cell(0, 10, 'Grafik Dyzurów - Urologia', 0, 1, 'C')
+        self.ln(5)
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Strona {self.page_no()}', 0, 0, 'C')
+
+def remove_pl_chars(text):
+    if not isinstance(text, str): return str(text)
+    replacements = {'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n', 'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z', 'Ą': 'A', 'Ć': 'C', 'Ę': 'E', 'Ł': 'L', 'Ń': 'N', 'Ó': 'O', 'Ś': 'S', 'Ź': 'Z', 'Ż': 'Z', '🔴': ' ', '⚠️': '!', '✅': 'OK'}
+    for k, v in replacements.items(): text = text.replace(k, v)
+    try: return text.encode('latin-1', 'replace').decode('latin-1')
+    except: return "?"
+
+def create_pdf_bytes(dataframe, stats_dataframe, title):
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+    
+    # Tytuł
+    safe_title = remove_pl_chars(title)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, safe_title, 0, 1, 'L')
+    pdf.ln(5)
+    
+    # Tabela Grafiku
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(35, 8, 'Data', 1)
+    pdf.cell(50, 8, 'Dzien', 1)
+    pdf.cell(80, 8, 'Lekarz', 1)
+    pdf.ln()
+    
+    pdf.set_font("Arial", size=10)
+    for _, row in dataframe.iterrows():
+        d_str = row['Data'].strftime('%Y-%m-%d')
+        day_str = remove_pl_chars(row['Info'])
+        doc_raw = str(row['Dyżurny'])
+        doc_str = remove_pl_chars(doc_raw)
+        
+        is_red = row['_is_red']
+        pdf.set_fill_color(255, 255, 255)
+        if is_red:
+            pdf.set_fill_color(220, 220, 220)
+        
+        pdf.cell(35, 8, d_str, 1, 0, 'L', True)
+        pdf.cell(50, 8, day_str, 1, 0, 'L', True)
+        
+        if doc_raw in DOCTOR_COLORS:
+            r, g, b = DOCTOR_COLORS[doc_raw]
+            pdf.set_fill_color(r, g, b)
+        else:
+             pdf.set_fill_color(255, 255, 255)
+             if doc_raw == "BRAK":
+                 pdf.set_fill_color(255, 150, 150)
+
+        pdf.cell(80, 8, doc_str, 1, 1, 'L', True)
+    
+    # Sekcja Statystyk
+    pdf.ln(10)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Statystyki Dyzurow (Rotacja)", 0, 1, 'L')
+    pdf.ln(2)
+    
+    pdf.set_font("Arial", 'B', 9)
+    cols = list(stats_dataframe.columns)
+    col_width = 180 / len(cols)
+    for col in cols:
+        pdf.cell(col_width, 8, remove_pl_chars(col), 1, 0, 'C')
+    pdf.ln()
+    
+    pdf.set_font("Arial", size=9)
+    pdf.set_fill_color(255, 255, 255)
+    for _, row in stats_dataframe.iterrows():
+        doc_name = str(row['Lekarz'])
+        if doc_name in DOCTOR_COLORS:
+            r, g, b = DOCTOR_COLORS[doc_name]
+            pdf.set_fill_color(r, g, b)
+        else:
+            pdf.set_fill_color(255, 255, 255)
+        pdf.cell(col_width, 8, remove_pl_chars(doc_name), 1, 0, 'C', True)
+        pdf.set_fill_color(255, 255, 255)
+        for col in cols[1:]:
+            pdf.cell(col_width, 8, str(row[col]), 1, 0, 'C', True)
+        pdf.ln()
+
+    return pdf.output(dest='S').encode('latin-1', 'replace')
+
+def create_daily_pdf_bytes(dataframe, title):
+    pdf = PDF(orientation='L')
+    pdf.add_page()
+    pdf.set_font("Arial", size=8)
+    safe_title = remove_pl_chars(title)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, safe_title, 0, 1, 'L')
+    pdf.ln(5)
+    cols = list(dataframe.columns)
+    if "_is_red" in cols: cols.remove("_is_red")
+    page_width = pdf.w - 20
+    date_w = 20; day_w = 25
+    doc_w = (page_width - date_w - day_w) / max(1, (len(cols) - 2))
+    pdf.set_font("Arial", 'B', 8)
+    for col in cols:
+        w = date_w if col == "Data" else (day_w if col == "Dzień" else doc_w)
+        pdf.cell(w, 8, remove_pl_chars(col), 1, 0, 'C')
+    pdf.ln()
+    pdf.set_font("Arial", size=7)
+    for _, row in dataframe.iterrows():
+        fill = row.get('_is_red', False)
+        if fill: pdf.set_fill_color(240, 240, 240)
+        for col in cols:
+            val = row[col]
+            txt = val.strftime('%Y-%m-%d') if col == "Data" else remove_pl_chars(str(val))
+            w = date_w if col == "Data" else (day_w if col == "Dzień" else doc_w)
+            
+            # Kolory w harmonogramie
+            if col in ["Data", "Dzień"]:
+                pdf.set_fill_color(220, 220, 220) if fill else pdf.set_fill_color(255, 255, 255)
+            else:
+                if txt == "ZEJSCIE": pdf.set_fill_color(180, 180, 180)
+                elif "DYZUR" in txt: pdf.set_fill_color(100, 180, 240)
+                elif "Wolne (48h)" in txt: pdf.set_fill_color(240, 100, 100)
+                elif txt in ["Wolne", "Urlop", "Kurs"]: pdf.set_fill_color(255, 215, 0)
+                else: pdf.set_fill_color(255, 255, 255)
+            
+            pdf.cell(w, 6, txt, 1, 0, 'C', True)
+        pdf.ln()
+    return pdf.output(dest='S').encode('latin-1', 'replace')
@@ -0,0 +1,705 @@
+import datetime
+import calendar
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+import multiprocessing
+import multiprocessing.context
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# numpy/pandas importowane w funkcjach, które ich używają: samo `import scheduler` (procesy
+# puli, skrypty, CLI) nie płaci ~0.5 s za pandas
+
+# --- 1. KONFIGURACJA ZESPOŁU ---
+#
+# Skład zespołu i reguły z team.json (inny plik: zmienna GRAFIK_TEAM_FILE):
+#   fixed / rotation - lekarze Fixed i rotacyjni, no_optout - limit 48h w planie pracy,
+#   saturday_rule - wolny poniedziałek po sobotnim dyżurze, no_daily_work - poza planem pracy,
+#   colors - {lekarz: [r, g, b]} w PDF, period_months - długość okresu rozliczeniowego.
+
+TEAM_FILE = os.environ.get("GRAFIK_TEAM_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "team.json"))
+PERIOD_MONTHS_ALLOWED = (1, 2, 3, 4, 6, 12)  # okresy wyrównane do początku roku
+
+def parse_team(raw):
+    team = {"fixed": [], "rotation": [], "no_optout": [], "saturday_rule": [], "no_daily_work": [], "colors": {}, "period_months": 2}
+    team.update(raw)
+    members = team["fixed"] + team["rotation"]
+    for key in ("fixed", "rotation"):
+        if len(set(team[key])) != len(team[key]): raise ValueError(f"{key}: lekarz wpisany więcej niż raz")
+    for key in ("no_optout", "saturday_rule", "no_daily_work"):
+        unknown = set(team[key]) - set(members)
+        if unknown: raise ValueError(f"{key}: spoza zespołu: {', '.join(sorted(unknown))}")
+    if team["period_months"] not in PERIOD_MONTHS_ALLOWED: raise ValueError(f"period_months: jedno z {PERIOD_MONTHS_ALLOWED}")
+    team["colors"] = {doc: tuple(rgb) for doc, rgb in team["colors"].items()}
+    return team
+
+def load_team(path=TEAM_FILE):
+    with open(path, encoding="utf-8") as fh: return parse_team(json.load(fh))
+
+TEAM = load_team()
+FIXED_DOCTORS = TEAM["fixed"]
+ROTATION_DOCTORS = TEAM["rotation"]
+NO_OPTOUT_DOCTORS = TEAM["no_optout"]
+SATURDAY_RULE_DOCTORS = TEAM["saturday_rule"]
+NO_DAILY_WORK_DOCTORS = TEAM["no_daily_work"]
+PERIOD_MONTHS = TEAM["period_months"]
+
+ALL_DOCTORS = list(set(FIXED_DOCTORS + ROTATION_DOCTORS))
+
+STATUS_AVAILABLE = "Chcę dyżur (Dostępny)"
+STATUS_RELUCTANT = "Mogę (Niechętnie)"
+STATUS_UNAVAILABLE = "Niedostępny"
+STATUS_FIXED = "Sztywny Dyżur (Już ustalony)"
+
+REASONS = ["", "Urlop", "Kurs", "Inne"]
+DATA_FILE = "data.csv"
+# "python" - silnik słownikowy (wspólny strumień losowy), "numpy" - wektorowy (blok strumienia na próbę)
+ENGINES = ["python", "numpy"]
+# greedy: losowe restarty; solver: dokładne przeszukiwanie z propagacją (scheduler_solver)
+MODES = ["greedy", "solver"]
+# Zmiana algorytmu lub punktacji = nowa wersja (unieważnia zapisane wyniki w scheduler_cache)
+ENGINE_VERSION = 1
+DAY_GROUPS_LIST = ["Poniedziałki", "Wtorki/Środy", "Czwartki", "Piątki", "Soboty", "Niedziele"]
+
+# --- KOLORY (Dla spójności) ---
+DOCTOR_COLORS = TEAM["colors"]
+
+# --- 3. KALENDARZ I ŚWIĘTA ---
+
+@lru_cache(maxsize=None)
+def get_polish_holidays(year):
+    a = year % 19; b = year // 100; c = year % 100
+    d = b // 4; e = b % 4; f = (b + 8) // 25
+    g = (b - f + 1) // 3; h = (19 * a + b - d - g + 15) % 30
+    i = c // 4; k = c % 4; l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = ((h + l - 7 * m + 114) % 31) + 1
+    easter = datetime.date(year, month, day)
+    
+    holidays = {
+        datetime.date(year, 1, 1): "Nowy Rok",
+        datetime.date(year, 1, 6): "Trzech Króli",
+        easter: "Wielkanoc",
+        easter + datetime.timedelta(days=1): "Poniedziałek Wielkanocny",
+        datetime.date(year, 5, 1): "Święto Pracy",
+        datetime.date(year, 5, 3): "Święto Konstytucji 3 Maja",
+        easter + datetime.timedelta(days=49): "Zielone Świątki",
+        easter + datetime.timedelta(days=60): "Boże Ciało",
+        datetime.date(year, 8, 15): "Wniebowzięcie NMP",
+        datetime.date(year, 11, 1): "Wszystkich Świętych",
+        datetime.date(year, 11, 11): "Święto Niepodległości",
+        datetime.date(year, 12, 25): "Boże Narodzenie (1)",
+        datetime.date(year, 12, 26): "Boże Narodzenie (2)",
+    }
+    return holidays
+
+def is_red_day(date_obj):
+    if date_obj.weekday() >= 5: return True 
+    holidays = get_polish_holidays(date_obj.year)
+    return date_obj in holidays
+
+def get_day_description(date_obj):
+    days_pl = ["Pon", "Wt", "Śr", "Czw", "Pt", "Sob", "Niedz"]
+    day_name = days_pl[date_obj.weekday()]
+    holidays = get_polish_holidays(date_obj.year)
+    if date_obj in holidays: return f"🔴 {day_name} ({holidays[date_obj]})"
+    elif date_obj.weekday() >= 5: return f"🔴 {day_name}"
+    return day_name
+
+def get_settlement_period_info(year, month):
+    start_month = month - (month - 1) % PERIOD_MONTHS
+    start_date = datetime.date(year, start_month, 1)
+    day_names = ['Poniedziałek', 'Wtorek', 'Środa', 'Czwartek', 'Piątek', 'Sobota', 'Niedziela']
+    return start_date, day_names[start_date.weekday()]
+
+def get_period_dates(year, start_month, months=None):
+    dates = []
+    for i in range(months or PERIOD_MONTHS):
+        curr = start_month + i
+        if curr <= 12:
+            nd = calendar.monthrange(year, curr)[1]
+            dates.extend([datetime.date(year, curr, d) for d in range(1, nd + 1)])
+    return dates
+
+def get_week_key(date_obj):
+    p_start, _ = get_settlement_period_info(date_obj.year, date_obj.month)
+    days = (date_obj - p_start).days
+    week_index = days // 7
+    return f"{date_obj.year}_M{p_start.month}_W{week_index}"
+
+def get_day_group(date_obj):
+    wd = date_obj.weekday()
+    if wd == 0: return "Poniedziałki"
+    if wd in [1, 2]: return "Wtorki/Środy"
+    if wd == 3: return "Czwartki"
+    if wd == 4: return "Piątki"
+    if wd == 5: return "Soboty"
+    return "Niedziele"
+
+class PeriodCalendar:
+    # Kalendarz okresu liczony raz (period_calendar pamięta go dla krotki dat); listy po indeksie dnia i:
+    # napis ISO, tydzień (kolejny numer get_week_key), grupa dni, dzień czerwony, święto, opis,
+    # napisy dnia poprzedniego/następnego/soboty przed oraz ich indeksy (-1 = poza okresem).
+    def __init__(self, dates):
+        self.dates = tuple(dates)
+        self.n = len(self.dates)
+        one = datetime.timedelta(days=1)
+        self.pos = {d: i for i, d in enumerate(self.dates)}
+        self.d_strs = [d.strftime('%Y-%m-%d') for d in self.dates]
+        self.prev_strs = [(d - one).strftime('%Y-%m-%d') for d in self.dates]
+        self.next_strs = [(d + one).strftime('%Y-%m-%d') for d in self.dates]
+        self.sat_strs = [(d - 2 * one).strftime('%Y-%m-%d') for d in self.dates]
+        self.prev_i = [self.pos.get(d - one, -1) for d in self.dates]
+        self.next_i = [self.pos.get(d + one, -1) for d in self.dates]
+        self.sat_i = [self.pos.get(d - 2 * one, -1) for d in self.dates]
+        week_keys = {}
+        self.week_i = [week_keys.setdefault(get_week_key(d), len(week_keys)) for d in self.dates]
+        self.week_keys = list(week_keys)
+        self.n_weeks = len(week_keys)
+        self.groups = [get_day_group(d) for d in self.dates]
+        self.group_i = [DAY_GROUPS_LIST.index(g) for g in self.groups]
+        self.holiday = [get_polish_holidays(d.year).get(d, "") for d in self.dates]
+        self.is_red = [d.weekday() >= 5 or bool(h) for d, h in zip(self.dates, self.holiday)]
+        self.is_mon = [d.weekday() == 0 for d in self.dates]
+        self.desc = [get_day_description(d) for d in self.dates]
+
+@lru_cache(maxsize=64)
+def _period_calendar(dates):
+    return PeriodCalendar(dates)
+
+_shared_calendars = {}  # kalendarze przekazane procesowi puli przez initializer (bez ponownego liczenia)
+
+def _install_calendars(calendars):
+    _shared_calendars.update((cal.dates, cal) for cal in calendars)
+
+def period_calendar(dates):
+    key = tuple(dates)
+    return _shared_calendars.get(key) or _period_calendar(key)
+
+# --- 5. ALGORYTM GRAFIKU (SILNIK) ---
+
+REJECT_REASONS = ["Limit", "ND", "Po", "Przed", "Max2(48h)", "Wolne(Sob)"]
+
+class GenerationStats:
+    # Liczniki profilowania (opcjonalne - bez obiektu silniki nic nie mierzą):
+    # czas faz [s], liczba prób, rozkład wyników i odrzucenia kandydatów (powód, lekarz, dzień).
+    # Workery zbierają własne obiekty, scalane przez merge().
+    def __init__(self):
+        self.phase_time = {}
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.scores = Counter()
+        self.rejections = Counter()
+
+    def add_time(self, phase, seconds): self.phase_time[phase] = self.phase_time.get(phase, 0.0) + seconds
+
+    def add_rejections(self, d_str, rej):
+        # rej jak debug_info dnia: {lekarz: powód}; "Przed Urlop" itp. liczone jako "Przed"
+        for doc, reason in rej.items():
+            self.rejections[("Przed" if reason.startswith("Przed") else reason, doc, d_str)] += 1
+
+    def merge(self, other):
+        for phase, t in other.phase_time.items(): self.add_time(phase, t)
+        self.attempts += other.attempts
+        self.scores.update(other.scores)
+        self.rejections.update(other.rejections)
+        return self
+
+    @property
+    def attempts_per_s(self):
+        return self.attempts / self.elapsed if self.elapsed else 0.0
+
+    def score_summary(self):
+        if not self.scores: return {}
+        vals = sorted(self.scores.elements())
+        return {'min': vals[0], 'p50': vals[len(vals) // 2], 'max': vals[-1], 'mean': sum(vals) / len(vals)}
+
+    def rejection_table(self):
+        # DataFrame: Powód, Lekarz, Data, Liczba (malejąco)
+        import pandas as pd
+        rows = [{'Powód': r, 'Lekarz': doc, 'Data': d, 'Liczba': n} for (r, doc, d), n in self.rejections.items()]
+        return pd.DataFrame(rows, columns=['Powód', 'Lekarz', 'Data', 'Liczba']).sort_values('Liczba', ascending=False, ignore_index=True)
+
+def _generate_single_schedule(dates, prefs_map, target_limits, last_duty_prev_period, rng=random, past_counts=None, gen_stats=None):
+    # past_counts: {lekarz: {grupa: n}} z poprzednich okresów (fairness.history_offsets) - doliczane do liczników grup
+    schedule = {} 
+    hist = past_counts or {}
+    cal = period_calendar(dates)
+    if gen_stats is not None: t0 = time.perf_counter()
+    stats = {doc: {'Total': 0, "Poniedziałki": 0, "Wtorki/Środy": 0, "Czwartki": 0, "Piątki": 0, "Soboty": 0, "Niedziele": 0} for doc in ALL_DOCTORS}
+    weekly_counts = {}
+    debug_info = {}
+    denied_fixed_requests = []
+
+    # Faza 1: SZTYWNE DYŻURY
+    for i, d_str in enumerate(cal.d_strs):
+        day_prefs = prefs_map.get(d_str, {})
+        assigned = None
+        
+        # Priorytet 1: Fixed Doctors
+        for doc in FIXED_DOCTORS:
+            if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED:
+                assigned = doc; break
+        
+        # Priorytet 2: Rotation Doctors (o ile Fixed nie zajął)
+        if not assigned:
+            candidates_fixed = [doc for doc in ROTATION_DOCTORS if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
+            if candidates_fixed:
+                assigned = rng.choice(candidates_fixed)
+                for rejected in candidates_fixed:
+                    if rejected != assigned:
+                        denied_fixed_requests.append(f"{d_str}: {rejected} (konflikt z {assigned})")
+        else:
+            conflicting = [doc for doc in ROTATION_DOCTORS if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
+            for cr in conflicting:
+                denied_fixed_requests.append(f"{d_str}: {cr} (nadpisany przez {assigned})")
+
+        if assigned:
+            schedule[d_str] = assigned
+            stats[assigned]['Total'] += 1
+            stats[assigned][cal.groups[i]] += 1
+            wk = cal.week_i[i]
+            if wk not in weekly_counts: weekly_counts[wk] = {}
+            weekly_counts[wk][assigned] = weekly_counts[wk].get(assigned, 0) + 1
+
+    if gen_stats is not None: t1 = time.perf_counter()
+
+    # Faza 2: ROTACJA
+    days_to_fill = [i for i, d_s in enumerate(cal.d_strs) if d_s not in schedule]
+    empty = {}
+    def count_av(i):
+        day_prefs = prefs_map.get(cal.d_strs[i], empty)
+        return sum(1 for doc in ROTATION_DOCTORS if day_prefs.get(doc, empty).get('Status') != STATUS_UNAVAILABLE)
+    days_to_fill.sort(key=lambda x: (count_av(x), rng.random()))
+    sat_rule = set(SATURDAY_RULE_DOCTORS)
+
+    # Kandydat wybierany jednym przejściem (min zamiast sortowania); random() losowany dla
+    # każdego kandydata w tej samej kolejności co przy sortowaniu - ten sam strumień i zwycięzca
+    for i in days_to_fill:
+        d_str = cal.d_strs[i]
+        wk = cal.week_i[i]
+        group = cal.groups[i]
+        best = None
+        rej = {}
+        day_prefs = prefs_map.get(d_str, empty)
+        next_prefs = prefs_map.get(cal.next_strs[i], empty)
+        next_duty_doc = schedule.get(cal.next_strs[i])
+        prev_duty_doc = last_duty_prev_period if i == 0 else schedule.get(cal.prev_strs[i])
+        sat_duty_doc = schedule.get(cal.sat_strs[i]) if cal.is_mon[i] else None
+        week_counts = weekly_counts.get(wk, empty)
+
+        for doc in ROTATION_DOCTORS:
+            total = stats[doc]['Total']
+            if total >= target_limits.get(doc, 0): rej[doc] = "Limit"; continue
+            status = day_prefs.get(doc, empty).get('Status')
+            if status == STATUS_UNAVAILABLE: rej[doc] = "ND"; continue
+            if prev_duty_doc == doc: rej[doc] = "Po"; continue
+            
+            # Blokada przed niedostępnością
+            next_p = next_prefs.get(doc, empty)
+            if next_p.get('Status') == STATUS_UNAVAILABLE:
+                rej[doc] = f"Przed {next_p.get('Przyczyna', 'Wolne')}"
+                continue
+
+            if next_duty_doc == doc: rej[doc] = "Przed"; continue
+            if week_counts.get(doc, 0) >= 2: rej[doc] = "Max2(48h)"; continue
+            if sat_duty_doc == doc and doc in sat_rule: rej[doc] = "Wolne(Sob)"; continue
+
+            w = 10 if status == STATUS_AVAILABLE else (1 if status == STATUS_RELUCTANT else 5)
+            key = (-w, stats[doc][group] + hist.get(doc, empty).get(group, 0), total, rng.random())
+            if best is None or key < best[0]: best = (key, doc)
+
+        if gen_stats is not None and rej: gen_stats.add_rejections(d_str, rej)
+        if best is not None:
+            chosen = best[1]
+            schedule[d_str] = chosen
+            stats[chosen]['Total'] += 1
+            stats[chosen][group] += 1
+            if wk not in weekly_counts: weekly_counts[wk] = {}
+            weekly_counts[wk][chosen] = weekly_counts[wk].get(chosen, 0) + 1
+        else:
+            schedule[d_str] = "BRAK"
+            debug_info[d_str] = rej
+
+    if gen_stats is not None:
+        t2 = time.perf_counter()
+        gen_stats.add_time("Faza 1", t1 - t0); gen_stats.add_time("Faza 2", t2 - t1)
+        gen_stats.attempts += 1
+    return schedule, stats, debug_info, denied_fixed_requests
+
+# --- WALIDACJA KOŃCOWA (AUDYT) ---
+def validate_schedule_rules(schedule, prefs_map, dates, last_duty_prev, limits=None):
+    # Reguły dnia (dzień po dniu, Niedostępny, przed niedostępnością, sobota -> poniedziałek);
+    # z limits także maks. 2 w tygodniu i limit okresu lekarzy rotacyjnych. Patrz scheduler_audit.
+    import scheduler_audit
+    return scheduler_audit.ScheduleAuditor(dates, prefs_map, last_duty_prev, limits).messages(schedule)
+
+def _violations(dates, prefs_map, last_duty_prev, limits, schedule):
+    import scheduler_audit
+    aud = scheduler_audit.ScheduleAuditor(dates, prefs_map, last_duty_prev, limits)
+    return int(aud.count(aud.encode(schedule)[0])[0])
+
+class PrefIndex:
+    # Jeden indeks preferencji na migawkę danych, wspólny dla UI, generatora, audytu i planu pracy:
+    #   by_day[data][lekarz] = {'Status', 'Przyczyna'} (format prefs_map, O(1) po dniu i lekarzu),
+    #   doctor_rows(lekarz, dni) = wektorowy wycinek wierszy lekarza (grupowanie raz, leniwie).
+    def __init__(self, df):
+        self.df = df
+        self.empty = df.empty
+        self.by_day = {}
+        self._by_doc = None
+        if not df.empty:
+            reasons = df['Przyczyna'] if 'Przyczyna' in df.columns else [''] * len(df)
+            for d, doc, status, reason in zip(df['Data'], df['Lekarz'], df['Status'], reasons):
+                self.by_day.setdefault(d, {})[doc] = {'Status': status, 'Przyczyna': reason}
+
+    def get(self, d_str, doc):
+        return self.by_day.get(d_str, {}).get(doc)
+
+    def doctor_rows(self, doc, d_strs=None):
+        if self._by_doc is None:
+            self._by_doc = dict(tuple(self.df.groupby('Lekarz', sort=False))) if not self.empty else {}
+        rows = self._by_doc.get(doc, self.df.iloc[0:0])
+        return rows if d_strs is None else rows[rows['Data'].isin(d_strs)]
+
+    def period_rows(self, d_strs):
+        return self.df[self.df['Data'].isin(d_strs)]
+
+def _build_prefs_map(df):
+    return (df if isinstance(df, PrefIndex) else PrefIndex(df)).by_day
+
+def _schedule_stats(dates, sch):
+    stats = {doc: {'Total': 0, **{g: 0 for g in DAY_GROUPS_LIST}} for doc in ALL_DOCTORS}
+    cal = period_calendar(dates)
+    for d_str, group in zip(cal.d_strs, cal.groups):
+        doc = sch.get(d_str)
+        if doc in stats:
+            stats[doc]['Total'] += 1
+            stats[doc][group] += 1
+    return stats
+
+def _score_schedule(sch, sts, prefs_map, past_counts=None):
+    score = sum(1000000 for v in sch.values() if v != "BRAK")
+    hist = past_counts or {}
+    for g in DAY_GROUPS_LIST:
+        cnts = [sts[d][g] + hist.get(d, {}).get(g, 0) for d in ROTATION_DOCTORS]
+        if cnts:
+            diff = max(cnts) - min(cnts)
+            score -= diff * 1000 
+    pref_score = 0
+    for d_str, doc in sch.items():
+        if doc in ROTATION_DOCTORS and doc != "BRAK":
+            s = prefs_map.get(d_str, {}).get(doc, {}).get('Status', STATUS_AVAILABLE)
+            if s == STATUS_AVAILABLE: pref_score += 50
+            elif s == STATUS_RELUCTANT: pref_score -= 50
+    return score + pref_score
+
+def _run_attempts(dates, prefs_map, limits, last_duty_prev, attempts, seed, problem=None, prune=False, past_counts=None, profile=False):
+    # Jeden worker = jeden ziarnisty strumień losowy -> wynik powtarzalny.
+    # Zwraca (wynik, grafik, {faza: liczba odciętych prób}, GenerationStats albo None)
+    pruned = {}
+    prof = GenerationStats() if profile else None
+    if problem is not None:
+        import scheduler_numpy
+        return (*scheduler_numpy.run_attempts(problem, attempts, seed, prune, pruned, prof), pruned, prof)
+    rng = random.Random(seed)
+    best_res = None
+    best_score = -float('inf')
+    for _ in range(attempts):
+        sch, sts, dbg, denied = _generate_single_schedule(dates, prefs_map, limits, last_duty_prev, rng, past_counts, prof)
+        score = _score_schedule(sch, sts, prefs_map, past_counts)
+        if prof is not None: prof.scores[score] += 1
+        if score > best_score:
+            best_score = score
+            best_res = (sch, sts, dbg, denied)
+    return best_score, best_res, pruned, prof
+
+ROUND_ATTEMPTS = {"numpy": 4096, "python": 512}  # próby na worker w rundzie trybu z budżetem
+
+def _worker_seed(seed, worker_idx):
+    # Worker 0 dostaje bazowe ziarno, więc tryb 1-procesowy = dotychczasowy wynik
+    return seed + worker_idx * 1000003
+
+def _split_attempts(attempts, workers):
+    return [attempts // workers + (1 if k < attempts % workers else 0) for k in range(workers)]
+
+# Pule startowane z wątków (serwer Streamlit, JobRunner): fork wielowątkowego procesu może
+# skopiować zajęte blokady i zawiesić potomka, więc forkserver (Linux/macOS, scheduler już
+# zaimportowany w serwerze) albo spawn. Oba uruchamiają w potomku moduł główny rodzica
+# (pod Streamlit to app.py: całe UI i zapytania do GitHuba) - na czas startu procesu
+# sys.modules['__main__'] jest więc podmieniany na pusty moduł. Zadania puli to funkcje
+# z modułów, nie z __main__.
+
+_spawn_lock = threading.Lock()
+
+def _start_without_main(start):
+    with _spawn_lock:
+        main, blank = sys.modules.get('__main__'), types.ModuleType("__main__")
+        sys.modules['__main__'] = blank
+        try: start()
+        finally:
+            # Streamlit ustawia własny __main__ przy każdym przebiegu skryptu - nie nadpisywać nowszego
+            if sys.modules.get('__main__') is blank and main is not None: sys.modules['__main__'] = main
+
+class _SpawnProcess(multiprocessing.context.SpawnProcess):
+    def start(self): _start_without_main(super().start)
+
+class _SpawnContext(multiprocessing.context.SpawnContext):
+    Process = _SpawnProcess
+
+if sys.platform != "win32":
+    class _ForkServerProcess(multiprocessing.context.ForkServerProcess):
+        def start(self): _start_without_main(super().start)
+
+    class _ForkServerContext(multiprocessing.context.ForkServerContext):
+        Process = _ForkServerProcess
+
+def _pool_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = _ForkServerContext()
+        ctx.set_forkserver_preload(["scheduler"])
+        return ctx
+    return _SpawnContext()
+
+def _encode_problem(engine, dates, prefs_map, limits, last_duty_prev, past_counts=None):
+    if engine not in ENGINES: raise ValueError(f"Nieznany silnik: {engine}")
+    if engine == "python": return None
+    return _encoded(dates, prefs_map, limits, last_duty_prev, past_counts)
+
+def _encoded(dates, prefs_map, limits, last_duty_prev, past_counts=None):
+    import scheduler_numpy
+    return scheduler_numpy.EncodedProblem(dates, prefs_map, limits, last_duty_prev, past_counts)
+
+def iter_optimized(dates, df, limits, last_duty_prev, attempts=5000, workers=1, seed=42, engine="python", improve_iterations=0, prune=False, report=None, mode="greedy", solver_nodes=200000, time_budget=None, patience=None, past_counts=None, profile=None):
+    # Optymalizacja "anytime": po każdej rundzie prób zwraca słownik postępu z najlepszym
+    # dotąd grafikiem ('result'), wynikiem, historią i ułamkiem zużytego budżetu.
+    # Bez time_budget/patience jest jedna runda = dokładnie attempts prób (jak dotąd).
+    # time_budget [s]: limit czasu; patience: stop po tylu próbach bez poprawy;
+    # attempts = 0/None przy budżecie = bez limitu prób.
+    # prune: branch-and-bound (tylko silnik numpy - niezależne bloki strumienia na próbę,
+    # więc odcięcie próby nie zmienia zwycięzcy). Liczenie ograniczeń kosztuje więcej,
+    # niż oszczędza odcięcie wierszy paczki (data.csv: wolniej) - opcja do benchmarków, nie w UI. report: słownik na liczniki odcięć i liczbę naruszeń reguł końcowego grafiku ('violations').
+    # mode="solver": pełne pokrycie z solvera dokładnego albo dowód, że nie istnieje
+    # (wtedy zwykłe losowe restarty); sprawiedliwość poprawia wyżarzanie.
+    # past_counts: liczniki grup z poprzednich okresów - rozrzut liczony od sum skumulowanych.
+    # profile: GenerationStats do wypełnienia (czasy faz, wyniki, odrzucenia); None = bez pomiarów.
+    if prune and engine != "numpy": raise ValueError("Przycinanie prób wymaga silnika numpy")
+    if mode not in MODES: raise ValueError(f"Nieznany tryb: {mode}")
+    t0 = time.perf_counter()
+    prefs_map = _build_prefs_map(df)
+    problem = _encode_problem(engine, dates, prefs_map, limits, last_duty_prev, past_counts)
+    anytime = bool(time_budget) or bool(patience)
+    cap = attempts or (None if anytime else 0)
+    history = []
+
+    def progress(done, best_score, best_res, fraction, stop=None):
+        return {'attempts': done, 'elapsed': time.perf_counter() - t0, 'best_score': best_score, 'result': best_res,
+                'history': list(history), 'fraction': min(1.0, fraction), 'stop': stop}
+
+    def improved(res, stop, done):
+        # Opcjonalna poprawa lokalna najlepszego grafiku (wyżarzanie)
+        nonlocal problem
+        if improve_iterations > 0 and res:
+            import scheduler_search
+            if problem is None: problem = _encoded(dates, prefs_map, limits, last_duty_prev, past_counts)
+            t_sa = time.perf_counter()
+            res = scheduler_search.improve_schedule(problem, res, improve_iterations, seed)
+            if profile is not None: profile.add_time("Wyżarzanie", time.perf_counter() - t_sa)
+        score = _score_schedule(res[0], res[1], prefs_map, past_counts) if res else None
+        if report is not None and res: report['violations'] = _violations(dates, prefs_map, last_duty_prev, limits, res[0])
+        if score is not None: history.append((done, time.perf_counter() - t0, score))
+        return progress(done, score, res, 1.0, stop)
+
+    if mode == "solver":
+        import scheduler_solver
+        if problem is None: problem = _encoded(dates, prefs_map, limits, last_duty_prev, past_counts)
+        t_sv = time.perf_counter()
+        status, best_res, nodes = scheduler_solver.solve_schedule(problem, node_limit=solver_nodes, time_limit=time_budget)
+        if profile is not None: profile.add_time("Solver", time.perf_counter() - t_sv)
+        if report is not None: report['solver'] = {'status': status, 'nodes': nodes}
+        if best_res:
+            if report is not None: report.update({'attempts': 0, 'stop': "solver", 'elapsed': time.perf_counter() - t0})
+            yield improved(best_res, "solver", 0)
+            return
+        if engine == "python": problem = None
+
+    workers = max(1, int(workers))
+    if cap is not None: workers = max(1, min(workers, cap))
+    # Stały rozmiar rundy na worker (~0.25 s pracy): postęp i warunki stopu sprawdzane na bieżąco,
+    # a podział prób na rundy i ziarna nie zależą od obciążenia maszyny - przy stopie na limicie
+    # prób albo braku poprawy wynik jest powtarzalny. Czas decyduje tylko o starcie kolejnej rundy.
+    per_worker = ROUND_ATTEMPTS["numpy" if problem is not None else "python"]
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) if workers > 1 else None
+    best_res = None
+    best_score = -float('inf')
+    pruned = {}
+    done, since_best, rnd, stop = 0, 0, 0, None
+    try:
+        while True:
+            n_round = (cap - done) if not anytime else per_worker * workers
+            if cap is not None: n_round = min(n_round, cap - done)
+            if n_round <= 0:
+                stop = "limit prób"
+                break
+            chunks = [c for c in _split_attempts(n_round, workers) if c]
+            # Runda 0 = dotychczasowe ziarna workerów; kolejne rundy = nowe strumienie
+            seeds = [_worker_seed(seed, rnd * workers + k) for k in range(len(chunks))]
+            t_round = time.perf_counter()
+            if pool is None:
+                results = [_run_attempts(dates, prefs_map, limits, last_duty_prev, chunks[0], seeds[0], problem, prune, past_counts, profile is not None)]
+            else:
+                futures = [pool.submit(_run_attempts, dates, prefs_map, limits, last_duty_prev, n, sd, problem, prune, past_counts, profile is not None) for n, sd in zip(chunks, seeds)]
+                results = [f.result() for f in futures]
+            round_time = time.perf_counter() - t_round
+
+            # Scalanie: ta sama punktacja, remis wygrywa wcześniejsza runda / niższy worker
+            better = False
+            for score, res, w_pruned, w_prof in results:
+                if score > best_score:
+                    best_score, best_res, better = score, res, True
+                for phase, cnt in w_pruned.items(): pruned[phase] = pruned.get(phase, 0) + cnt
+                if w_prof is not None: profile.merge(w_prof)
+            if profile is not None: profile.elapsed += round_time
+            done += n_round
+            since_best = 0 if better else since_best + n_round
+            rnd += 1
+            elapsed = time.perf_counter() - t0
+            if best_res is not None and (better or not history): history.append((done, elapsed, best_score))
+
+            fraction = 0.0
+            if time_budget: fraction = max(fraction, elapsed / time_budget)
+            if cap: fraction = max(fraction, done / cap)
+            if patience: fraction = max(fraction, since_best / patience)
+            if not anytime or (cap is not None and done >= cap): stop = "limit prób"
+            elif time_budget and elapsed >= time_budget: stop = "budżet czasu"
+            elif patience and since_best >= patience: stop = "brak poprawy"
+            if stop: break
+            yield progress(done, best_score, best_res, fraction)
+    finally:
+        if pool is not None: pool.shutdown()
+
+    if report is not None:
+        report.update({'attempts': done, 'pruned': dict(sorted(pruned.items())), 'pruned_total': sum(pruned.values()),
+                       'stop': stop, 'elapsed': time.perf_counter() - t0})
+    yield improved(best_res, stop, done)
+
+def generate_optimized(dates, df, limits, last_duty_prev, attempts=5000, workers=1, seed=42, engine="python", improve_iterations=0, prune=False, report=None, mode="greedy", solver_nodes=200000, time_budget=None, patience=None, past_counts=None, profile=None):
+    # Wersja blokująca iter_optimized: zwraca tylko końcowy (sch, sts, dbg, denied)
+    last = None
+    for last in iter_optimized(dates, df, limits, last_duty_prev, attempts, workers, seed, engine, improve_iterations, prune, report, mode, solver_nodes, time_budget, patience, past_counts, profile):
+        pass
+    return last['result'] if last else None
+
+def repair_schedule(dates, df, limits, last_duty_prev, sch, changed, report=None, past_counts=None):
+    # Naprawa istniejącego grafiku sch po zmianie preferencji (df = dane już po zmianie).
+    # changed: zmienione wiersze (DataFrame / słowniki z 'Data') albo same daty.
+    # Przeliczane są tylko te dni z sąsiedztwem - patrz scheduler_solver.repair_schedule.
+    import scheduler_solver
+    if hasattr(changed, 'columns'): changed = changed.to_dict('records')
+    changed_strs = {str(r['Data'] if isinstance(r, dict) else r)[:10] for r in changed}
+    prefs_map = _build_prefs_map(df)
+    problem = _encoded(dates, prefs_map, limits, last_duty_prev, past_counts)
+    days = [i for i, s in enumerate(problem.d_strs) if s in changed_strs]
+    # "Przed": niedostępność dnia po okresie dotyczy ostatniego dnia okresu
+    after = period_calendar(dates).next_strs[-1] if dates else None
+    if after in changed_strs: days.append(len(dates) - 1)
+    if not days:
+        if report is not None: report.update({'status': None, 'scope': None, 'nodes': 0, 'freed': [], 'changed': []})
+        return sch, _schedule_stats(dates, sch), {}, []
+    out = scheduler_solver.repair_schedule(problem, sch, days, report=report)
+    if report is not None: report['violations'] = _violations(dates, prefs_map, last_duty_prev, limits, out[0])
+    return out
+
+def schedule_tables(dates, sch, stats, limits):
+    # Tabele wyniku jak w zakładce Grafik: (grafik: Data, Info, Dyżurny, _is_red; statystyki rotacji)
+    import pandas as pd
+    cal = period_calendar(dates)
+    df_res = pd.DataFrame([{"Data": d, "Info": cal.desc[i], "Dyżurny": sch.get(cal.d_strs[i], "BRAK"), "_is_red": cal.is_red[i]} for i, d in enumerate(cal.dates)])
+    s_rows = []
+    for d in ROTATION_DOCTORS:
+        row = {"Lekarz": d, "Cel": limits.get(d,0), "Wynik": int(stats[d]['Total'])}
+        for k,v in stats[d].items(): 
+            if k!='Total': row[k] = int(v)
+        s_rows.append(row)
+    return df_res, pd.DataFrame(s_rows).fillna("-")
+
+# --- 6. HARMONOGRAM PRACY ---
+
+# Kody komórek planu (macierz dni x lekarze); TBD = dzień pracy do rozstrzygnięcia limitem 48h
+(DW_TBD, DW_URLOP, DW_KURS, DW_DUTY, DW_ZEJSCIE, DW_RED, DW_SAT, DW_WORK, DW_48H) = range(9)
+DAILY_LABELS = ("TBD", "Urlop", "Kurs", "DYŻUR 24h", "ZEJŚCIE", "Wolne", "Wolne (za sobotę)", "7:30 - 15:05", "Wolne (48h)")
+
+def generate_daily_work(dates, duty_schedule, preferences_df, last_duty_prev):
+    import numpy as np
+    import pandas as pd
+    daily_doctors = [d for d in ALL_DOCTORS if d not in NO_DAILY_WORK_DOCTORS]
+    prefs_lookup = _build_prefs_map(preferences_df)
+    n, m = len(dates), len(daily_doctors)
+    col = {doc: j for j, doc in enumerate(daily_doctors)}
+    cal = period_calendar(dates)
+
+    # Wektory dni: dyżurny dnia, poprzedniego dnia i soboty przed (indeks kolumny, -1 = inny/brak)
+    d_strs = cal.d_strs
+    def duty_col(doc): return col.get(doc, -1)
+    duty = np.array([duty_col(duty_schedule.get(s)) for s in d_strs], dtype=np.int64)
+    duty_prev = np.array([duty_col(last_duty_prev if i == 0 else duty_schedule.get(s)) for i, s in enumerate(cal.prev_strs)], dtype=np.int64)
+    sat_duty = np.array([duty_col(duty_schedule.get(s)) for s in cal.sat_strs], dtype=np.int64)
+    is_red = np.array(cal.is_red, dtype=bool)
+    is_mon = np.array(cal.is_mon, dtype=bool)
+    week = np.array(cal.week_i, dtype=np.int64)
+
+    leave = np.full((n, m), DW_TBD, dtype=np.int8)
+    for i, s in enumerate(d_strs):
+        for doc, p in prefs_lookup.get(s, {}).items():
+            j = col.get(doc)
+            if j is not None and p.get('Status') == STATUS_UNAVAILABLE and p.get('Przyczyna') in ("Urlop", "Kurs"):
+                leave[i, j] = DW_URLOP if p['Przyczyna'] == "Urlop" else DW_KURS
+
+    # Kolejność warunków jak w regułach: urlop/kurs > dyżur > zejście > dzień wolny > sobota
+    docs = np.arange(m)
+    is_duty = duty[:, None] == docs
+    sat_rule = np.array([doc in SATURDAY_RULE_DOCTORS for doc in daily_doctors], dtype=bool)
+    status = np.select(
+        [leave != DW_TBD, is_duty, duty_prev[:, None] == docs, np.broadcast_to(is_red[:, None], (n, m)),
+         is_mon[:, None] & sat_rule[None, :] & (sat_duty[:, None] == docs)],
+        [leave, DW_DUTY, DW_ZEJSCIE, DW_RED, DW_SAT], DW_TBD).astype(np.int8)
+
+    # Godziny tygodnia: urlop/kurs = norma, dyżur = 24h; obsada dnia = liczba TBD
+    norma = 7 + (35/60)
+    n_weeks = cal.n_weeks
+    leave_days = np.zeros((n_weeks, m), dtype=np.int64)
+    duty_days = np.zeros((n_weeks, m), dtype=np.int64)
+    np.add.at(leave_days, week, (status == DW_URLOP) | (status == DW_KURS))
+    np.add.at(duty_days, week, status == DW_DUTY)
+    max_days = ((48.0 - (leave_days * norma + duty_days * 24.0)) // norma).astype(np.int64)
+    staff = (status == DW_TBD).sum(axis=1)
+
+    # Limit 48h: lekarze bez opt-out po kolei; w każdym tygodniu wolne dostają dni z największą obsadą
+    for doc in NO_OPTOUT_DOCTORS:
+        j = col.get(doc)
+        if j is None: continue
+        cand = np.flatnonzero(status[:, j] == DW_TBD)
+        if not len(cand): continue
+        cw = week[cand]
+        order = cand[np.lexsort((cand, -staff[cand], cw))]
+        ow = week[order]
+        rank = np.arange(len(order)) - np.searchsorted(ow, ow)
+        n_cand = np.bincount(cw, minlength=n_weeks)
+        drop = np.where(n_cand <= max_days[:, j], 0, n_cand - max_days[:, j])
+        dropped = order[rank < drop[ow]]
+        status[cand, j] = DW_WORK
+        status[dropped, j] = DW_48H
+        staff[dropped] -= 1
+
+    status[status == DW_TBD] = DW_WORK
+    data = {"Data": dates, "Dzień": cal.desc, "_is_red": list(cal.is_red)}
+    labels = np.array(DAILY_LABELS, dtype=object)
+    for doc, j in col.items(): data[doc] = labels[status[:, j]]
+    return pd.DataFrame(data, columns=["Data", "Dzień", "_is_red"] + daily_doctors)
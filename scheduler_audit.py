@@ -0,0 +1,125 @@
+import numpy as np
+from scheduler import ROTATION_DOCTORS, FIXED_DOCTORS, SATURDAY_RULE_DOCTORS, STATUS_UNAVAILABLE, period_calendar
+from scheduler_numpy import NONE, BRAK
+
+# --- AUDYT REGUŁ (wektorowo) ---
+#
+# Dane okresu kodowane raz (jak EncodedProblem: lekarze rotacyjni, potem Fixed; -1 = brak
+# wpisu, -2 = BRAK), potem dowolnie wiele grafików - słownik (messages) albo paczka
+# zakodowanych wierszy (A, n) z silnika (count). Reguły dnia: dyżur dzień po dniu,
+# dyżur w dzień niedostępny, dyżur przed niedostępnością, sobota -> poniedziałek.
+# Z limits także reguły generatora dla lekarzy rotacyjnych: maks. 2 w tygodniu i limit okresu.
+
+class ScheduleAuditor:
+    def __init__(self, dates, prefs_map, last_duty_prev, limits=None):
+        self.dates = list(dates)
+        cal = self.cal = period_calendar(self.dates)
+        self.prefs_map = prefs_map
+        self.doctors = list(ROTATION_DOCTORS) + [d for d in FIXED_DOCTORS if d not in ROTATION_DOCTORS]
+        self.doc_idx = {d: k for k, d in enumerate(self.doctors)}
+        n, D, R = len(self.dates), len(self.doctors), len(ROTATION_DOCTORS)
+        self.n, self.D, self.R = n, D, R
+        self.d_strs = cal.d_strs
+
+        # Kolumny dodatkowe kodu grafiku: n = dyżur z poprzedniego okresu, n + 1 = poza okresem
+        self.last_prev = self.doc_idx.get(last_duty_prev, NONE) if last_duty_prev else NONE
+        self.last_duty_prev = last_duty_prev
+        self.prev_i = np.array([n + 1 if k < 0 else k for k in cal.prev_i], dtype=np.intp)
+        if n: self.prev_i[0] = n
+        self.sat_i = np.array([n + 1 if k < 0 else k for k in cal.sat_i], dtype=np.intp)
+        self.is_mon = np.array(cal.is_mon, dtype=bool)
+        self.sat_rule = np.array([d in SATURDAY_RULE_DOCTORS for d in self.doctors] + [False], dtype=bool)
+
+        # Niedostępność w dniu i dniu następnym; kolumna D = lekarz spoza zespołu (brak wpisów)
+        self.nd = np.zeros((n, D + 1), dtype=bool)
+        self.nd_next = np.zeros((n, D + 1), dtype=bool)
+        for arr, days in ((self.nd, self.d_strs), (self.nd_next, cal.next_strs)):
+            for i, s in enumerate(days):
+                for doc, p in prefs_map.get(s, {}).items():
+                    k = self.doc_idx.get(doc)
+                    if k is not None and p.get('Status') == STATUS_UNAVAILABLE: arr[i, k] = True
+
+        self.week_i = np.array(cal.week_i, dtype=np.intp)
+        self.n_weeks = cal.n_weeks
+        self.week_first = [self.d_strs[int(np.argmax(self.week_i == w))] for w in range(self.n_weeks)]
+        self.limits = np.array([limits.get(d, 0) for d in ROTATION_DOCTORS], dtype=np.int64) if limits is not None else None
+
+    def encode(self, sch):
+        # Słownik grafiku -> wiersz kodów (n,); lekarz spoza zespołu = kod D + kolejny numer
+        extra = {}
+        row = np.empty(self.n, dtype=np.int64)
+        for i, s in enumerate(self.d_strs):
+            doc = sch.get(s)
+            if not doc: row[i] = NONE
+            elif doc == "BRAK": row[i] = BRAK
+            else:
+                k = self.doc_idx.get(doc)
+                row[i] = k if k is not None else self.D + extra.setdefault(doc, len(extra))
+        return row, extra
+
+    def day_rules(self, X, last_prev=None):
+        # X (A, n) -> 4 maski (A, n): dzień po dniu, niedostępny, przed niedostępnym, sobota
+        X = np.atleast_2d(X)
+        A = len(X)
+        lp = self.last_prev if last_prev is None else last_prev
+        ext = np.concatenate([X, np.full((A, 1), lp, dtype=np.int64), np.full((A, 1), NONE, dtype=np.int64)], axis=1)
+        on = X >= 0
+        k = np.minimum(np.where(on, X, self.D), self.D)
+        rows = np.arange(self.n)
+        back = on & (X == ext[:, self.prev_i])
+        nd = on & self.nd[rows, k]
+        before = on & self.nd_next[rows, k]
+        sat = on & self.is_mon & self.sat_rule[k] & (X == ext[:, self.sat_i])
+        return back, nd, before, sat
+
+    def generator_rules(self, X):
+        # (tygodnie (A, W, R), sumy (A, R)) dla lekarzy rotacyjnych
+        X = np.atleast_2d(X)
+        rot = (X >= 0) & (X < self.R)
+        A = len(X)
+        wk = np.zeros((A, self.n_weeks, self.R), dtype=np.int64)
+        a, i = np.nonzero(rot)
+        np.add.at(wk, (a, self.week_i[i], X[a, i]), 1)
+        return wk, wk.sum(axis=1)
+
+    def count(self, X):
+        # Liczba naruszeń na wiersz (A,) - do oceny kandydatów w optymalizatorze
+        X = np.atleast_2d(X)
+        total = sum(m.sum(axis=1) for m in self.day_rules(X))
+        if self.limits is not None:
+            wk, tot = self.generator_rules(X)
+            total = total + (wk > 2).sum(axis=(1, 2)) + (tot > self.limits).sum(axis=1)
+        return total
+
+    def messages(self, sch):
+        # Te same komunikaty co pętla dzień po dniu (kolejność: data, potem reguła)
+        row, extra = self.encode(sch)
+        lp = self.last_prev
+        if lp == NONE and self.last_duty_prev and self.last_duty_prev != "BRAK":
+            lp = self.D + extra.setdefault(self.last_duty_prev, len(extra))
+        names = self.doctors + list(extra)
+        back, nd, before, sat = (m[0] for m in self.day_rules(row[None, :], lp))
+        next_strs = self.cal.next_strs
+        for i in np.flatnonzero(row >= self.D):
+            # Lekarz spoza zespołu: niedostępność prosto ze słownika preferencji
+            doc = names[row[i]]
+            nd[i] = self.prefs_map.get(self.d_strs[i], {}).get(doc, {}).get('Status') == STATUS_UNAVAILABLE
+            before[i] = self.prefs_map.get(next_strs[i], {}).get(doc, {}).get('Status') == STATUS_UNAVAILABLE
+        out = []
+        for i in np.flatnonzero(back | nd | before | sat):
+            d_str, doc = self.d_strs[i], names[row[i]]
+            if back[i]: out.append(f"🔴 {d_str}: {doc} ma dyżur dzień po dniu!")
+            if nd[i]:
+                reason = self.prefs_map.get(d_str, {}).get(doc, {}).get('Przyczyna', '')
+                out.append(f"🔴 {d_str}: {doc} ma dyżur, a zgłosił: Niedostępny ({reason})")
+            if before[i]:
+                reason = self.prefs_map.get(next_strs[i], {}).get(doc, {}).get('Przyczyna', '')
+                out.append(f"🔴 {d_str}: {doc} ma dyżur przed dniem niedostępnym ({reason})")
+            if sat[i]: out.append(f"🔴 {d_str}: {doc} ma dyżur w Poniedziałek po pracującej Sobocie!")
+        if self.limits is not None:
+            wk, tot = self.generator_rules(row[None, :])
+            for w, c in zip(*np.nonzero(wk[0] > 2)):
+                out.append(f"🔴 tydzień od {self.week_first[w]}: {self.doctors[c]} - dyżurów w tygodniu: {wk[0, w, c]} (maks. 2)")
+            for c in np.flatnonzero(tot[0] > self.limits):
+                out.append(f"🔴 {self.doctors[c]} - dyżurów w okresie: {tot[0, c]} (limit {self.limits[c]})")
+        return out
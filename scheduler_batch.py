@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scheduler import (
+    FIXED_DOCTORS, ROTATION_DOCTORS, ALL_DOCTORS, DAY_GROUPS_LIST, STATUS_FIXED, STATUS_AVAILABLE, STATUS_RELUCTANT,
+    PrefIndex, period_calendar, get_period_dates, generate_optimized, _score_schedule, _pool_context, _install_calendars,
+)
+
+# --- TRYB WSADOWY (scenariusze) ---
+#
+# Scenariusz = okres x limity x dyżurny z dnia przed okresem (słownik: name, variant, dates,
+# limits, last_duty_prev, past_counts). Scenariusze liczone równolegle w procesach, każdy
+# jednym workerem; indeks preferencji i kalendarze okresów (liczone raz w procesie głównym)
+# trafiają do procesu raz (initializer), nie z każdym scenariuszem.
+# Wynik: tabela porównawcza (wynik, dni BRAK, rozrzut grup, zgodność z preferencjami) + grafiki.
+
+def default_limits(dates, prefs, deltas=None):
+    # Jak tabele w zakładce Grafik: Fixed = liczba sztywnych dni, rotacja = równy podział puli
+    # + własne sztywne dni; reszta puli po 1 dla pierwszych lekarzy, żeby bilans się zgadzał.
+    # deltas: {lekarz rotacyjny: zmiana limitu} (warianty do porównania)
+    prefs_map = prefs.by_day if isinstance(prefs, PrefIndex) else prefs
+    fixed = {doc: 0 for doc in ALL_DOCTORS}
+    for d_str in period_calendar(dates).d_strs:
+        for doc, p in prefs_map.get(d_str, {}).items():
+            if doc in fixed and p.get('Status') == STATUS_FIXED: fixed[doc] += 1
+    pool = max(0, len(dates) - sum(fixed[doc] for doc in FIXED_DOCTORS) - sum(fixed[doc] for doc in ROTATION_DOCTORS if doc not in FIXED_DOCTORS))
+    base, extra = divmod(pool, len(ROTATION_DOCTORS)) if ROTATION_DOCTORS else (0, 0)
+    limits = {doc: fixed[doc] for doc in FIXED_DOCTORS}
+    for k, doc in enumerate(ROTATION_DOCTORS):
+        limits[doc] = max(0, base + (1 if k < extra else 0) + fixed[doc] + int((deltas or {}).get(doc, 0)))
+    return limits
+
+def make_scenarios(year, start_months, prefs, limit_variants=None, last_duties=(None,), past_counts=None):
+    # Iloczyn okresów, wariantów limitów ({nazwa: {lekarz: zmiana}}) i dyżurnych z dnia przed okresem.
+    # past_counts(dates) -> przesunięcia sprawiedliwości dla okresu (albo None)
+    variants = limit_variants or {"Domyślne": {}}
+    out = []
+    for m in start_months:
+        dates = get_period_dates(year, m)
+        for variant, deltas in variants.items():
+            for last in last_duties:
+                name = f"{dates[0].strftime('%m.%Y')} | {variant} | {last or 'Nikt'}"
+                out.append({'name': name, 'variant': variant, 'dates': dates, 'limits': default_limits(dates, prefs, deltas),
+                            'last_duty_prev': last, 'past_counts': past_counts(dates) if past_counts else None})
+    return out
+
+def scenario_row(sc, result, report, prefs_map):
+    sch, sts = result[0], result[1]
+    row = {'Scenariusz': sc['name'], 'Okres': f"{sc['dates'][0].strftime('%m.%Y')} - {sc['dates'][-1].strftime('%m.%Y')}",
+           'Limity': sc.get('variant', ""), 'Dyżur przed': sc['last_duty_prev'] or "Nikt",
+           'Wynik': _score_schedule(sch, sts, prefs_map, sc.get('past_counts')), 'BRAK': sum(1 for v in sch.values() if v == "BRAK")}
+    hist = sc.get('past_counts') or {}
+    for g in DAY_GROUPS_LIST:
+        # Ta sama podstawa sprawiedliwości co w Wynik (z historią past_counts)
+        cnts = [sts[d][g] + hist.get(d, {}).get(g, 0) for d in ROTATION_DOCTORS]
+        row[f"Rozrzut {g}"] = max(cnts) - min(cnts) if cnts else 0
+    row['Rozrzut Σ'] = sum(row[f"Rozrzut {g}"] for g in DAY_GROUPS_LIST)
+    # Zgodność z preferencjami: dyżury rotacyjne w dni "Dostępny" (brak wpisu = Dostępny, jak w punktacji)
+    rot = [(d_str, doc) for d_str, doc in sch.items() if doc in ROTATION_DOCTORS]
+    status = [prefs_map.get(d_str, {}).get(doc, {}).get('Status', STATUS_AVAILABLE) for d_str, doc in rot]
+    row['Dostępny %'] = round(100.0 * status.count(STATUS_AVAILABLE) / len(rot), 1) if rot else 0.0
+    row['Niechętnie'] = status.count(STATUS_RELUCTANT)
+    row['Naruszenia'] = report.get('violations', 0)
+    row['Czas (s)'] = round(report.get('elapsed', 0.0), 2)
+    return row
+
+_SHARED = {}
+
+def _init_worker(prefs, calendars=()):
+    _SHARED['prefs'] = prefs
+    _install_calendars(calendars)
+
+def _run_scenario(k, sc, params):
+    report = {}
+    result = generate_optimized(sc['dates'], _SHARED['prefs'], sc['limits'], sc['last_duty_prev'], report=report,
+                                past_counts=sc.get('past_counts'), **params)
+    return k, result, report
+
+def iter_scenarios(scenarios, prefs, processes=1, **params):
+    # Postęp jak iter_optimized: słowniki z 'fraction'; ostatni ma 'result' = (tabela, [(scenariusz, grafik, raport)])
+    import pandas as pd
+    t0 = time.perf_counter()
+    prefs = prefs if isinstance(prefs, PrefIndex) else PrefIndex(prefs)
+    params = {**params, 'workers': 1}
+    n = len(scenarios)
+    done = [None] * n
+
+    def progress(k, result=None):
+        return {'done': k, 'total': n, 'fraction': k / n if n else 1.0, 'elapsed': time.perf_counter() - t0,
+                'stop': "scenariusze" if result is not None else None, 'result': result}
+
+    processes = max(1, min(int(processes), n))
+    if processes == 1:
+        _init_worker(prefs)
+        outcomes = (_run_scenario(k, sc, params) for k, sc in enumerate(scenarios))
+        pool = None
+    else:
+        calendars = list({cal.dates: cal for cal in (period_calendar(sc['dates']) for sc in scenarios)}.values())
+        pool = ProcessPoolExecutor(max_workers=processes, mp_context=_pool_context(), initializer=_init_worker, initargs=(prefs, calendars))
+        outcomes = (f.result() for f in as_completed([pool.submit(_run_scenario, k, sc, params) for k, sc in enumerate(scenarios)]))
+    try:
+        for finished, (k, result, report) in enumerate(outcomes, 1):
+            done[k] = (scenarios[k], result, report)
+            if finished < n: yield progress(finished)
+    finally:
+        if pool is not None: pool.shutdown()
+    table = pd.DataFrame([scenario_row(sc, res, rep, prefs.by_day) for sc, res, rep in done])
+    yield progress(n, (table, done))
+
+def run_scenarios(scenarios, prefs, processes=1, **params):
+    # Wersja blokująca iter_scenarios: zwraca (tabela porównawcza, wyniki scenariuszy)
+    last = None
+    for last in iter_scenarios(scenarios, prefs, processes, **params):
+        pass
+    return last['result'] if last else None
@@ -0,0 +1,91 @@
+import datetime
+import hashlib
+import json
+import os
+import pickle
+from scheduler import ENGINE_VERSION, TEAM, PrefIndex
+
+# --- PAMIĘĆ PODRĘCZNA WYNIKÓW (dysk, LRU) ---
+#
+# Klucz = sha256 z danych wejściowych: wiersze preferencji okresu (+ dzień po nim - reguła
+# "Przed"), limity, poprzedni dyżur, parametry generatora, reguły zespołu (team.json) i ENGINE_VERSION.
+# Pliki <klucz>.pkl; czas modyfikacji = ostatnie użycie, najstarsze usuwane ponad limit.
+
+CACHE_DIR = os.environ.get("GRAFIK_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "grafik"))
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def _period_rows(df, dates):
+    if isinstance(df, PrefIndex): df = df.df
+    if df is None or df.empty or not dates: return []
+    days = {d.strftime('%Y-%m-%d') for d in dates}
+    days.add((max(dates) + datetime.timedelta(days=1)).strftime('%Y-%m-%d'))
+    rows = df[df['Data'].astype(str).isin(days)]
+    cols = sorted(rows.columns)
+    return sorted([[str(r[c]) for c in cols] for r in rows.to_dict('records')])
+
+def _team_rules():
+    return {k: v for k, v in TEAM.items() if k != "colors"}
+
+def fingerprint(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def generation_key(dates, df, limits, last_duty_prev, **params):
+    return fingerprint("gen", ENGINE_VERSION, _team_rules(), [d.isoformat() for d in dates], _period_rows(df, dates),
+                       {k: int(v) for k, v in limits.items()}, last_duty_prev, params)
+
+def daily_work_key(dates, duty_schedule, df, last_duty_prev):
+    return fingerprint("daily", ENGINE_VERSION, _team_rules(), [d.isoformat() for d in dates], _period_rows(df, dates),
+                       dict(duty_schedule), last_duty_prev)
+
+class ResultCache:
+    def __init__(self, path=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _file(self, key): return os.path.join(self.path, f"{key}.pkl")
+
+    def get(self, key, default=None):
+        f = self._file(key)
+        try:
+            with open(f, 'rb') as fh: value = pickle.load(fh)
+            os.utime(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return default
+        return value
+
+    def put(self, key, value):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            f = self._file(key)
+            tmp = f"{f}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as fh: pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, f)
+            self._evict()
+        except OSError:
+            pass  # brak zapisu na dysk nie może blokować generowania
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".pkl"): continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes: break
+            try:
+                os.remove(os.path.join(self.path, name))
+                total -= size
+            except OSError:
+                pass
+
+    def cached(self, key, fn):
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            self.put(key, value)
+        return value
@@ -0,0 +1,84 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from scheduler import iter_optimized
+
+# --- ZADANIA GENEROWANIA W TLE ---
+#
+# Jeden JobRunner na proces aplikacji (st.cache_resource). Identyfikator zadania = klucz
+# generation_key, więc te same dane wejściowe i ustawienia od różnych użytkowników trafiają
+# do jednego zadania, a po powrocie do zakładki (także z nowej sesji) wynik jest pod tym
+# samym kluczem. Skrypt Streamlit tylko odpytuje stan - optymalizacja idzie w wątku puli
+# (z workers > 1 dalej w procesach iter_optimized).
+
+JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED = "w kolejce", "trwa", "gotowe", "błąd"
+
+class Job:
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = JOB_QUEUED
+        self.progress = {'attempts': 0, 'elapsed': 0.0, 'best_score': None, 'history': [], 'fraction': 0.0, 'stop': None}
+        self.result = None
+        self.report = {}
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.requests = 1  # ile razy zlecone (deduplikacja)
+
+    @property
+    def done(self): return self.status in (JOB_DONE, JOB_FAILED)
+
+class JobRunner:
+    def __init__(self, max_jobs=2, keep=16, on_done=None):
+        # max_jobs: zadania liczone równocześnie; keep: ile zakończonych trzymać w pamięci;
+        # on_done(job_id, result, report): np. zapis do ResultCache
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="grafik-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.keep = keep
+        self.on_done = on_done
+
+    def get(self, job_id):
+        with self._lock: return self._jobs.get(job_id)
+
+    def submit(self, job_id, dates, df, limits, last_duty_prev, report=None, **params):
+        # Generowanie grafiku (iter_optimized); report wypełniany w trakcie (także profil)
+        return self.submit_iter(job_id, lambda job: iter_optimized(dates, df, limits, last_duty_prev, report=job.report,
+                                                                   profile=job.report.get('profile'), **params), report)
+
+    def submit_iter(self, job_id, make_iter, report=None):
+        # make_iter(job) -> iterator słowników postępu (jak iter_optimized); 'result' ostatniego = wynik.
+        # Zadanie o tym samym id w toku albo zakończone sukcesem jest zwracane zamiast nowego.
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != JOB_FAILED:
+                job.requests += 1
+                return job
+            job = self._jobs[job_id] = Job(job_id)
+            if report is not None: job.report = report
+        self._pool.submit(self._run, job, make_iter)
+        return job
+
+    def _run(self, job, make_iter):
+        job.status = JOB_RUNNING
+        try:
+            prog = None
+            for prog in make_iter(job):
+                job.progress = {k: v for k, v in prog.items() if k != 'result'}
+            job.result = prog['result'] if prog else None
+            if self.on_done is not None: self.on_done(job.id, job.result, job.report)
+            job.status = JOB_DONE
+        except Exception:
+            job.error = traceback.format_exc(limit=3)
+            job.status = JOB_FAILED
+        job.finished = time.time()
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            finished = sorted((j.finished, j.id) for j in self._jobs.values() if j.done)
+            for _, job_id in finished[:max(0, len(finished) - self.keep)]: del self._jobs[job_id]
+
+    def active(self):
+        with self._lock: return [j for j in self._jobs.values() if not j.done]
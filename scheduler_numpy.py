@@ -0,0 +1,359 @@
+import random
+import time
+import numpy as np
+from scheduler import (
+    FIXED_DOCTORS, ROTATION_DOCTORS, SATURDAY_RULE_DOCTORS, DAY_GROUPS_LIST,
+    STATUS_AVAILABLE, STATUS_RELUCTANT, STATUS_UNAVAILABLE, STATUS_FIXED,
+    REJECT_REASONS, period_calendar, _generate_single_schedule, _score_schedule,
+)
+
+# --- SILNIK NUMPY (wektoryzacja po próbach) ---
+#
+# Każda próba czyta własny blok `block` słów 32-bit ze strumienia Mersenne Twister
+# workera. random() i choice() są emulowane bit w bit na tych słowach, więc próba j
+# daje ten sam grafik co _generate_single_schedule z Random ustawionym na początek
+# bloku j (patrz replay_attempt).
+
+ST_NONE, ST_AVAILABLE, ST_RELUCTANT, ST_UNAVAILABLE, ST_FIXED, ST_OTHER = range(6)
+STATUS_CODES = {STATUS_AVAILABLE: ST_AVAILABLE, STATUS_RELUCTANT: ST_RELUCTANT, STATUS_UNAVAILABLE: ST_UNAVAILABLE, STATUS_FIXED: ST_FIXED}
+
+NONE, BRAK = -1, -2
+BATCH_WORDS = 1 << 22  # ~16 MB słów losowych na paczkę prób
+
+def _status_code(prefs_map, d_str, doc):
+    p = prefs_map.get(d_str, {}).get(doc)
+    if p is None: return ST_NONE
+    return STATUS_CODES.get(p.get('Status'), ST_OTHER)
+
+class EncodedProblem:
+    # Dane okresu zakodowane jako tablice int raz na uruchomienie
+    def __init__(self, dates, prefs_map, limits, last_duty_prev, past_counts=None):
+        self.dates = list(dates)
+        self.past_counts = past_counts
+        self.prefs_map = prefs_map
+        self.limits_map = limits
+        self.last_duty_prev = last_duty_prev
+        self.doctors = list(ROTATION_DOCTORS) + [d for d in FIXED_DOCTORS if d not in ROTATION_DOCTORS]
+        doc_idx = {d: k for k, d in enumerate(self.doctors)}
+        R = len(ROTATION_DOCTORS)
+        n = len(self.dates)
+        cal = self.cal = period_calendar(self.dates)
+        d_strs = self.d_strs = cal.d_strs
+        self.n_days, self.n_rot = n, R
+
+        # Kolumny pomocnicze grafiku: n = dyżur z poprzedniego okresu, n + 1 = poza okresem
+        self.prev_col, self.out_col = n, n + 1
+        self.last_prev_idx = doc_idx.get(last_duty_prev, NONE)
+        def col(idx): return np.array([self.out_col if k < 0 else k for k in idx], dtype=np.intp)
+        self.prev_i = col(cal.prev_i)
+        if n: self.prev_i[0] = self.prev_col
+        self.next_i = col(cal.next_i)
+        self.sat_i = col(cal.sat_i)
+        self.is_mon = np.array(cal.is_mon, dtype=bool)
+
+        self.week_i = np.array(cal.week_i, dtype=np.intp)
+        self.n_weeks = max(1, cal.n_weeks)
+        self.group_i = np.array(cal.group_i, dtype=np.intp)
+
+        status = np.array([[_status_code(prefs_map, s, doc) for doc in ROTATION_DOCTORS] for s in d_strs], dtype=np.int8).reshape(n, R)
+        status_next = np.array([[_status_code(prefs_map, s, doc) for doc in ROTATION_DOCTORS] for s in cal.next_strs], dtype=np.int8).reshape(n, R)
+        self.nd = status == ST_UNAVAILABLE
+        self.nd_next = status_next == ST_UNAVAILABLE
+        # Ranga wagi: 0 = Dostępny (w=10), 1 = inne (w=5), 2 = Niechętnie (w=1)
+        self.w_rank = np.where(status == ST_AVAILABLE, 0, np.where(status == ST_RELUCTANT, 2, 1)).astype(np.int64)
+        self.count_av = (~self.nd).sum(axis=1)
+        self.sat_rule = np.array([doc in SATURDAY_RULE_DOCTORS for doc in ROTATION_DOCTORS], dtype=bool)
+        self.limits = np.array([limits.get(doc, 0) for doc in ROTATION_DOCTORS], dtype=np.int64)
+        # Liczniki grup z poprzednich okresów (R, G) - punkt startowy liczników grafiku
+        hist = past_counts or {}
+        self.grp_off = np.array([[hist.get(doc, {}).get(g, 0) for g in DAY_GROUPS_LIST] for doc in ROTATION_DOCTORS], dtype=np.int64).reshape(R, len(DAY_GROUPS_LIST))
+
+        # Punkty preferencji (jak _score_schedule): brak wpisu liczony jako Dostępny
+        pref_pts = np.where((status == ST_AVAILABLE) | (status == ST_NONE), 50, np.where(status == ST_RELUCTANT, -50, 0))
+        self.pref_pts = np.zeros((n, len(self.doctors)), dtype=np.int64)
+        self.pref_pts[:, :R] = pref_pts
+        self.max_pref = pref_pts.max(axis=1) if R else np.zeros(n, dtype=np.int64)
+
+        # Faza 1: sztywne dyżury (lekarze Fixed deterministycznie, konflikty rotacyjne losowane)
+        self.fixed_assign = np.full(n, NONE, dtype=np.int64)
+        self.rot_conflicts = []
+        for i, s in enumerate(d_strs):
+            day_prefs = prefs_map.get(s, {})
+            fixed = [doc for doc in FIXED_DOCTORS if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
+            rot = [k for k, doc in enumerate(ROTATION_DOCTORS) if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
+            if fixed: self.fixed_assign[i] = doc_idx[fixed[0]]
+            elif rot: self.rot_conflicts.append((i, np.array(rot, dtype=np.int64)))
+        conflict_days = {i for i, _ in self.rot_conflicts}
+        self.fill_days = np.array([i for i in range(n) if self.fixed_assign[i] == NONE and i not in conflict_days], dtype=np.intp)
+
+        # Górne ograniczenie zużycia słów na próbę: sortowanie dni + losowania kandydatów + choice()
+        F = len(self.fill_days)
+        self.block = 2 * F * (1 + R) + 32 * len(self.rot_conflicts) + 2
+
+    def decode(self, row):
+        sch = {}
+        for i, d_str in enumerate(self.d_strs):
+            v = row[i]
+            sch[d_str] = "BRAK" if v == BRAK else self.doctors[v]
+        return sch
+
+def _uniform(words, ar, p):
+    # random() CPythona: (a >> 5, b >> 6) z dwóch kolejnych słów, 53 bity
+    a = words[ar, p] >> 5
+    b = words[ar, p + 1] >> 6
+    return (a.astype(np.float64) * 67108864.0 + b) * (1.0 / 9007199254740992.0)
+
+PRUNED = np.iinfo(np.int64).min
+PRUNE_FIRST_BATCH = 256  # mała pierwsza paczka = szybko znany wynik do cięcia
+PRUNE_CHECKPOINTS = (0.25, 0.5, 0.75)  # ułamki Fazy 2 z pełnym (droższym) ograniczeniem
+
+def _prune_phase(step, F):
+    q = min(3, 4 * step // max(1, F))
+    return f"Faza 2 ({25 * q}-{25 * q + 25}%)"
+
+def _feasible(P, days, sched, total, wk, ar):
+    # (A, K, R): czy lekarz może jeszcze wziąć dzień. Reguły są monotoniczne (liczniki
+    # tylko rosną, sąsiednie dni tylko się zapełniają), więc "nie" pozostaje "nie".
+    rot_ids = np.arange(P.n_rot)
+    rows = ar[:, None]
+    ok = (total < P.limits)[:, None, :] & ~P.nd[days] & ~P.nd_next[days]
+    ok &= rot_ids != sched[rows, P.prev_i[days]][..., None]
+    ok &= rot_ids != sched[rows, P.next_i[days]][..., None]
+    ok &= wk[rows, P.week_i[days]] < 2
+    ok &= ~(P.is_mon[days][..., None] & P.sat_rule & (rot_ids == sched[rows, P.sat_i[days]][..., None]))
+    return ok
+
+def _water_level(c, rem_grp):
+    # Najwyższe minimum osiągalne po rozdaniu rem_grp dni grupy: min_k (rem + suma k najmniejszych) // k
+    cs = np.sort(c, axis=-1)
+    level = ((rem_grp[..., None] + np.cumsum(cs, axis=-1)) // np.arange(1, c.shape[-1] + 1)).min(axis=-1)
+    return cs[..., -1], level
+
+def _spread_lb(c, rem):
+    # Rozrzut grupy >= max - najwyższe osiągalne minimum
+    top, level = _water_level(c, rem)
+    return np.maximum(0, top - level)
+
+def _upper_bound_full(P, grp, total, brak, pref_acc, feasible, rem_days):
+    # Dokładniejsze ograniczenie (w punktach kontrolnych):
+    #  - dzień bez żadnego dopuszczalnego lekarza to pewny BRAK,
+    #  - preferencja tylko spośród lekarzy dopuszczalnych,
+    #  - lekarz urośnie w grupie najwyżej o tyle dni, ile jeszcze może wziąć (i ile
+    #    zostało mu do limitu), więc minimum grupy <= min(obecny + zapas).
+    R, G = P.n_rot, len(DAY_GROUPS_LIST)
+    alive = feasible.any(axis=-1)
+    pref = np.where(feasible, P.pref_pts[rem_days, :R], -(1 << 40)).max(axis=-1)
+    rem_pref = np.where(alive, pref, 0).sum(axis=1)
+    dead = (~alive).sum(axis=1)
+    if R:
+        onehot = (P.group_i[rem_days][..., None] == np.arange(G)).astype(np.float32)
+        rem_grp = onehot.sum(axis=1).astype(np.int64)
+        cap = np.matmul(onehot.transpose(0, 2, 1), feasible.astype(np.float32)).astype(np.int64)
+        cap = np.minimum(cap, np.maximum(0, P.limits - total)[:, None, :])
+        c = grp.transpose(0, 2, 1)
+        top, level = _water_level(c, rem_grp)
+        level = np.minimum(level, (c + cap).min(axis=-1))
+        spread_lb = np.maximum(0, top - level).sum(axis=1)
+    else:
+        spread_lb = 0
+    return (P.n_days - brak - dead) * 1000000 - spread_lb * 1000 + pref_acc + rem_pref
+
+def run_batch(problem, words, bound=None, pruned=None, prof=None, rej=None):
+    # words: (A, block) uint32; zwraca (grafiki (A, n), wyniki (A,), przepełnienie (A,)).
+    # bound: próby, których górne ograniczenie <= bound, są przerywane (wynik PRUNED),
+    # a licznik faz w słowniku pruned rośnie.
+    # prof (GenerationStats): czasy faz; rej (len(REJECT_REASONS), n, R): odrzucenia jak w
+    # silniku słownikowym (pierwszy niespełniony warunek).
+    P = problem
+    if prof is not None: t0 = time.perf_counter()
+    A, W = words.shape
+    n, R, G = P.n_days, P.n_rot, len(DAY_GROUPS_LIST)
+    words = np.concatenate([words, np.zeros((A, 2 * R + 2), dtype=np.uint32)], axis=1)
+    ar = np.arange(A)
+    rot_ids = np.arange(R)
+    p = np.zeros(A, dtype=np.int64)
+    out_sched = np.full((A, n), NONE, dtype=np.int64)
+    out_scores = np.full(A, PRUNED, dtype=np.int64)
+
+    sched = np.full((A, n + 2), NONE, dtype=np.int64)
+    sched[:, P.prev_col] = P.last_prev_idx
+    total = np.zeros((A, R), dtype=np.int64)
+    grp = np.broadcast_to(P.grp_off, (A, R, G)).copy()
+    wk = np.zeros((A, P.n_weeks, R), dtype=np.int64)
+
+    # Faza 1
+    fixed_days = np.flatnonzero(P.fixed_assign != NONE)
+    sched[:, fixed_days] = P.fixed_assign[fixed_days]
+    for i, cands in P.rot_conflicts:
+        m = len(cands)
+        shift = np.uint32(32 - m.bit_length())
+        r = np.full(A, m, dtype=np.int64)
+        pending = np.ones(A, dtype=bool)
+        while pending.any():
+            # _randbelow: getrandbits(k) aż do trafienia < m
+            idx = ar[pending]
+            r[idx] = (words[idx, np.minimum(p[idx], W)] >> shift).astype(np.int64)
+            p[idx] += 1
+            pending[idx] = r[idx] >= m
+            pending &= p <= W
+        sched[:, i] = cands[np.minimum(r, m - 1)]
+    for i in range(n):
+        col = sched[:, i]
+        rot = (col >= 0) & (col < R)
+        if rot.any():
+            a, c = ar[rot], col[rot]
+            total[a, c] += 1
+            grp[a, c, P.group_i[i]] += 1
+            wk[a, P.week_i[i], c] += 1
+    overflow = p > W
+    if prof is not None: t1 = time.perf_counter()
+
+    # Kolejność dni: (liczba dostępnych, random()) jak days_to_fill.sort
+    F = len(P.fill_days)
+    days_order = np.zeros((A, 0), dtype=np.intp)
+    if F:
+        offs = p[:, None] + 2 * np.arange(F)[None, :]
+        u = _uniform(words, ar[:, None], np.minimum(offs, W))
+        p += 2 * F
+        order = np.lexsort((u, np.broadcast_to(P.count_av[P.fill_days], (A, F))), axis=-1)
+        days_order = P.fill_days[order]
+
+    if bound is not None:
+        assigned = sched[:, :n]
+        pref_acc = np.where(assigned >= 0, P.pref_pts[np.arange(n)[None, :], np.maximum(assigned, 0)], 0).sum(axis=1)
+        brak = np.zeros(A, dtype=np.int64)
+        rem_grp = np.broadcast_to(np.bincount(P.group_i[P.fill_days], minlength=G), (A, G)).copy()
+        rem_pref = np.full(A, P.max_pref[P.fill_days].sum(), dtype=np.int64)
+        spread_lb = _spread_lb(grp.transpose(0, 2, 1), rem_grp) if R else np.zeros((A, G), dtype=np.int64)
+        checkpoints = {int(F * q) for q in PRUNE_CHECKPOINTS}
+    rows = ar
+
+    # Faza 2
+    big = np.int64(1) << 62
+    for s in range(F):
+        if bound is not None:
+            # Odcięcie prób, które nie mogą już pobić najlepszego wyniku
+            if s in checkpoints:
+                rem_days = days_order[:, s:]
+                feasible = _feasible(P, rem_days, sched, total, wk, ar)
+                ub = _upper_bound_full(P, grp, total, brak, pref_acc, feasible, rem_days)
+            else:
+                # Tanie ograniczenie: pozostałe dni z najlepszą preferencją, rozrzut z "dolewania"
+                ub = (n - brak) * 1000000 - spread_lb.sum(axis=1) * 1000 + pref_acc + rem_pref
+            cut = (ub <= bound) & ~overflow
+            if cut.any():
+                if pruned is not None:
+                    phase = "Faza 1" if s == 0 else _prune_phase(s - 1, F)
+                    pruned[phase] = pruned.get(phase, 0) + int(cut.sum())
+                keep = ~cut
+                rows, p, sched, total, grp, wk, days_order, overflow = (
+                    v[keep] for v in (rows, p, sched, total, grp, wk, days_order, overflow))
+                pref_acc, brak, rem_grp, rem_pref, spread_lb = pref_acc[keep], brak[keep], rem_grp[keep], rem_pref[keep], spread_lb[keep]
+                ar = np.arange(len(rows))
+                if not len(rows): break
+
+        i = days_order[:, s]
+        ok = total < P.limits
+        ok &= ~P.nd[i]
+        ok &= rot_ids != sched[ar, P.prev_i[i]][:, None]
+        ok &= ~P.nd_next[i]
+        ok &= rot_ids != sched[ar, P.next_i[i]][:, None]
+        w = P.week_i[i]
+        ok &= wk[ar, w] < 2
+        sat_block = P.is_mon[i][:, None] & P.sat_rule[None, :] & (rot_ids == sched[ar, P.sat_i[i]][:, None])
+        ok &= ~sat_block
+        if rej is not None:
+            free = np.ones_like(ok)
+            for k, m in enumerate((total >= P.limits, P.nd[i], rot_ids == sched[ar, P.prev_i[i]][:, None],
+                                   P.nd_next[i] | (rot_ids == sched[ar, P.next_i[i]][:, None]), wk[ar, w] >= 2, sat_block)):
+                np.add.at(rej[k], i, (free & m).astype(np.int64))
+                free &= ~m
+
+        cnt = ok.sum(axis=1)
+        ranks = np.cumsum(ok, axis=1) - 1
+        u = _uniform(words, rows[:, None], np.minimum(p[:, None] + 2 * ranks, W))
+        g = P.group_i[i]
+        gc = grp[ar, :, g]
+        key = (P.w_rank[i] << 24) + (gc << 12) + total
+        key = np.where(ok, key, big)
+        tie = key == key.min(axis=1)[:, None]
+        choice = np.argmin(np.where(tie, u, np.inf), axis=1)
+
+        has = cnt > 0
+        sched[ar, i] = np.where(has, choice, BRAK)
+        a, c = ar[has], choice[has]
+        total[a, c] += 1
+        grp[a, c, g[has]] += 1
+        wk[a, w[has], c] += 1
+        p += 2 * cnt
+        if bound is not None:
+            brak += ~has
+            pref_acc[a] += P.pref_pts[i[has], c]
+            rem_grp[ar, g] -= 1
+            rem_pref -= P.max_pref[i]
+            if R: spread_lb[ar, g] = _spread_lb(grp[ar, :, g], rem_grp[ar, g])
+
+    if len(rows):
+        sched = sched[:, :n]
+        filled = (sched != BRAK).sum(axis=1)
+        spread = (grp.max(axis=1) - grp.min(axis=1)).sum(axis=1) if R else np.zeros(len(rows), dtype=np.int64)
+        pref = np.where(sched >= 0, P.pref_pts[np.arange(n)[None, :], np.maximum(sched, 0)], 0).sum(axis=1)
+        out_sched[rows] = sched
+        out_scores[rows] = filled * 1000000 - spread * 1000 + pref
+    out_overflow = np.zeros(A, dtype=bool)
+    out_overflow[rows] = overflow
+    if prof is not None:
+        t2 = time.perf_counter()
+        prof.add_time("Faza 1", t1 - t0); prof.add_time("Faza 2", t2 - t1)
+    return out_sched, out_scores, out_overflow
+
+def _skip(rng, block, attempts):
+    for _ in range(attempts):
+        if block: rng.getrandbits(32 * block)
+
+def replay_attempt(problem, seed, attempt_idx):
+    # Próba attempt_idx silnikiem słownikowym na tym samym fragmencie strumienia
+    rng = random.Random(seed)
+    _skip(rng, problem.block, attempt_idx)
+    return _generate_single_schedule(problem.dates, problem.prefs_map, problem.limits_map, problem.last_duty_prev, rng, problem.past_counts)
+
+def iter_batches(problem, attempts, seed, first_batch=None):
+    # Paczki prób: (indeks pierwszej próby, słowa (A, block)); podział na paczki
+    # nie zmienia bloków, więc nie wpływa na wynik
+    rng = random.Random(seed)
+    W = problem.block
+    per_batch = max(1, BATCH_WORDS // max(1, W))
+    done = 0
+    while done < attempts:
+        A = min(first_batch if first_batch and not done else per_batch, attempts - done)
+        raw = rng.getrandbits(32 * W * A).to_bytes(4 * W * A, 'little') if W else b""
+        yield done, np.frombuffer(raw, dtype='<u4').reshape(A, W).astype(np.uint32)
+        done += A
+
+def run_attempts(problem, attempts, seed, prune=False, pruned=None, prof=None):
+    best_score, best_idx = -float('inf'), None
+    rej = np.zeros((len(REJECT_REASONS), problem.n_days, problem.n_rot), dtype=np.int64) if prof is not None else None
+    for start, words in iter_batches(problem, attempts, seed, PRUNE_FIRST_BATCH if prune else None):
+        bound = best_score if prune and best_idx is not None else None
+        sched, scores, overflow = run_batch(problem, words, bound, pruned, prof, rej)
+        for j in np.flatnonzero(overflow):
+            # Bardzo długie losowanie w choice() - liczymy próbę silnikiem słownikowym
+            sch, sts, _, _ = replay_attempt(problem, seed, start + j)
+            scores[j] = _score_schedule(sch, sts, problem.prefs_map, problem.past_counts)
+        if prof is not None:
+            prof.attempts += len(scores)
+            vals, cnts = np.unique(scores[scores != PRUNED], return_counts=True)
+            prof.scores.update(dict(zip(vals.tolist(), cnts.tolist())))
+        j = int(np.argmax(scores))
+        if scores[j] > best_score:
+            best_score, best_idx = int(scores[j]), start + j
+            best_row = None if overflow[j] else sched[j]
+    if prof is not None:
+        for k, reason in enumerate(REJECT_REASONS):
+            for i, c in zip(*np.nonzero(rej[k])):
+                prof.rejections[(reason, ROTATION_DOCTORS[c], problem.d_strs[i])] += int(rej[k][i, c])
+    if best_idx is None: return best_score, None
+    res = replay_attempt(problem, seed, best_idx)
+    if best_row is not None and res[0] != problem.decode(best_row):
+        raise RuntimeError("Silnik NumPy rozjechał się z silnikiem słownikowym")
+    return best_score, res
@@ -0,0 +1,160 @@
+import math
+import random
+from scheduler import DAY_GROUPS_LIST, _schedule_stats
+from scheduler_numpy import NONE, BRAK
+
+# --- POPRAWA LOKALNA (SYMULOWANE WYŻARZANIE) ---
+#
+# Ruchy na dniach z Fazy 2 (dni sztywne są nietykalne):
+#   swap     - zamiana dni dwóch lekarzy rotacyjnych (sumy bez zmian),
+#   balance  - dzień grupy od najbardziej do najmniej obciążonego lekarza tej grupy,
+#   relocate - losowy dzień do losowego lekarza,
+#   fill     - obsadzenie dnia BRAK.
+# Każdy ruch przechodzi te same twarde reguły co _generate_single_schedule, a wynik
+# liczony jest przyrostowo (tylko zmienione grupy i komórki preferencji).
+
+MOVES = ["swap", "balance", "relocate", "fill"]
+
+class LocalSearch:
+    def __init__(self, problem, sch):
+        P = problem
+        self.P = P
+        R = P.n_rot
+        self.R = R
+        doc_idx = {d: k for k, d in enumerate(P.doctors)}
+        self.x = [BRAK if sch.get(s, "BRAK") == "BRAK" else doc_idx[sch[s]] for s in P.d_strs] + [P.last_prev_idx, NONE]
+
+        self.prev_i = P.prev_i.tolist(); self.next_i = P.next_i.tolist(); self.sat_i = P.sat_i.tolist()
+        self.is_mon = P.is_mon.tolist(); self.week_i = P.week_i.tolist(); self.group_i = P.group_i.tolist()
+        self.nd = P.nd.tolist(); self.nd_next = P.nd_next.tolist(); self.pref = P.pref_pts.tolist()
+        self.limits = P.limits.tolist(); self.sat_rule = P.sat_rule.tolist()
+        # Poniedziałek, dla którego dzień i jest "sobotą przed" (reguła sobotnia w obie strony)
+        self.mon_of = [NONE] * (P.n_days + 2)
+        for j in range(P.n_days):
+            if self.is_mon[j] and self.sat_i[j] < P.n_days: self.mon_of[self.sat_i[j]] = j
+        self.movable = [int(i) for i in P.fill_days]
+
+        self.total = [0] * R
+        self.grp = P.grp_off.T.tolist()  # od liczników poprzednich okresów
+        self.wk = [[0] * R for _ in range(P.n_weeks)]
+        for i in range(P.n_days):
+            c = self.x[i]
+            if 0 <= c < R:
+                self.total[c] += 1; self.grp[self.group_i[i]][c] += 1; self.wk[self.week_i[i]][c] += 1
+        self.score = self._full_score()
+
+    def _spread(self, g):
+        col = self.grp[g]
+        return max(col) - min(col) if col else 0
+
+    def _full_score(self):
+        filled = sum(1 for v in self.x[:self.P.n_days] if v != BRAK)
+        pref = sum(self.pref[i][c] for i, c in enumerate(self.x[:self.P.n_days]) if c >= 0)
+        return filled * 1000000 - 1000 * sum(self._spread(g) for g in range(len(self.grp))) + pref
+
+    def can_take(self, i, c, gain_total, gain_week):
+        if c < 0 or c >= self.R: return False
+        if self.nd[i][c] or self.nd_next[i][c]: return False
+        x = self.x
+        if x[self.prev_i[i]] == c or x[self.next_i[i]] == c: return False
+        if gain_total and self.total[c] + 1 > self.limits[c]: return False
+        if gain_week and self.wk[self.week_i[i]][c] + 1 > 2: return False
+        if self.sat_rule[c]:
+            if self.is_mon[i] and x[self.sat_i[i]] == c: return False
+            j = self.mon_of[i]
+            if j != NONE and x[j] == c: return False
+        return True
+
+    def _set(self, i, old, new):
+        # Przepisuje dzień i z lekarza old na new (<0 = pusty); zwraca zmianę wyniku
+        g, w = self.group_i[i], self.week_i[i]
+        before = self._spread(g)
+        delta = 0
+        if old >= 0:
+            self.total[old] -= 1; self.grp[g][old] -= 1; self.wk[w][old] -= 1
+            delta -= 1000000 + self.pref[i][old]
+        if new >= 0:
+            self.total[new] += 1; self.grp[g][new] += 1; self.wk[w][new] += 1
+            delta += 1000000 + self.pref[i][new]
+        self.x[i] = new
+        return delta - 1000 * (self._spread(g) - before)
+
+    def try_swap(self, i, j):
+        a, b = self.x[i], self.x[j]
+        if a < 0 or b < 0 or a == b or i == j: return None
+        self.x[i] = self.x[j] = NONE
+        same_week = self.week_i[i] == self.week_i[j]
+        ok = self.can_take(j, a, False, not same_week) and self.can_take(i, b, False, not same_week)
+        self.x[i], self.x[j] = a, b
+        if not ok: return None
+        return self._set(i, a, NONE) + self._set(j, b, NONE) + self._set(i, NONE, b) + self._set(j, NONE, a)
+
+    def try_assign(self, i, c):
+        old = self.x[i]
+        if old == c: return None
+        self.x[i] = NONE
+        ok = self.can_take(i, c, True, True)
+        self.x[i] = old
+        if not ok: return None
+        return self._set(i, old, c)
+
+def improve_schedule(problem, result, iterations=20000, seed=0, t_start=500.0, t_end=5.0):
+    # Zwraca (sch, sts, dbg, denied) nie gorszy od wejściowego
+    if not result or iterations <= 0: return result
+    sch, _, dbg, denied = result
+    ls = LocalSearch(problem, sch)
+    movable = ls.movable
+    if not movable: return result
+    rng = random.Random(seed)
+    x = ls.x
+    start_score = ls.score
+    best_score, best_x = ls.score, list(x)
+    groups = list(range(len(DAY_GROUPS_LIST)))
+    cooling = (t_end / t_start) ** (1.0 / max(1, iterations))
+    T = t_start
+
+    for _ in range(iterations):
+        T *= cooling
+        move = rng.choice(MOVES)
+        undo = None
+        if move == "swap":
+            i, j = rng.choice(movable), rng.choice(movable)
+            a, b = x[i], x[j]
+            delta = ls.try_swap(i, j)
+            if delta is not None: undo = lambda: (ls._set(i, b, a), ls._set(j, a, b))
+        elif move == "balance":
+            g = rng.choice(groups)
+            col = ls.grp[g]
+            hi, lo = max(col), min(col)
+            if hi == lo: continue
+            a = rng.choice([r for r in range(ls.R) if col[r] == hi])
+            b = rng.choice([r for r in range(ls.R) if col[r] == lo])
+            days = [i for i in movable if x[i] == a and ls.group_i[i] == g]
+            if not days: continue
+            i = rng.choice(days)
+            delta = ls.try_assign(i, b)
+            if delta is not None: undo = lambda: ls._set(i, b, a)
+        else:
+            if move == "fill":
+                holes = [i for i in movable if x[i] == BRAK]
+                if not holes: continue
+                i = rng.choice(holes)
+            else:
+                i = rng.choice(movable)
+            a, b = x[i], rng.randrange(ls.R)
+            delta = ls.try_assign(i, b)
+            if delta is not None: undo = lambda: ls._set(i, b, a)
+        if delta is None: continue
+
+        if delta >= 0 or rng.random() < math.exp(delta / T):
+            ls.score += delta
+            if ls.score > best_score:
+                best_score, best_x = ls.score, list(x)
+        else:
+            undo()
+
+    if best_score <= start_score: return result
+    P = problem
+    new_sch = {s: ("BRAK" if best_x[i] == BRAK else P.doctors[best_x[i]]) for i, s in enumerate(P.d_strs)}
+    new_dbg = {d: v for d, v in dbg.items() if new_sch.get(d) == "BRAK"}
+    return new_sch, _schedule_stats(P.dates, new_sch), new_dbg, list(denied)
@@ -0,0 +1,266 @@
+import time
+from scheduler import ROTATION_DOCTORS, STATUS_FIXED, _schedule_stats
+from scheduler_numpy import NONE, BRAK
+
+# --- SOLVER DOKŁADNY (propagacja ograniczeń) ---
+#
+# Każdy dzień Fazy 2 to zmienna z dziedziną = maska bitowa lekarzy rotacyjnych.
+# Przypisanie lekarza c propaguje twarde reguły generatora:
+#   - sąsiednie dni tracą c (brak dyżuru dzień po dniu),
+#   - po osiągnięciu limitu c znika ze wszystkich dni,
+#   - po 2 dyżurach w tygodniu (get_week_key) c znika z reszty tygodnia,
+#   - reguła sobotnia (SATURDAY_RULE_DOCTORS) w obie strony Sobota <-> Poniedziałek.
+# ND i "Przed" (niedostępność dnia następnego) są usuwane z dziedzin na starcie.
+# Dni sztywne (Faza 1) są przypisane jak w generatorze; konflikty rotacyjne są
+# zmiennymi z dziedziną = zgłoszeni lekarze (bez sprawdzania reguł, jak w Fazie 1).
+# Przeszukiwanie w głąb: najpierw dzień o najmniejszej dziedzinie, lekarze w kolejności
+# generatora (preferencja, obciążenie grupy, suma).
+
+STATUS_OK = "OK"
+STATUS_INFEASIBLE = "BRAK ROZWIĄZANIA"
+STATUS_LIMIT = "LIMIT"
+
+class ScheduleSolver:
+    def __init__(self, problem):
+        P = self.P = problem
+        n, R = P.n_days, P.n_rot
+        self.n, self.R = n, R
+        self.prev_i = P.prev_i.tolist(); self.next_i = P.next_i.tolist(); self.sat_i = P.sat_i.tolist()
+        self.is_mon = P.is_mon.tolist(); self.week_i = P.week_i.tolist(); self.group_i = P.group_i.tolist()
+        self.limits = P.limits.tolist(); self.sat_rule = P.sat_rule.tolist(); self.w_rank = P.w_rank.tolist()
+        self.mon_of = [NONE] * (n + 2)
+        for j in range(n):
+            if self.is_mon[j] and self.sat_i[j] < n: self.mon_of[self.sat_i[j]] = j
+        self.week_days = [[] for _ in range(P.n_weeks)]
+        for i in range(n): self.week_days[self.week_i[i]].append(i)
+        # Pary kolejnych dni w tygodniu (lekarz może wziąć najwyżej jeden dzień z pary)
+        self.pair_i = list(range(n))
+        for days in self.week_days:
+            k = 0
+            while k + 1 < len(days):
+                if self.next_i[days[k]] == days[k + 1]: self.pair_i[days[k + 1]] = days[k]; k += 2
+                else: k += 1
+
+        full = (1 << R) - 1
+        nd = P.nd.tolist(); nd_next = P.nd_next.tolist()
+        self.static_dom = [full & ~sum(1 << c for c in range(R) if nd[i][c] or nd_next[i][c]) for i in range(n)]
+        self.fixed = P.fixed_assign.tolist()
+        self.conflicts = {i: [int(c) for c in cands] for i, cands in P.rot_conflicts}
+        self.nodes = 0
+        self.prefer = {}
+
+    # Stan: (x, dom, total, wk, grp) - kopiowany na węzeł (listy długości ~n)
+    def _initial_state(self, pinned):
+        P, n, R = self.P, self.n, self.R
+        x = [NONE] * n + [P.last_prev_idx, NONE]
+        dom = list(self.static_dom)
+        total = [0] * R
+        wk = [[0] * R for _ in range(P.n_weeks)]
+        grp = P.grp_off.T.tolist()
+        state = (x, dom, total, wk, grp)
+        # Dyżur z poprzedniego okresu blokuje pierwszy dzień
+        if 0 <= P.last_prev_idx < R and n: dom[0] &= ~(1 << P.last_prev_idx)
+        for i in range(n):
+            if self.fixed[i] != NONE: self._place(state, i, self.fixed[i])
+        for i, c in (pinned or {}).items():
+            if x[i] == NONE: self._place(state, i, c)
+        return state
+
+    def _place(self, state, i, c):
+        # Przypisanie + propagacja; zwraca False przy pustej dziedzinie
+        x, dom, total, wk, grp = state
+        x[i] = c
+        if c < 0 or c >= self.R: return True
+        bit = ~(1 << c)
+        touched = []
+        for j in (self.prev_i[i], self.next_i[i]):
+            if j < self.n and x[j] == NONE: dom[j] &= bit; touched.append(j)
+        total[c] += 1
+        grp[self.group_i[i]][c] += 1
+        w = self.week_i[i]
+        wk[w][c] += 1
+        if total[c] >= self.limits[c]:
+            for j in range(self.n):
+                if x[j] == NONE: dom[j] &= bit
+            touched = list(range(self.n))
+        elif wk[w][c] >= 2:
+            for j in self.week_days[w]:
+                if x[j] == NONE: dom[j] &= bit; touched.append(j)
+        if self.sat_rule[c]:
+            j = self.sat_i[i] if self.is_mon[i] else self.mon_of[i]
+            if j != NONE and j < self.n and x[j] == NONE: dom[j] &= bit; touched.append(j)
+        for j in touched:
+            if x[j] == NONE and not dom[j] and j not in self.conflicts: return False
+        return True
+
+    def _capacity_ok(self, state):
+        # Suma wolnych miejsc do limitów i w tygodniach musi pokryć nieobsadzone dni
+        x, dom, total, wk, _ = state
+        R = self.R
+        left = [max(0, self.limits[c] - total[c]) for c in range(R)]
+        open_days = [i for i in range(self.n) if x[i] == NONE and i not in self.conflicts]
+        if len(open_days) > sum(left): return False
+        for w, days in enumerate(self.week_days):
+            need = sum(1 for i in days if x[i] == NONE and i not in self.conflicts)
+            if need and need > sum(min(left[c], max(0, 2 - wk[w][c])) for c in range(R)): return False
+        return self._flow_ok(state, left, open_days)
+
+    def _flow_ok(self, state, left, open_days):
+        # Przepływ: źródło -> lekarz (limit) -> tydzień (max 2) -> para kolejnych dni (max 1,
+        # bez dyżuru dzień po dniu) -> dzień -> ujście. Brak pełnego przepływu = brak rozwiązania.
+        x, dom, _, wk, _ = state
+        if not open_days: return True
+        R = self.R
+        head, cap, adj = [], [], {}
+        def edge(a, b, c):
+            adj.setdefault(a, []).append(len(head)); head.append(b); cap.append(c)
+            adj.setdefault(b, []).append(len(head)); head.append(a); cap.append(0)
+        S, T = "S", "T"
+        for c in range(R):
+            if left[c]: edge(S, c, left[c])
+        for i in open_days:
+            edge(("d", i), T, 1)
+            w, p = self.week_i[i], self.pair_i[i]
+            bits = dom[i]
+            for c in range(R):
+                if not bits >> c & 1 or not left[c] or wk[w][c] >= 2: continue
+                if ("w", c, w) not in adj: edge(c, ("w", c, w), 2 - wk[w][c])
+                if ("p", c, p) not in adj: edge(("w", c, w), ("p", c, p), 1)
+                edge(("p", c, p), ("d", i), 1)
+        flow = 0
+        while flow < len(open_days):
+            # BFS po sieci rezydualnej
+            parent = {S: None}
+            queue = [S]
+            for a in queue:
+                if T in parent: break
+                for e in adj.get(a, ()):
+                    b = head[e]
+                    if cap[e] and b not in parent:
+                        parent[b] = e; queue.append(b)
+            if T not in parent: return False
+            b = T
+            while parent[b] is not None:
+                e = parent[b]; cap[e] -= 1; cap[e ^ 1] += 1; b = head[e ^ 1]
+            flow += 1
+        return True
+
+    def _order(self, state, i):
+        x, dom, total, wk, grp = state
+        g = self.group_i[i]
+        keep = self.prefer.get(i)
+        if i in self.conflicts: return sorted(self.conflicts[i], key=lambda c: c != keep)
+        cands = [c for c in range(self.R) if dom[i] >> c & 1]
+        return sorted(cands, key=lambda c: (c != keep, self.w_rank[i][c], grp[g][c], total[c]))
+
+    def solve(self, pinned=None, node_limit=200000, time_limit=None, prefer=None):
+        # Zwraca (status, lista lekarzy na dzień lub None).
+        # pinned: {dzień: lekarz} przypisane na sztywno; prefer: {dzień: lekarz} próbowany jako pierwszy
+        self.nodes = 0
+        self.prefer = prefer or {}
+        deadline = time.perf_counter() + time_limit if time_limit else None
+        state = self._initial_state(pinned)
+        if not self._consistent(state): return STATUS_INFEASIBLE, None
+        stack = [state]
+        while stack:
+            state = stack.pop()
+            x, dom = state[0], state[1]
+            self.nodes += 1
+            if self.nodes > node_limit or (deadline and self.nodes % 256 == 0 and time.perf_counter() > deadline):
+                return STATUS_LIMIT, None
+            # MRV: konflikty Fazy 1 najpierw, potem najmniejsza dziedzina
+            best, best_size = None, None
+            for i in range(self.n):
+                if x[i] != NONE: continue
+                size = -1 if i in self.conflicts else dom[i].bit_count()
+                if best is None or size < best_size: best, best_size = i, size
+                if size <= 0: break
+            if best is None: return STATUS_OK, x[:self.n]
+            for c in reversed(self._order(state, best)):
+                child = (list(x), list(dom), list(state[2]), [list(r) for r in state[3]], [list(r) for r in state[4]])
+                if self._place(child, best, c) and self._capacity_ok(child):
+                    stack.append(child)
+        return STATUS_INFEASIBLE, None
+
+    def _consistent(self, state):
+        x, dom = state[0], state[1]
+        for i in range(self.n):
+            if x[i] == NONE and not dom[i] and i not in self.conflicts: return False
+        return self._capacity_ok(state)
+
+    def neighbourhood(self, days):
+        # Dni zmienione + dzień przed/po, cały tydzień i para Sobota/Poniedziałek
+        out = set()
+        for i in days:
+            out.add(i)
+            out.update(j for j in (self.prev_i[i], self.next_i[i]) if j < self.n)
+            out.update(self.week_days[self.week_i[i]])
+        for i in list(out):
+            j = self.sat_i[i] if self.is_mon[i] else self.mon_of[i]
+            if j != NONE and j < self.n: out.add(j)
+        return out
+
+    def to_result(self, x):
+        # (sch, sts, dbg, denied) w formacie generate_optimized
+        P = self.P
+        sch = {s: ("BRAK" if x[i] < 0 else P.doctors[x[i]]) for i, s in enumerate(P.d_strs)}
+        denied = []
+        for i, s in enumerate(P.d_strs):
+            day_prefs = P.prefs_map.get(s, {})
+            assigned = sch[s]
+            wanted = [doc for doc in ROTATION_DOCTORS if day_prefs.get(doc, {}).get('Status') == STATUS_FIXED]
+            if self.fixed[i] != NONE:
+                denied += [f"{s}: {cr} (nadpisany przez {assigned})" for cr in wanted]
+            elif i in self.conflicts:
+                denied += [f"{s}: {cr} (konflikt z {assigned})" for cr in wanted if cr != assigned]
+        return sch, _schedule_stats(P.dates, sch), {}, denied
+
+def solve_schedule(problem, pinned=None, node_limit=200000, time_limit=None):
+    # Zwraca (status, wynik w formacie generate_optimized lub None, liczba węzłów)
+    solver = ScheduleSolver(problem)
+    status, x = solver.solve(pinned, node_limit, time_limit)
+    return status, (solver.to_result(x) if x is not None else None), solver.nodes
+
+def repair_schedule(problem, sch, changed_days, node_limit=20000, report=None):
+    # Naprawa opublikowanego grafiku po zmianie preferencji: przeliczane są tylko dni
+    # changed_days (indeksy) z sąsiedztwem, reszta zostaje bez zmian. Gdy to nie wystarcza -
+    # cały okres z preferencją dotychczasowych przypisań; gdy pełna obsada nie istnieje -
+    # zwolnione dni obsadzane zachłannie (pozostałe BRAK).
+    solver = ScheduleSolver(problem)
+    P = solver.P
+    doc_idx = {d: k for k, d in enumerate(P.doctors)}
+    old = [doc_idx.get(sch.get(s), BRAK) for s in P.d_strs]
+    phase1 = {i for i in range(solver.n) if solver.fixed[i] != NONE}
+    prefer = {i: c for i, c in enumerate(old) if c >= 0}
+
+    freed = solver.neighbourhood(changed_days) - phase1
+    pinned = {i: old[i] for i in range(solver.n) if i not in freed and i not in phase1 and i not in solver.conflicts}
+    scope = "sąsiedztwo"
+    status, x = solver.solve(pinned, node_limit, prefer=prefer)
+    if x is None:
+        scope, freed = "okres", set(range(solver.n)) - phase1
+        status, x = solver.solve(None, node_limit, prefer=prefer)
+    if x is None:
+        scope = "częściowa"
+        x = _greedy_fill(problem, old, sorted(solver.neighbourhood(changed_days) - phase1 - set(solver.conflicts)), prefer)
+    res = solver.to_result(x)
+    if report is not None:
+        report.update({'status': status, 'scope': scope, 'nodes': solver.nodes,
+                       'freed': [P.d_strs[i] for i in sorted(freed)],
+                       'changed': [s for s in P.d_strs if res[0][s] != sch.get(s, "BRAK")]})
+    return res
+
+def _greedy_fill(problem, old, days, prefer):
+    # Zwolnione dni po kolei: dotychczasowy lekarz, jeśli nadal wolno, inaczej najlepszy dozwolony
+    from scheduler_search import LocalSearch
+    P = problem
+    ls = LocalSearch(P, {s: ("BRAK" if old[i] < 0 else P.doctors[old[i]]) for i, s in enumerate(P.d_strs)})
+    for i in days:
+        if ls.x[i] >= 0: ls._set(i, ls.x[i], BRAK)
+    for i in days:
+        keep = prefer.get(i)
+        cands = [c for c in range(ls.R) if ls.can_take(i, c, True, True)]
+        if cands:
+            c = keep if keep in cands else min(cands, key=lambda c: (P.w_rank[i][c], ls.grp[ls.group_i[i]][c], ls.total[c]))
+            ls._set(i, BRAK, c)
+    return ls.x[:P.n_days]